@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for the camera API.
+
+Starts the backend locally (in-memory storage by default, or Mongo via
+MONGO_URL), replays a weighted mix of status ticks, recording start/stop,
+preset reads and list pages from concurrent async workers, and reports
+throughput and p50/p95/p99 latency per endpoint. Results are written as a
+JSON baseline and can be compared against an earlier run.
+
+    cd backend
+    python -m benchmarks.load_benchmark --duration 30 --concurrency 32
+    python -m benchmarks.load_benchmark --baseline benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Relative weight of each scenario in the replayed traffic mix
+SCENARIO_WEIGHTS = {
+    "status_tick": 40,
+    "status_read": 10,
+    "recording_cycle": 10,
+    "preset_read": 20,
+    "settings_page": 10,
+    "recordings_page": 10,
+}
+
+class LoadBenchmark:
+    def __init__(self, base_url: str, concurrency: int, duration: float, seed: int):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.duration = duration
+        self.random = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.preset_ids: List[str] = []
+
+    async def timed(self, client: httpx.AsyncClient, endpoint: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        """Issue one request and record its latency under ``endpoint``"""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, f"{self.base_url}{path}", **kwargs)
+        except httpx.HTTPError:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.latencies.setdefault(endpoint, []).append(elapsed_ms)
+        if response.status_code >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+    async def seed(self, client: httpx.AsyncClient, presets: int = 20):
+        """Create presets so reads and list pages have realistic data"""
+        for i in range(presets):
+            response = await client.post(f"{self.base_url}/camera/settings", json={
+                "name": f"Benchmark Preset {i}",
+                "iso": self.random.choice([100, 400, 800, 1600, 3200]),
+                "aperture": self.random.choice([1.4, 2.8, 4.0, 5.6]),
+            })
+            response.raise_for_status()
+            self.preset_ids.append(response.json()["id"])
+
+    async def status_tick(self, client: httpx.AsyncClient):
+        await self.timed(client, "PUT /camera/status", "PUT", "/camera/status", json={
+            "battery": self.random.randint(5, 100),
+            "storage": "64GB",
+            "storageUsed": round(self.random.uniform(0, 64), 2),
+            "temperature": self.random.choice(["Normal", "Normal", "Warning"]),
+        })
+
+    async def status_read(self, client: httpx.AsyncClient):
+        await self.timed(client, "GET /camera/status", "GET", "/camera/status")
+
+    async def recording_cycle(self, client: httpx.AsyncClient):
+        response = await self.timed(client, "POST /camera/recordings", "POST", "/camera/recordings", json={
+            "fileName": f"bench_{time.time_ns()}.mp4",
+            "resolution": "4K UHD",
+            "frameRate": "24p",
+            "settings": {"iso": 800, "aperture": 2.8},
+        })
+        if response is not None and response.status_code == 200:
+            recording_id = response.json()["id"]
+            await self.timed(client, "PUT /camera/recordings/{id}/stop", "PUT", f"/camera/recordings/{recording_id}/stop")
+
+    async def preset_read(self, client: httpx.AsyncClient):
+        preset_id = self.random.choice(self.preset_ids)
+        await self.timed(client, "GET /camera/settings/{id}", "GET", f"/camera/settings/{preset_id}")
+
+    async def settings_page(self, client: httpx.AsyncClient):
+        await self.timed(client, "GET /camera/settings", "GET", "/camera/settings")
+
+    async def recordings_page(self, client: httpx.AsyncClient):
+        await self.timed(client, "GET /camera/recordings", "GET", "/camera/recordings")
+
+    async def worker(self, client: httpx.AsyncClient, deadline: float):
+        scenarios = list(SCENARIO_WEIGHTS)
+        weights = [SCENARIO_WEIGHTS[name] for name in scenarios]
+        while time.perf_counter() < deadline:
+            scenario = self.random.choices(scenarios, weights)[0]
+            await getattr(self, scenario)(client)
+
+    async def run(self) -> dict:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+            await self.seed(client)
+            started = time.perf_counter()
+            deadline = started + self.duration
+            await asyncio.gather(*(self.worker(client, deadline) for _ in range(self.concurrency)))
+            elapsed = time.perf_counter() - started
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            samples.sort()
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "mean_ms": round(sum(samples) / len(samples), 3),
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p95_ms": round(percentile(samples, 95), 3),
+                "p99_ms": round(percentile(samples, 99), 3),
+                "max_ms": round(samples[-1], 3),
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "base_url": self.base_url,
+            "concurrency": self.concurrency,
+            "duration_s": round(elapsed, 3),
+            "total_requests": total,
+            "total_errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[rank]
+
+def compare_to_baseline(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Print per-endpoint deltas and return the endpoints that regressed past ``max_regression``"""
+    regressions = []
+    print(f"\n{'endpoint':40} {'p95 base':>10} {'p95 now':>10} {'delta':>8} {'rps delta':>10}")
+    for endpoint, now in current["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if base is None:
+            print(f"{endpoint:40} {'-':>10} {now['p95_ms']:>10.2f} {'new':>8}")
+            continue
+        p95_delta = (now["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        rps_delta = (now["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"] if base["throughput_rps"] else 0.0
+        print(f"{endpoint:40} {base['p95_ms']:>10.2f} {now['p95_ms']:>10.2f} {p95_delta:>+8.1%} {rps_delta:>+10.1%}")
+        if p95_delta > max_regression:
+            regressions.append(endpoint)
+    return regressions
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_local_server(port: int, storage: str) -> subprocess.Popen:
+    """Start the backend with uvicorn in a subprocess and wait until it answers"""
+    env = dict(os.environ)
+    env["STORAGE_BACKEND"] = storage
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "camera_benchmark")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Local server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/").status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Local server did not become ready within 30s")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Benchmark an already running API (e.g. http://127.0.0.1:8001/api) instead of starting one")
+    parser.add_argument("--storage", choices=["memory", "mongo"], default="memory", help="Storage backend for the locally started server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load after seeding")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Where to write the JSON results (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95 increase vs baseline before failing (fraction)")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        port = free_port()
+        server = start_local_server(port, args.storage)
+        base_url = f"http://127.0.0.1:{port}/api"
+
+    try:
+        results = asyncio.run(LoadBenchmark(base_url, args.concurrency, args.duration, args.seed).run())
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+    results["storage"] = args.storage if args.base_url is None else "external"
+
+    print(f"\n{'endpoint':40} {'reqs':>7} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for endpoint, stats in results["endpoints"].items():
+        print(f"{endpoint:40} {stats['requests']:>7} {stats['throughput_rps']:>9.1f} "
+              f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['errors']:>7}")
+    print(f"\nTotal: {results['total_requests']} requests, {results['throughput_rps']} req/s, {results['total_errors']} errors")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results saved to {output}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, json.loads(Path(args.baseline).read_text()), args.max_regression)
+        if regressions:
+            print(f"\n❌ p95 regressed more than {args.max_regression:.0%} on: {', '.join(regressions)}")
+            return 1
+        print("\n✅ No p95 regressions beyond threshold")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
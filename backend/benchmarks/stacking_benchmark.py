@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the multi-frame stacking engine.
+
+Fills a shared-memory batch with synthetic noisy 4K frames (or bracketed
+exposures for HDR), merges it with each method through the tiled process
+pool and, for comparison, in a single process, and reports input frames
+per second and megapixels per second. Results are written as JSON.
+
+    cd backend
+    python -m benchmarks.stacking_benchmark --frames 8 --repeat 3
+    python -m benchmarks.stacking_benchmark --methods median,hdr --workers 8 --tile-rows 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.executor import BoundedExecutor  # noqa: E402
+from services.stacking_service import (  # noqa: E402
+    STACK_DTYPES, STACK_METHODS, StackingEngine, full_scale, relative_exposures
+)
+
+# Bracket for HDR runs, brightest last; cycled when more frames are requested
+HDR_SHUTTER_SPEEDS = ["1/1000", "1/250", "1/60", "1/15"]
+
+def synthetic_frames(frames: np.ndarray, method: str, seed: int) -> List[str]:
+    """Fill ``frames`` in place and return the shutter speeds used (HDR only)"""
+    rng = np.random.default_rng(seed)
+    count, height, width, channels = frames.shape
+    scale = full_scale(frames.dtype)
+    # A smooth gradient scene so medians and clipping see realistic structure
+    scene = (np.linspace(0.05, 1.0, width, dtype=np.float32)[None, :, None]
+             * np.linspace(0.2, 1.0, height, dtype=np.float32)[:, None, None]
+             * np.ones(channels, dtype=np.float32))
+    speeds = [HDR_SHUTTER_SPEEDS[i % len(HDR_SHUTTER_SPEEDS)] for i in range(count)] if method == "hdr" else []
+    exposures = relative_exposures(speeds) if speeds else np.ones(count, dtype=np.float32)
+    for index in range(count):
+        noise = rng.normal(0.0, 0.03, size=scene.shape).astype(np.float32)
+        frame = np.clip((scene * 4.0 * exposures[index] if speeds else scene) + noise, 0.0, 1.0) * scale
+        frames[index] = frame if frames.dtype.kind == "f" else np.rint(frame)
+    return speeds
+
+async def run_method(engine: StackingEngine, method: str, args) -> Dict[str, float]:
+    dtype = STACK_DTYPES[args.dtype]
+    with engine.allocate(args.frames, args.height, args.width, args.channels, dtype) as frames:
+        speeds = synthetic_frames(frames.array, method, args.seed)
+        exposures = relative_exposures(speeds) if speeds else None
+        tonemap = method == "hdr" and args.tonemap
+
+        # Warm-up starts the pool's workers and faults in the shared pages
+        await engine.stack(frames, method, exposures, args.sigma, tonemap)
+        durations = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            await engine.stack(frames, method, exposures, args.sigma, tonemap)
+            durations.append(time.perf_counter() - start)
+
+    best = min(durations)
+    megapixels = args.width * args.height / 1e6
+    return {
+        "bestSeconds": round(best, 4),
+        "meanSeconds": round(sum(durations) / len(durations), 4),
+        "framesPerSecond": round(args.frames / best, 2),
+        "megapixelsPerSecond": round(args.frames * megapixels / best, 1),
+    }
+
+async def run(args) -> dict:
+    workers = args.workers or os.cpu_count() or 1
+    pool = BoundedExecutor("stacking", max_workers=workers, max_concurrency=workers * 2, use_processes=True, mp_context="spawn")
+    engines = {
+        "tiled": StackingEngine(pool, tile_rows=args.tile_rows, min_parallel_pixels=0),
+        # Inline merges the whole batch with NumPy on one thread
+        "single": StackingEngine(pool, min_parallel_pixels=args.width * args.height + 1),
+    }
+    results: Dict[str, Dict[str, dict]] = {}
+    try:
+        for method in args.methods:
+            results[method] = {}
+            for mode in args.modes:
+                results[method][mode] = await run_method(engines[mode], method, args)
+                print(f"{method:>10} {mode:>6}: {results[method][mode]['framesPerSecond']:8.2f} frames/s "
+                      f"({results[method][mode]['megapixelsPerSecond']:.1f} MP/s, best {results[method][mode]['bestSeconds']:.3f}s)")
+    finally:
+        pool.shutdown()
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "input": {
+            "frames": args.frames, "width": args.width, "height": args.height,
+            "channels": args.channels, "dtype": args.dtype,
+        },
+        "workers": workers,
+        "tileRows": args.tile_rows,
+        "repeat": args.repeat,
+        "methods": results,
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=8, help="Frames per stacked batch")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--channels", type=int, default=3)
+    parser.add_argument("--dtype", choices=list(STACK_DTYPES), default="uint16")
+    parser.add_argument("--methods", type=lambda value: value.split(","), default=list(STACK_METHODS),
+                        help="Comma-separated subset of " + ",".join(STACK_METHODS))
+    parser.add_argument("--modes", type=lambda value: value.split(","), default=["tiled", "single"],
+                        help="tiled (process pool over shared memory) and/or single (one process)")
+    parser.add_argument("--workers", type=int, default=0, help="Pool size (default: CPU count)")
+    parser.add_argument("--tile-rows", type=int, default=64)
+    parser.add_argument("--sigma", type=float, default=3.0)
+    parser.add_argument("--tonemap", action="store_true", help="Tone map HDR merges back to the input dtype")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Where to write the JSON results (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    unknown = [method for method in args.methods if method not in STACK_METHODS]
+    if unknown:
+        parser.error(f"Unknown methods: {', '.join(unknown)}")
+
+    results = asyncio.run(run(args))
+    output = Path(args.output) if args.output else RESULTS_DIR / f"stacking_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from typing import Optional
+from repositories.camera_repository import CameraRepository
+from repositories.memory_repository import InMemoryCameraRepository
+from repositories.motor_repository import MotorCameraRepository
+from services.events_service import EventBus, InProcessEventBus, ChangeStreamEventBus
+from services.metrics import MongoCommandMetrics, MongoPoolMetrics
+from services.profiling import SlowQueryListener
+import os
+
+_client: Optional[AsyncIOMotorClient] = None
+_repository: Optional[CameraRepository] = None
+_slow_query_listener: Optional[SlowQueryListener] = None
+_event_bus: Optional[EventBus] = None
+
+def get_slow_query_listener() -> SlowQueryListener:
+    """Get the listener that logs Mongo commands slower than SLOW_QUERY_MS"""
+    global _slow_query_listener
+    if _slow_query_listener is None:
+        _slow_query_listener = SlowQueryListener(
+            threshold_ms=float(os.environ.get('SLOW_QUERY_MS', 100)),
+            explain=os.environ.get('SLOW_QUERY_EXPLAIN', '1') == '1'
+        )
+    return _slow_query_listener
+
+def get_client() -> AsyncIOMotorClient:
+    """Get the process-wide MongoDB client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            os.environ['MONGO_URL'],
+            event_listeners=[MongoCommandMetrics(), MongoPoolMetrics(), get_slow_query_listener()]
+        )
+    return _client
+
+def get_database() -> AsyncIOMotorDatabase:
+    """Get the application database"""
+    return get_client()[os.environ['DB_NAME']]
+
+def uses_memory_storage() -> bool:
+    """Whether STORAGE_BACKEND selects the in-memory engine instead of MongoDB"""
+    return os.environ.get('STORAGE_BACKEND', 'mongo').lower() == 'memory'
+
+def get_repository() -> CameraRepository:
+    """Get the process-wide camera repository for the configured STORAGE_BACKEND"""
+    global _repository
+    if _repository is None:
+        if uses_memory_storage():
+            _repository = InMemoryCameraRepository()
+        else:
+            _repository = MotorCameraRepository(get_database())
+    return _repository
+
+def get_event_bus() -> EventBus:
+    """Get the process-wide event bus for the configured COORDINATION_BACKEND.
+
+    ``changestream`` (the default with Mongo storage) shares changes across
+    workers; ``local`` keeps them in this process.
+    """
+    global _event_bus
+    if _event_bus is None:
+        default_backend = 'local' if uses_memory_storage() else 'changestream'
+        if os.environ.get('COORDINATION_BACKEND', default_backend).lower() == 'changestream':
+            _event_bus = ChangeStreamEventBus(get_database())
+        else:
+            _event_bus = InProcessEventBus()
+    return _event_bus
+
+def close_client():
+    """Close the shared MongoDB client"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
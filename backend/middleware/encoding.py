@@ -0,0 +1,251 @@
+from contextvars import ContextVar
+from typing import Any, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import gzip
+import json
+import msgpack
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+COMPRESSIBLE_MEDIA_TYPES = (JSON_MEDIA_TYPE, *MSGPACK_MEDIA_TYPES, "text/")
+
+# Media type negotiated for the current request, read by NegotiatedJSONResponse
+_response_media_type: ContextVar[str] = ContextVar("response_media_type", default=JSON_MEDIA_TYPE)
+
+def _parse_quality_list(header: str) -> List[Tuple[str, float]]:
+    """Parse an Accept-style header into (token, q) pairs"""
+    items = []
+    for part in header.split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        items.append((token.lower(), quality))
+    return items
+
+def accepts_msgpack(accept: str) -> bool:
+    """Whether the client explicitly prefers MessagePack over JSON"""
+    qualities = dict(_parse_quality_list(accept))
+    msgpack_q = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    return msgpack_q > 0 and msgpack_q >= qualities.get(JSON_MEDIA_TYPE, 0.0)
+
+def choose_content_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick brotli or gzip from Accept-Encoding, preferring brotli when installed"""
+    qualities = dict(_parse_quality_list(accept_encoding))
+    wildcard = qualities.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_q:
+            best, best_q = encoding, quality
+    return best
+
+def msgpack_default(value: Any) -> Any:
+    raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+class NegotiatedJSONResponse(JSONResponse):
+    """JSON response that renders straight to MessagePack when the client asked for it"""
+
+    def render(self, content: Any) -> bytes:
+        if _response_media_type.get() == MSGPACK_MEDIA_TYPE:
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return msgpack.packb(content, use_bin_type=True, default=msgpack_default)
+        return super().render(content)
+
+class ContentEncodingMiddleware:
+    """Negotiates MessagePack and compression for API requests and responses.
+
+    Requests with a MessagePack body (or gzip/br Content-Encoding) are
+    decoded to JSON before they reach the routes. Responses are rendered as
+    MessagePack when ``Accept`` prefers it and compressed with brotli or
+    gzip once they exceed ``minimum_size`` bytes.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        path_prefixes: Tuple[str, ...] = ("/api/camera",),
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        max_request_body: int = 16 * 1024 * 1024,
+    ):
+        self.app = app
+        self.path_prefixes = path_prefixes
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.max_request_body = max_request_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        try:
+            scope, receive = await self._decode_request(scope, receive, request_headers)
+        except ValueError as e:
+            response = JSONResponse({"detail": str(e)}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        wants_msgpack = accepts_msgpack(request_headers.get("accept", ""))
+        content_encoding = choose_content_encoding(request_headers.get("accept-encoding", ""))
+        token = _response_media_type.set(MSGPACK_MEDIA_TYPE if wants_msgpack else JSON_MEDIA_TYPE)
+        try:
+            await self.app(scope, receive, _EncodingSender(self, send, wants_msgpack, content_encoding))
+        finally:
+            _response_media_type.reset(token)
+
+    async def _decode_request(self, scope: Scope, receive: Receive, headers: Headers) -> Tuple[Scope, Receive]:
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        content_encoding = headers.get("content-encoding", "").strip().lower()
+        is_msgpack = content_type in MSGPACK_MEDIA_TYPES
+        if not is_msgpack and content_encoding in ("", "identity"):
+            return scope, receive
+
+        body = await self._read_body(receive)
+        if content_encoding == "gzip" or (content_encoding == "br" and brotli is not None):
+            body = self._decompress(content_encoding, body)
+        elif content_encoding not in ("", "identity"):
+            raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+
+        new_headers = MutableHeaders(scope={"type": "http", "headers": list(scope["headers"])})
+        if "content-encoding" in new_headers:
+            del new_headers["content-encoding"]
+        if is_msgpack:
+            try:
+                payload = msgpack.unpackb(body, raw=False, timestamp=3)
+            except Exception:
+                raise ValueError("Malformed MessagePack request body")
+            body = json.dumps(payload, default=str).encode("utf-8")
+            new_headers["content-type"] = JSON_MEDIA_TYPE
+        new_headers["content-length"] = str(len(body))
+
+        # Mutate in place so outer middleware still sees what routing adds to the scope
+        scope["headers"] = new_headers.raw
+        delivered = False
+
+        async def replay_receive() -> Message:
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return scope, replay_receive
+
+    async def _read_body(self, receive: Receive) -> bytes:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_request_body:
+                raise ValueError("Request body too large")
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    def _decompress(self, encoding: str, body: bytes) -> bytes:
+        try:
+            if encoding == "br":
+                data = brotli.decompress(body)
+            else:
+                data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body, self.max_request_body + 1)
+        except Exception:
+            raise ValueError("Malformed compressed request body")
+        if len(data) > self.max_request_body:
+            raise ValueError("Request body too large")
+        return data
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+class _EncodingSender:
+    """Buffers one response and re-emits it transcoded and compressed"""
+
+    def __init__(self, middleware: ContentEncodingMiddleware, send: Send, wants_msgpack: bool, content_encoding: Optional[str]):
+        self.middleware = middleware
+        self.send = send
+        self.wants_msgpack = wants_msgpack
+        self.content_encoding = content_encoding
+        self.start_message: Optional[Message] = None
+        self.chunks: List[bytes] = []
+        self.passthrough = False
+
+    async def __call__(self, message: Message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if message["status"] in (204, 304) or "content-encoding" in headers:
+                self.passthrough = True
+                await self.send(message)
+            else:
+                self.start_message = message
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        self.chunks.append(message.get("body", b""))
+        if message.get("more_body", False):
+            return
+        await self._flush(b"".join(self.chunks))
+
+    async def _flush(self, body: bytes):
+        message = self.start_message
+        headers = MutableHeaders(raw=list(message["headers"]))
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        transformed = False
+
+        if self.wants_msgpack and media_type == JSON_MEDIA_TYPE and body:
+            # Fallback for responses not rendered by NegotiatedJSONResponse (e.g. errors)
+            body = msgpack.packb(json.loads(body), use_bin_type=True)
+            headers["content-type"] = MSGPACK_MEDIA_TYPE
+            media_type = MSGPACK_MEDIA_TYPE
+            transformed = True
+        elif media_type in MSGPACK_MEDIA_TYPES:
+            transformed = True
+
+        if (
+            self.content_encoding
+            and len(body) >= self.middleware.minimum_size
+            and media_type.startswith(COMPRESSIBLE_MEDIA_TYPES)
+        ):
+            body = self.middleware.compress(body, self.content_encoding)
+            headers["content-encoding"] = self.content_encoding
+            transformed = True
+
+        if transformed and "etag" in headers and not headers["etag"].startswith("W/"):
+            # The representation changed, so only a weak validator still holds
+            headers["etag"] = "W/" + headers["etag"]
+        headers.add_vary_header("Accept")
+        headers.add_vary_header("Accept-Encoding")
+        headers["content-length"] = str(len(body))
+
+        await self.send({**message, "headers": headers.raw})
+        await self.send({"type": "http.response.body", "body": body, "more_body": False})
@@ -0,0 +1,43 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+import time
+
+class MetricsMiddleware:
+    """Records per-route latency histograms, request counts and in-flight requests.
+
+    Requests are labelled with the matched route template (for example
+    ``/api/camera/settings/{settings_id}``) rather than the raw path, so
+    ids never blow up label cardinality.
+    """
+
+    def __init__(self, app: ASGIApp, excluded_paths: tuple = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": route.path if route is not None else "unmatched",
+                "status": str(status_code),
+            }
+            HTTP_REQUESTS.inc(**labels)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, **labels)
@@ -0,0 +1,70 @@
+from typing import Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.profiling import SLOW_LOG, LoopBlockingSampler, start_request_profile
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class ProfilingMiddleware:
+    """Logs requests slower than ``threshold_ms`` with their pydantic validation time.
+
+    When a LoopBlockingSampler is running, stacks it captured while the
+    request was in flight are attached to the slow-request entry.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        threshold_ms: float = 500.0,
+        sampler: Optional[LoopBlockingSampler] = None,
+        excluded_paths: tuple = ("/metrics",),
+    ):
+        self.app = app
+        self.threshold_ms = threshold_ms
+        self.sampler = sampler
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        profile = start_request_profile()
+        status_code = 500
+        start = time.monotonic()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = time.monotonic()
+            duration_ms = (end - start) * 1000
+            if duration_ms >= self.threshold_ms:
+                self._record(scope, status_code, duration_ms, profile["validation_s"] * 1000, start, end)
+
+    def _record(self, scope: Scope, status_code: int, duration_ms: float, validation_ms: float, start: float, end: float):
+        route = scope.get("route")
+        entry = {
+            "method": scope["method"],
+            "route": route.path if route is not None else "unmatched",
+            "path": scope["path"],
+            "status": status_code,
+            "durationMs": round(duration_ms, 2),
+            "validationMs": round(validation_ms, 2),
+        }
+        if self.sampler is not None:
+            samples = self.sampler.samples_between(start, end)
+            entry["blockedMs"] = round(max((s["blockedMs"] for s in samples), default=0.0), 1)
+            # Keep distinct stacks only; consecutive samples of one stall are identical
+            entry["blockingStacks"] = list(dict.fromkeys(s["stack"] for s in samples))[:3]
+        SLOW_LOG.record("requests", entry)
+        logger.warning(
+            "Slow request %s %s -> %s took %.1fms (validation %.1fms)",
+            entry["method"], entry["route"], status_code, duration_ms, validation_ms
+        )
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class DailyRecordingTotals(BaseModel):
+    day: str  # YYYY-MM-DD (UTC)
+    recordings: int
+    completed: int
+    failed: int
+    hours: float
+    fileSizeMB: float
+
+class DimensionTotals(BaseModel):
+    key: str
+    recordings: int
+    share: float  # fraction of recordings in the range
+    hours: float
+    fileSizeMB: float
+    averageDurationSeconds: float  # over completed recordings
+
+class RecordingAnalytics(BaseModel):
+    start: str  # first day, inclusive
+    end: str  # last day, inclusive
+    recordings: int
+    hours: float
+    fileSizeMB: float
+    days: List[DailyRecordingTotals]
+    byResolution: List[DimensionTotals]
+    byFrameRate: List[DimensionTotals]
+    byColorProfile: List[DimensionTotals]
+    rollupsThrough: Optional[str] = None  # days before this come from materialized rollups
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+class BatchOperation(BaseModel):
+    id: Optional[str] = None  # name later operations use in {"$ref": "<id>.<field>"}; defaults to the index
+    op: str  # createSettings, getSettings, updateSettings, deleteSettings, getStatus, updateStatus, startRecording, stopRecording, getRecording
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+    transactional: bool = False
+
+class BatchOperationResult(BaseModel):
+    id: str
+    op: str
+    status: int  # HTTP status the equivalent single call would have returned
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    transactional: bool
+    committed: bool  # False when a transactional batch was rolled back
+    results: List[BatchOperationResult]
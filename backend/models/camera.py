@@ -18,6 +18,7 @@ class CameraSettings(BaseModel):
     frameRate: str = Field(default="24p")
     colorProfile: str = Field(default="S-Log3")
     stabilization: bool = Field(default=True)
+    version: int = Field(default=1)  # incremented on every update; the preset's ETag
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
@@ -76,6 +77,7 @@ class CameraStatus(BaseModel):
     storageUsed: float = Field(default=23.5)  # GB used
     temperature: str = Field(default="Normal")  # Normal, Warning, Hot
     lastUpdate: datetime = Field(default_factory=datetime.utcnow)
+    sampledAt: Optional[datetime] = None  # time of the telemetry sample behind the readings
 
 class CameraCapabilities(BaseModel):
     modes: List[dict]
@@ -85,4 +87,10 @@ class CameraCapabilities(BaseModel):
     whiteBalanceOptions: List[dict]
     recordingFormats: List[str]
     frameRates: List[str]
-    colorProfiles: List[str]
\ No newline at end of file
+    colorProfiles: List[str]
+
+class CameraBootstrap(BaseModel):
+    capabilities: CameraCapabilities
+    status: CameraStatus
+    presets: List[CameraSettings]
+    activeRecording: Optional[Recording] = None
\ No newline at end of file
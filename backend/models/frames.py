@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List
+
+class FrameAppendResult(BaseModel):
+    recordingId: str
+    frameCount: int  # total frames stored for the recording
+    chunksWritten: int = Field(default=0)
+    chunkIndexes: List[int] = Field(default_factory=list)  # chunks stored by this append, in write order
+
+class FrameMetadataRange(BaseModel):
+    recordingId: str
+    start: int  # first frame, inclusive
+    end: int  # last frame, exclusive
+    columns: Dict[str, List[float]]
+
+class FrameColumnSummary(BaseModel):
+    min: List[float]
+    max: List[float]
+    mean: List[float]
+
+class FrameMetadataSummary(BaseModel):
+    recordingId: str
+    fps: int
+    start: int
+    end: int
+    seconds: List[int]  # second index (frame // fps) of each summary row
+    columns: Dict[str, FrameColumnSummary]
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+class TelemetryIngestResult(BaseModel):
+    cameraId: str
+    accepted: int = Field(default=0)  # samples stored
+    rejected: int = Field(default=0)  # samples dropped by range checks
+    buckets: int = Field(default=0)  # time-bucket documents written
@@ -0,0 +1,180 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncContextManager, List, Optional
+
+class CameraRepository(ABC):
+    """Storage interface behind CameraService.
+
+    Implementations exchange plain documents (dicts shaped like the models'
+    ``.dict()``) and must make every single call atomic: a conditional
+    update either applies to a document completely or not at all.
+    """
+
+    async def ensure_indexes(self):
+        """Create whatever indexes the backend needs; a no-op by default"""
+
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Take or renew a named lease so one process at a time runs a maintenance job.
+
+        Always succeeds by default, since a single-process store has no one to share with.
+        """
+        return True
+
+    @abstractmethod
+    def transaction(self) -> AsyncContextManager[None]:
+        """Async context manager under which calls from the current task commit or roll back together.
+
+        Calls inside must run one at a time, never concurrently.
+        """
+
+    async def migrate_legacy_ids(self, batch_size: int) -> int:
+        """Rewrite up to ``batch_size`` documents still keyed by a string ``id`` field; returns how many were processed"""
+        return 0
+
+    # Camera settings
+    @abstractmethod
+    async def insert_settings(self, settings_doc: dict):
+        ...
+
+    @abstractmethod
+    async def find_settings(self, settings_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list_settings(self, limit: int) -> List[dict]:
+        """Newest ``createdAt`` first"""
+
+    @abstractmethod
+    async def update_settings(self, settings_id: str, fields: dict, expected_versions: Optional[List[int]] = None) -> Optional[dict]:
+        """Set ``fields`` and bump ``version`` in one step; returns the updated preset.
+
+        With ``expected_versions`` the update only applies while the stored
+        version is one of them (presets saved before versioning count as 1).
+        Returns None if the preset is missing or the version did not match.
+        """
+
+    @abstractmethod
+    async def delete_settings(self, settings_id: str) -> bool:
+        ...
+
+    # Recordings
+    @abstractmethod
+    async def insert_recording(self, recording_doc: dict):
+        ...
+
+    @abstractmethod
+    async def find_recording(self, recording_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_active_recording(self) -> Optional[dict]:
+        """Most recently started recording whose status is still ``recording``"""
+
+    @abstractmethod
+    async def list_recordings(self, limit: int) -> List[dict]:
+        """Newest ``startTime`` first"""
+
+    @abstractmethod
+    async def complete_recording(self, recording_id: str, fields: dict) -> bool:
+        """Set ``fields`` only if the recording is still ``recording``; returns whether it applied"""
+
+    @abstractmethod
+    async def delete_recording(self, recording_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def find_recording_ids(self, status: str, started_before: datetime, limit: int) -> List[str]:
+        """Ids with ``status`` started before the cutoff, oldest first"""
+
+    @abstractmethod
+    async def delete_recordings(self, recording_ids: List[str], status: Optional[str] = None, started_before: Optional[datetime] = None) -> int:
+        """Delete recordings by id; with ``status``/``started_before`` only those still matching them"""
+
+    @abstractmethod
+    async def find_existing_recording_ids(self, recording_ids: List[str]) -> List[str]:
+        """The subset of ``recording_ids`` that are still stored"""
+
+    @abstractmethod
+    async def fail_recordings(self, recording_ids: List[str], end_time: datetime) -> int:
+        """Mark still-active recordings ``failed``; returns how many changed"""
+
+    @abstractmethod
+    async def complete_recordings_capped(self, recording_ids: List[str], now: datetime, max_seconds: float) -> int:
+        """Complete still-active recordings with duration capped at ``max_seconds``"""
+
+    @abstractmethod
+    async def delete_recording_media(self, recording_ids: List[str]) -> int:
+        """Delete media blobs and frame metadata chunks belonging to the recordings; returns how many were removed"""
+
+    # Per-frame metadata chunks
+    @abstractmethod
+    async def find_last_frame_chunk(self, recording_id: str) -> Optional[dict]:
+        """Highest ``chunkIndex`` chunk for the recording"""
+
+    @abstractmethod
+    async def save_frame_chunk(self, chunk_doc: dict, expected_count: Optional[int]) -> bool:
+        """Insert a new chunk (``expected_count`` None) or replace one still holding ``expected_count`` frames.
+
+        Returns False if another writer got there first.
+        """
+
+    @abstractmethod
+    async def find_frame_chunks(self, recording_id: str, first_index: int, last_index: int, fields: List[str]) -> List[dict]:
+        """Chunks with ``first_index <= chunkIndex <= last_index`` in order, carrying only the given columns"""
+
+    # Telemetry
+    @abstractmethod
+    async def insert_telemetry_buckets(self, bucket_docs: List[dict]):
+        """Store time-bucketed telemetry documents in one batch"""
+
+    # Recording analytics
+    @abstractmethod
+    async def aggregate_recording_groups(self, start: datetime, end: datetime) -> List[dict]:
+        """Totals for recordings started in [start, end), one row per UTC day, resolution, frame rate, color profile and status.
+
+        Rows carry ``day`` (YYYY-MM-DD), those dimensions, ``count``,
+        ``durationSeconds`` and ``fileSizeMB``.
+        """
+
+    @abstractmethod
+    async def materialize_recording_rollups(self, start: datetime, end: datetime, refreshed_at: datetime) -> int:
+        """Replace the stored daily rollups for [start, end) with fresh aggregates; returns the days written"""
+
+    @abstractmethod
+    async def find_recording_rollups(self, first_day: str, end_day: str) -> List[dict]:
+        """Stored daily rollups with ``first_day <= day < end_day`` in day order"""
+
+    @abstractmethod
+    async def find_rollup_watermark(self) -> Optional[datetime]:
+        """Start of the first day not yet materialized"""
+
+    @abstractmethod
+    async def set_rollup_watermark(self, closed_through: datetime):
+        ...
+
+    # Camera status
+    @abstractmethod
+    async def find_latest_status(self) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def update_status_if_newer(self, fields: dict, sampled_at: datetime) -> Optional[dict]:
+        """Apply telemetry readings unless the snapshot holds a sample at least as new; returns the updated snapshot or None"""
+        ...
+
+    @abstractmethod
+    async def insert_status(self, status_doc: dict):
+        ...
+
+    @abstractmethod
+    async def replace_status(self, status_doc: dict):
+        """Replace the stored status snapshot, creating it if needed"""
+
+    # Client status checks
+    @abstractmethod
+    async def insert_status_check(self, check_doc: dict):
+        ...
+
+    @abstractmethod
+    async def list_status_checks(self, limit: int) -> List[dict]:
+        """Status checks in insertion order"""
@@ -0,0 +1,51 @@
+from typing import Any, Iterable, List, Optional
+from bson.binary import Binary
+import uuid
+
+def storage_id(value: str) -> Any:
+    """Stored ``_id`` for an API id: 16-byte binary for UUIDs, the string itself otherwise"""
+    try:
+        return Binary.from_uuid(uuid.UUID(value))
+    except (ValueError, TypeError, AttributeError):
+        return value
+
+def api_id(value: Any) -> str:
+    """API id for a stored ``_id``"""
+    if isinstance(value, Binary) and value.subtype == 4:
+        return str(value.as_uuid())
+    return str(value)
+
+def to_storage(doc: dict) -> dict:
+    """Key a model-shaped document by ``_id`` instead of a string ``id`` field"""
+    stored = {"_id": storage_id(doc["id"])}
+    stored.update((key, value) for key, value in doc.items() if key not in ("id", "_id"))
+    return stored
+
+def from_storage(doc: Optional[dict]) -> Optional[dict]:
+    """Model-shaped document with a string ``id``; legacy documents keep theirs"""
+    if doc is None:
+        return None
+    doc = dict(doc)
+    stored_id = doc.pop("_id", None)
+    if "id" not in doc and stored_id is not None:
+        doc["id"] = api_id(stored_id)
+    return doc
+
+def id_filter(ids: Iterable[str], legacy: bool) -> dict:
+    """Match documents by API id; while legacy documents remain, also by their ``id`` field"""
+    ids = list(ids)
+    by_id = {"_id": storage_id(ids[0])} if len(ids) == 1 else {"_id": {"$in": [storage_id(i) for i in ids]}}
+    if not legacy:
+        return by_id
+    by_legacy = {"id": ids[0]} if len(ids) == 1 else {"id": {"$in": ids}}
+    return {"$or": [by_id, by_legacy]}
+
+def unique_by_id(docs: List[dict]) -> List[dict]:
+    """Drop the second copy of a document caught mid-migration"""
+    seen = set()
+    unique = []
+    for doc in docs:
+        if doc["id"] not in seen:
+            seen.add(doc["id"])
+            unique.append(doc)
+    return unique
@@ -0,0 +1,308 @@
+from bisect import bisect_left, insort
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from repositories.camera_repository import CameraRepository
+import copy
+
+class _SortedIndex:
+    """Ascending (key, id) pairs kept sorted with bisect"""
+
+    def __init__(self):
+        self.entries: List[Tuple[datetime, str]] = []
+
+    def add(self, key: datetime, doc_id: str):
+        insort(self.entries, (key, doc_id))
+
+    def remove(self, key: datetime, doc_id: str):
+        position = bisect_left(self.entries, (key, doc_id))
+        if position < len(self.entries) and self.entries[position] == (key, doc_id):
+            del self.entries[position]
+
+    def newest(self, limit: int) -> List[str]:
+        return [doc_id for _, doc_id in reversed(self.entries[-limit:])] if limit > 0 else []
+
+    def oldest_before(self, cutoff: datetime, limit: int) -> List[str]:
+        end = bisect_left(self.entries, (cutoff, ""))
+        return [doc_id for _, doc_id in self.entries[:min(end, limit)]]
+
+    def between(self, start: datetime, end: datetime) -> List[str]:
+        """Ids with ``start <= key < end`` in ascending order"""
+        first = bisect_left(self.entries, (start, ""))
+        last = bisect_left(self.entries, (end, ""))
+        return [doc_id for _, doc_id in self.entries[first:last]]
+
+class InMemoryCameraRepository(CameraRepository):
+    """CameraRepository held in process memory with the same semantics as the Motor backend.
+
+    Documents live in dicts keyed by id, with sorted indexes on
+    ``createdAt``, ``startTime`` and ``(status, startTime)``. Every method
+    runs to completion without awaiting, so each call is atomic with
+    respect to other coroutines on the event loop. Documents are copied on
+    the way in and out so callers can never mutate stored state.
+    """
+
+    def __init__(self):
+        self.settings: Dict[str, dict] = {}
+        self.settings_by_created = _SortedIndex()
+        self.recordings: Dict[str, dict] = {}
+        self.recordings_by_start = _SortedIndex()
+        self.recordings_by_status: Dict[str, _SortedIndex] = {}
+        # Media blobs keyed by recording id
+        self.media: Dict[str, List[bytes]] = {}
+        self.telemetry_buckets: List[dict] = []
+        # Frame metadata chunks keyed by recording id, then chunk index
+        self.frame_chunks: Dict[str, Dict[int, dict]] = {}
+        # Daily recording rollups keyed by day (YYYY-MM-DD)
+        self.rollups: Dict[str, dict] = {}
+        self.rollup_watermark: Optional[datetime] = None
+        self.status: Optional[dict] = None
+        self.status_checks: List[dict] = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Restore presets, recordings and status if the block raises.
+
+        Rollback restores a snapshot, so writes other requests made while
+        the block ran are undone too; this engine is for development and
+        benchmarks, not concurrent clients.
+        """
+        snapshot = copy.deepcopy((
+            self.settings, self.settings_by_created, self.recordings,
+            self.recordings_by_start, self.recordings_by_status, self.status,
+        ))
+        try:
+            yield
+        except BaseException:
+            (
+                self.settings, self.settings_by_created, self.recordings,
+                self.recordings_by_start, self.recordings_by_status, self.status,
+            ) = snapshot
+            raise
+
+    # Camera settings
+    async def insert_settings(self, settings_doc: dict):
+        if settings_doc["id"] in self.settings:
+            raise ValueError(f"Duplicate settings id: {settings_doc['id']}")
+        self.settings[settings_doc["id"]] = copy.deepcopy(settings_doc)
+        self.settings_by_created.add(settings_doc["createdAt"], settings_doc["id"])
+
+    async def find_settings(self, settings_id: str) -> Optional[dict]:
+        return copy.deepcopy(self.settings.get(settings_id))
+
+    async def list_settings(self, limit: int) -> List[dict]:
+        return [copy.deepcopy(self.settings[i]) for i in self.settings_by_created.newest(limit)]
+
+    async def update_settings(self, settings_id: str, fields: dict, expected_versions: Optional[List[int]] = None) -> Optional[dict]:
+        doc = self.settings.get(settings_id)
+        if doc is None or (expected_versions is not None and doc.get("version", 1) not in expected_versions):
+            return None
+        if "createdAt" in fields:
+            self.settings_by_created.remove(doc["createdAt"], settings_id)
+            self.settings_by_created.add(fields["createdAt"], settings_id)
+        doc.update(copy.deepcopy(fields))
+        doc["version"] = doc.get("version", 1) + 1
+        return copy.deepcopy(doc)
+
+    async def delete_settings(self, settings_id: str) -> bool:
+        doc = self.settings.pop(settings_id, None)
+        if doc is None:
+            return False
+        self.settings_by_created.remove(doc["createdAt"], settings_id)
+        return True
+
+    # Recordings
+    async def insert_recording(self, recording_doc: dict):
+        if recording_doc["id"] in self.recordings:
+            raise ValueError(f"Duplicate recording id: {recording_doc['id']}")
+        doc = copy.deepcopy(recording_doc)
+        self.recordings[doc["id"]] = doc
+        self.recordings_by_start.add(doc["startTime"], doc["id"])
+        self._status_index(doc["status"]).add(doc["startTime"], doc["id"])
+
+    async def find_recording(self, recording_id: str) -> Optional[dict]:
+        return copy.deepcopy(self.recordings.get(recording_id))
+
+    async def find_active_recording(self) -> Optional[dict]:
+        active = self._status_index("recording").newest(1)
+        return copy.deepcopy(self.recordings[active[0]]) if active else None
+
+    async def list_recordings(self, limit: int) -> List[dict]:
+        return [copy.deepcopy(self.recordings[i]) for i in self.recordings_by_start.newest(limit)]
+
+    async def complete_recording(self, recording_id: str, fields: dict) -> bool:
+        doc = self.recordings.get(recording_id)
+        if doc is None or doc["status"] != "recording":
+            return False
+        self._update_recording(doc, copy.deepcopy(fields))
+        return True
+
+    async def delete_recording(self, recording_id: str) -> bool:
+        return await self.delete_recordings([recording_id]) > 0
+
+    async def find_recording_ids(self, status: str, started_before: datetime, limit: int) -> List[str]:
+        return self._status_index(status).oldest_before(started_before, limit)
+
+    async def delete_recordings(self, recording_ids: List[str], status: Optional[str] = None, started_before: Optional[datetime] = None) -> int:
+        deleted = 0
+        for recording_id in recording_ids:
+            doc = self.recordings.get(recording_id)
+            if doc is None or (status is not None and doc["status"] != status):
+                continue
+            if started_before is not None and doc["startTime"] >= started_before:
+                continue
+            del self.recordings[recording_id]
+            self.recordings_by_start.remove(doc["startTime"], recording_id)
+            self._status_index(doc["status"]).remove(doc["startTime"], recording_id)
+            deleted += 1
+        return deleted
+
+    async def find_existing_recording_ids(self, recording_ids: List[str]) -> List[str]:
+        return [recording_id for recording_id in recording_ids if recording_id in self.recordings]
+
+    async def fail_recordings(self, recording_ids: List[str], end_time: datetime) -> int:
+        changed = 0
+        for recording_id in recording_ids:
+            doc = self.recordings.get(recording_id)
+            if doc is not None and doc["status"] == "recording":
+                self._update_recording(doc, {"status": "failed", "endTime": end_time})
+                changed += 1
+        return changed
+
+    async def complete_recordings_capped(self, recording_ids: List[str], now: datetime, max_seconds: float) -> int:
+        changed = 0
+        for recording_id in recording_ids:
+            doc = self.recordings.get(recording_id)
+            if doc is None or doc["status"] != "recording":
+                continue
+            end_time = min(doc["startTime"] + timedelta(seconds=max_seconds), now)
+            duration = (end_time - doc["startTime"]).total_seconds()
+            self._update_recording(doc, {
+                "endTime": end_time,
+                "duration": duration,
+                "fileSize": duration * 0.5,
+                "status": "completed"
+            })
+            changed += 1
+        return changed
+
+    async def delete_recording_media(self, recording_ids: List[str]) -> int:
+        return sum(
+            len(self.media.pop(recording_id, [])) + len(self.frame_chunks.pop(recording_id, {}))
+            for recording_id in recording_ids
+        )
+
+    # Per-frame metadata chunks
+    async def find_last_frame_chunk(self, recording_id: str) -> Optional[dict]:
+        chunks = self.frame_chunks.get(recording_id)
+        if not chunks:
+            return None
+        return copy.deepcopy(chunks[max(chunks)])
+
+    async def save_frame_chunk(self, chunk_doc: dict, expected_count: Optional[int]) -> bool:
+        chunks = self.frame_chunks.setdefault(chunk_doc["recordingId"], {})
+        existing = chunks.get(chunk_doc["chunkIndex"])
+        if expected_count is None and existing is not None:
+            return False
+        if expected_count is not None and (existing is None or existing["count"] != expected_count):
+            return False
+        chunks[chunk_doc["chunkIndex"]] = copy.deepcopy(chunk_doc)
+        return True
+
+    async def find_frame_chunks(self, recording_id: str, first_index: int, last_index: int, fields: List[str]) -> List[dict]:
+        chunks = self.frame_chunks.get(recording_id, {})
+        return [
+            {
+                "chunkIndex": index,
+                "startFrame": chunks[index]["startFrame"],
+                "count": chunks[index]["count"],
+                "columns": {name: chunks[index]["columns"][name] for name in fields},
+            }
+            for index in sorted(chunks)
+            if first_index <= index <= last_index
+        ]
+
+    # Telemetry
+    async def insert_telemetry_buckets(self, bucket_docs: List[dict]):
+        self.telemetry_buckets.extend(copy.deepcopy(bucket_docs))
+
+    # Recording analytics
+    async def aggregate_recording_groups(self, start: datetime, end: datetime) -> List[dict]:
+        groups: Dict[tuple, dict] = {}
+        for recording_id in self.recordings_by_start.between(start, end):
+            doc = self.recordings[recording_id]
+            key = (
+                f"{doc['startTime']:%Y-%m-%d}",
+                doc["resolution"],
+                doc["frameRate"],
+                doc["settings"].get("colorProfile") or "unknown",
+                doc["status"],
+            )
+            row = groups.get(key)
+            if row is None:
+                row = groups[key] = dict(zip(("day", "resolution", "frameRate", "colorProfile", "status"), key),
+                                         count=0, durationSeconds=0.0, fileSizeMB=0.0)
+            row["count"] += 1
+            row["durationSeconds"] += doc["duration"]
+            row["fileSizeMB"] += doc["fileSize"]
+        return list(groups.values())
+
+    async def materialize_recording_rollups(self, start: datetime, end: datetime, refreshed_at: datetime) -> int:
+        first_day, end_day = f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}"
+        for day in [day for day in self.rollups if first_day <= day < end_day]:
+            del self.rollups[day]
+        for row in await self.aggregate_recording_groups(start, end):
+            day = row.pop("day")
+            rollup = self.rollups.setdefault(day, {"_id": day, "day": day, "recordings": 0, "groups": [], "refreshedAt": refreshed_at})
+            rollup["recordings"] += row["count"]
+            rollup["groups"].append(row)
+        return sum(1 for day in self.rollups if first_day <= day < end_day)
+
+    async def find_recording_rollups(self, first_day: str, end_day: str) -> List[dict]:
+        return [copy.deepcopy(self.rollups[day]) for day in sorted(self.rollups) if first_day <= day < end_day]
+
+    async def find_rollup_watermark(self) -> Optional[datetime]:
+        return self.rollup_watermark
+
+    async def set_rollup_watermark(self, closed_through: datetime):
+        self.rollup_watermark = closed_through
+
+    # Camera status
+    async def find_latest_status(self) -> Optional[dict]:
+        return copy.deepcopy(self.status)
+
+    async def update_status_if_newer(self, fields: dict, sampled_at: datetime) -> Optional[dict]:
+        if self.status is None or (self.status.get("sampledAt") is not None and self.status["sampledAt"] >= sampled_at):
+            return None
+        self.status.update(copy.deepcopy(fields), sampledAt=sampled_at)
+        return copy.deepcopy(self.status)
+
+    async def insert_status(self, status_doc: dict):
+        if self.status is None or status_doc["lastUpdate"] >= self.status["lastUpdate"]:
+            self.status = copy.deepcopy(status_doc)
+
+    async def replace_status(self, status_doc: dict):
+        self.status = copy.deepcopy(status_doc)
+
+    # Client status checks
+    async def insert_status_check(self, check_doc: dict):
+        self.status_checks.append(copy.deepcopy(check_doc))
+
+    async def list_status_checks(self, limit: int) -> List[dict]:
+        return copy.deepcopy(self.status_checks[:limit])
+
+    def _status_index(self, status: str) -> _SortedIndex:
+        index = self.recordings_by_status.get(status)
+        if index is None:
+            index = self.recordings_by_status[status] = _SortedIndex()
+        return index
+
+    def _update_recording(self, doc: dict, fields: dict):
+        """Apply fields to a stored recording, keeping the sorted indexes in step"""
+        old_key = (doc["startTime"], doc["status"])
+        doc.update(fields)
+        if old_key != (doc["startTime"], doc["status"]):
+            self.recordings_by_start.remove(old_key[0], doc["id"])
+            self._status_index(old_key[1]).remove(old_key[0], doc["id"])
+            self.recordings_by_start.add(doc["startTime"], doc["id"])
+            self._status_index(doc["status"]).add(doc["startTime"], doc["id"])
@@ -0,0 +1,389 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorClientSession, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from repositories.camera_repository import CameraRepository
+from repositories.document_ids import from_storage, id_filter, storage_id, to_storage, unique_by_id
+
+# Partial unique index on the pre-migration string id field
+LEGACY_ID_INDEX = "legacy_id"
+
+# Session of the transaction the current task is running in, if any
+_session: ContextVar[Optional[AsyncIOMotorClientSession]] = ContextVar("mongo_session", default=None)
+
+class MotorCameraRepository(CameraRepository):
+    """CameraRepository backed by MongoDB collections through Motor.
+
+    Presets, recordings and status checks are keyed by their UUID stored in
+    ``_id`` as 16-byte binary; documents exchanged with CameraService keep
+    the string ``id``. Until ``migrate_legacy_ids`` has rewritten documents
+    written with a separate ``id`` field, lookups match either form.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.settings_collection = db.camera_settings
+        self.recordings_collection = db.recordings
+        self.status_collection = db.camera_status
+        self.telemetry_collection = db.telemetry_buckets
+        self.frames_collection = db.recording_frames
+        # Daily recording rollups keyed by day (YYYY-MM-DD) and their refresh watermark
+        self.rollups_collection = db.recording_rollups
+        self.analytics_state_collection = db.analytics_state
+        # GridFS bucket holding media blobs tagged with metadata.recordingId
+        self.media_files_collection = db["recording_media.files"]
+        self.media_chunks_collection = db["recording_media.chunks"]
+        self.status_checks_collection = db.status_checks
+        self.leases_collection = db.leases
+        # Collections that may still hold documents with a string id field
+        self._legacy: Dict[str, bool] = {}
+
+    async def ensure_indexes(self):
+        """Create the indexes used by listing, retention and cleanup queries"""
+        for collection in (self.settings_collection, self.recordings_collection, self.status_checks_collection):
+            await self._ensure_legacy_id_index(collection)
+        await self.settings_collection.create_index([("createdAt", -1)])
+        await self.recordings_collection.create_index([("startTime", -1)])
+        await self.recordings_collection.create_index([("status", 1), ("startTime", 1)])
+        await self.media_files_collection.create_index("metadata.recordingId")
+        await self.telemetry_collection.create_index([("cameraId", 1), ("bucketStart", 1)])
+        await self.frames_collection.create_index([("recordingId", 1), ("chunkIndex", 1)], unique=True)
+
+    async def _ensure_legacy_id_index(self, collection: AsyncIOMotorCollection):
+        """Replace the full unique ``id`` index with a partial one covering unmigrated documents only"""
+        if "id_1" in await collection.index_information():
+            # It would reject every second document keyed only by _id
+            await collection.drop_index("id_1")
+        # Stays empty once migrated, but keeps $or lookups from workers still in legacy mode indexed
+        await collection.create_index(
+            "id", name=LEGACY_ID_INDEX, unique=True, partialFilterExpression={"id": {"$exists": True}}
+        )
+        self._legacy[collection.name] = await collection.find_one({"id": {"$exists": True}}, {"_id": 1}) is not None
+
+    def _match(self, collection: AsyncIOMotorCollection, ids: List[str]) -> dict:
+        return id_filter(ids, self._legacy.get(collection.name, True))
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Run the block in a multi-document transaction (needs a replica set).
+
+        The session travels in a context variable, so the preset, recording
+        and status methods join it without extra arguments.
+        """
+        async with await self.db.client.start_session() as session:
+            async with session.start_transaction():
+                token = _session.set(session)
+                try:
+                    yield
+                finally:
+                    _session.reset(token)
+
+    # Maintenance
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.leases_collection.update_one(
+                {"_id": name, "$or": [{"owner": owner}, {"expiresAt": {"$lt": now}}]},
+                {"$set": {"owner": owner, "expiresAt": now + timedelta(seconds=ttl_seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False  # Held by another live owner, so the upsert collided with its document
+        return True
+
+    async def migrate_legacy_ids(self, batch_size: int) -> int:
+        processed = 0
+        for collection in (self.settings_collection, self.recordings_collection, self.status_checks_collection):
+            if processed >= batch_size:
+                break
+            processed += await self._migrate_collection_batch(collection, batch_size - processed)
+        return processed
+
+    async def _migrate_collection_batch(self, collection: AsyncIOMotorCollection, limit: int) -> int:
+        """Copy legacy documents under their binary _id, then delete each original only if it is unchanged.
+
+        An original that was updated or deleted after it was read loses its
+        copy instead, so updated ones are retried by a later batch and
+        deleted ones stay deleted. Callers must hold the migration lease.
+        """
+        legacy_docs = await collection.find({"id": {"$exists": True}}).limit(limit).to_list(length=limit)
+        if not legacy_docs:
+            self._legacy[collection.name] = False
+            return 0
+        await collection.bulk_write(
+            [ReplaceOne({"_id": storage_id(doc["id"])}, to_storage(doc), upsert=True) for doc in legacy_docs],
+            ordered=False
+        )
+        for doc in legacy_docs:
+            result = await collection.delete_one(doc)
+            if not result.deleted_count:
+                await collection.delete_one({"_id": storage_id(doc["id"])})
+        return len(legacy_docs)
+
+    # Camera settings
+    async def insert_settings(self, settings_doc: dict):
+        await self.settings_collection.insert_one(to_storage(settings_doc), session=_session.get())
+
+    async def find_settings(self, settings_id: str) -> Optional[dict]:
+        return from_storage(await self.settings_collection.find_one(
+            self._match(self.settings_collection, [settings_id]), session=_session.get()
+        ))
+
+    async def list_settings(self, limit: int) -> List[dict]:
+        cursor = self.settings_collection.find().sort("createdAt", -1).limit(limit)
+        return unique_by_id([from_storage(doc) for doc in await cursor.to_list(length=limit)])
+
+    async def update_settings(self, settings_id: str, fields: dict, expected_versions: Optional[List[int]] = None) -> Optional[dict]:
+        query = self._match(self.settings_collection, [settings_id])
+        if expected_versions is not None:
+            # A missing version field is version 1, and $in with None matches it
+            query["version"] = {"$in": expected_versions + [None] if 1 in expected_versions else expected_versions}
+        # Pipeline form so presets without a version field go from 1 to 2; values are wrapped as literals
+        return from_storage(await self.settings_collection.find_one_and_update(
+            query,
+            [{"$set": {
+                **{key: {"$literal": value} for key, value in fields.items()},
+                "version": {"$add": [{"$ifNull": ["$version", 1]}, 1]},
+            }}],
+            return_document=ReturnDocument.AFTER,
+            session=_session.get()
+        ))
+
+    async def delete_settings(self, settings_id: str) -> bool:
+        # delete_many so a copy caught mid-migration goes too
+        result = await self.settings_collection.delete_many(
+            self._match(self.settings_collection, [settings_id]), session=_session.get()
+        )
+        return result.deleted_count > 0
+
+    # Recordings
+    async def insert_recording(self, recording_doc: dict):
+        await self.recordings_collection.insert_one(to_storage(recording_doc), session=_session.get())
+
+    async def find_recording(self, recording_id: str) -> Optional[dict]:
+        return from_storage(await self.recordings_collection.find_one(
+            self._match(self.recordings_collection, [recording_id]), session=_session.get()
+        ))
+
+    async def find_active_recording(self) -> Optional[dict]:
+        return from_storage(await self.recordings_collection.find_one(
+            {"status": "recording"},
+            sort=[("startTime", -1)],
+            session=_session.get()
+        ))
+
+    async def list_recordings(self, limit: int) -> List[dict]:
+        cursor = self.recordings_collection.find().sort("startTime", -1).limit(limit)
+        return unique_by_id([from_storage(doc) for doc in await cursor.to_list(length=limit)])
+
+    async def complete_recording(self, recording_id: str, fields: dict) -> bool:
+        result = await self.recordings_collection.update_one(
+            {**self._match(self.recordings_collection, [recording_id]), "status": "recording"},
+            {"$set": fields},
+            session=_session.get()
+        )
+        return result.modified_count > 0
+
+    async def delete_recording(self, recording_id: str) -> bool:
+        result = await self.recordings_collection.delete_many(self._match(self.recordings_collection, [recording_id]))
+        return result.deleted_count > 0
+
+    async def find_recording_ids(self, status: str, started_before: datetime, limit: int) -> List[str]:
+        cursor = self.recordings_collection.find(
+            {"status": status, "startTime": {"$lt": started_before}},
+            {"_id": 1, "id": 1}
+        ).sort("startTime", 1).limit(limit)
+        return [doc["id"] for doc in unique_by_id([from_storage(doc) for doc in await cursor.to_list(length=limit)])]
+
+    async def delete_recordings(self, recording_ids: List[str], status: Optional[str] = None, started_before: Optional[datetime] = None) -> int:
+        query = self._match(self.recordings_collection, recording_ids)
+        if status is not None:
+            query["status"] = status
+        if started_before is not None:
+            query["startTime"] = {"$lt": started_before}
+        result = await self.recordings_collection.delete_many(query)
+        return result.deleted_count
+
+    async def find_existing_recording_ids(self, recording_ids: List[str]) -> List[str]:
+        cursor = self.recordings_collection.find(self._match(self.recordings_collection, recording_ids), {"_id": 1, "id": 1})
+        return [doc["id"] for doc in unique_by_id([from_storage(doc) for doc in await cursor.to_list(length=None)])]
+
+    async def fail_recordings(self, recording_ids: List[str], end_time: datetime) -> int:
+        result = await self.recordings_collection.update_many(
+            {**self._match(self.recordings_collection, recording_ids), "status": "recording"},
+            {"$set": {"status": "failed", "endTime": end_time}}
+        )
+        return result.modified_count
+
+    async def complete_recordings_capped(self, recording_ids: List[str], now: datetime, max_seconds: float) -> int:
+        cap_ms = int(max_seconds * 1000)
+        result = await self.recordings_collection.update_many(
+            {**self._match(self.recordings_collection, recording_ids), "status": "recording"},
+            [
+                {"$set": {"endTime": {"$min": [{"$add": ["$startTime", cap_ms]}, now]}}},
+                {"$set": {
+                    "duration": {"$divide": [{"$subtract": ["$endTime", "$startTime"]}, 1000]},
+                    "status": "completed"
+                }},
+                {"$set": {"fileSize": {"$multiply": ["$duration", 0.5]}}}
+            ]
+        )
+        return result.modified_count
+
+    async def delete_recording_media(self, recording_ids: List[str]) -> int:
+        frames = await self.frames_collection.delete_many({"recordingId": {"$in": recording_ids}})
+        cursor = self.media_files_collection.find(
+            {"metadata.recordingId": {"$in": recording_ids}},
+            {"_id": 1}
+        )
+        file_ids = [doc["_id"] for doc in await cursor.to_list(length=None)]
+        if not file_ids:
+            return frames.deleted_count
+        # Chunks first, so an interrupted delete can still find them through the file entries on retry
+        await self.media_chunks_collection.delete_many({"files_id": {"$in": file_ids}})
+        result = await self.media_files_collection.delete_many({"_id": {"$in": file_ids}})
+        return frames.deleted_count + result.deleted_count
+
+    # Per-frame metadata chunks
+    async def find_last_frame_chunk(self, recording_id: str) -> Optional[dict]:
+        return await self.frames_collection.find_one(
+            {"recordingId": recording_id},
+            sort=[("chunkIndex", -1)]
+        )
+
+    async def save_frame_chunk(self, chunk_doc: dict, expected_count: Optional[int]) -> bool:
+        if expected_count is None:
+            try:
+                await self.frames_collection.insert_one(dict(chunk_doc))
+            except DuplicateKeyError:
+                return False
+            return True
+        result = await self.frames_collection.replace_one(
+            {"recordingId": chunk_doc["recordingId"], "chunkIndex": chunk_doc["chunkIndex"], "count": expected_count},
+            chunk_doc
+        )
+        return result.matched_count > 0
+
+    async def find_frame_chunks(self, recording_id: str, first_index: int, last_index: int, fields: List[str]) -> List[dict]:
+        projection = {"_id": 0, "chunkIndex": 1, "startFrame": 1, "count": 1}
+        projection.update({f"columns.{name}": 1 for name in fields})
+        cursor = self.frames_collection.find(
+            {"recordingId": recording_id, "chunkIndex": {"$gte": first_index, "$lte": last_index}},
+            projection
+        ).sort("chunkIndex", 1)
+        return await cursor.to_list(length=None)
+
+    # Telemetry
+    async def insert_telemetry_buckets(self, bucket_docs: List[dict]):
+        await self.telemetry_collection.insert_many(bucket_docs, ordered=False)
+
+    # Recording analytics
+    @staticmethod
+    def _recording_groups_pipeline(start: datetime, end: datetime) -> List[dict]:
+        # The startTime range is served by the startTime index
+        return [
+            {"$match": {"startTime": {"$gte": start, "$lt": end}}},
+            {"$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$startTime"}},
+                    "resolution": "$resolution",
+                    "frameRate": "$frameRate",
+                    "colorProfile": {"$ifNull": ["$settings.colorProfile", "unknown"]},
+                    "status": "$status",
+                },
+                "count": {"$sum": 1},
+                "durationSeconds": {"$sum": "$duration"},
+                "fileSizeMB": {"$sum": "$fileSize"},
+            }},
+        ]
+
+    async def aggregate_recording_groups(self, start: datetime, end: datetime) -> List[dict]:
+        pipeline = self._recording_groups_pipeline(start, end) + [
+            {"$project": {
+                "_id": 0,
+                "day": "$_id.day",
+                "resolution": "$_id.resolution",
+                "frameRate": "$_id.frameRate",
+                "colorProfile": "$_id.colorProfile",
+                "status": "$_id.status",
+                "count": 1,
+                "durationSeconds": 1,
+                "fileSizeMB": 1,
+            }},
+        ]
+        return await self.recordings_collection.aggregate(pipeline).to_list(length=None)
+
+    async def materialize_recording_rollups(self, start: datetime, end: datetime, refreshed_at: datetime) -> int:
+        first_day, end_day = f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}"
+        # Days that no longer have any recordings would otherwise keep their old rollup
+        await self.rollups_collection.delete_many({"_id": {"$gte": first_day, "$lt": end_day}})
+        pipeline = self._recording_groups_pipeline(start, end) + [
+            {"$group": {
+                "_id": "$_id.day",
+                "recordings": {"$sum": "$count"},
+                "groups": {"$push": {
+                    "resolution": "$_id.resolution",
+                    "frameRate": "$_id.frameRate",
+                    "colorProfile": "$_id.colorProfile",
+                    "status": "$_id.status",
+                    "count": "$count",
+                    "durationSeconds": "$durationSeconds",
+                    "fileSizeMB": "$fileSizeMB",
+                }},
+            }},
+            {"$set": {"day": "$_id", "refreshedAt": refreshed_at}},
+            {"$merge": {"into": self.rollups_collection.name, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]
+        await self.recordings_collection.aggregate(pipeline).to_list(length=None)
+        return await self.rollups_collection.count_documents({"_id": {"$gte": first_day, "$lt": end_day}})
+
+    async def find_recording_rollups(self, first_day: str, end_day: str) -> List[dict]:
+        cursor = self.rollups_collection.find({"_id": {"$gte": first_day, "$lt": end_day}}).sort("_id", 1)
+        return await cursor.to_list(length=None)
+
+    async def find_rollup_watermark(self) -> Optional[datetime]:
+        state = await self.analytics_state_collection.find_one({"_id": "recording_rollups"})
+        return state["closedThrough"] if state else None
+
+    async def set_rollup_watermark(self, closed_through: datetime):
+        await self.analytics_state_collection.update_one(
+            {"_id": "recording_rollups"},
+            {"$set": {"closedThrough": closed_through}},
+            upsert=True
+        )
+
+    # Camera status
+    async def find_latest_status(self) -> Optional[dict]:
+        return await self.status_collection.find_one({}, sort=[("lastUpdate", -1)], session=_session.get())
+
+    async def update_status_if_newer(self, fields: dict, sampled_at: datetime) -> Optional[dict]:
+        return await self.status_collection.find_one_and_update(
+            # A null filter also matches snapshots without a sample yet
+            {"$or": [{"sampledAt": None}, {"sampledAt": {"$lt": sampled_at}}]},
+            {"$set": {**fields, "sampledAt": sampled_at}},
+            sort=[("lastUpdate", -1)],
+            return_document=ReturnDocument.AFTER,
+            session=_session.get()
+        )
+
+    async def insert_status(self, status_doc: dict):
+        await self.status_collection.insert_one(dict(status_doc), session=_session.get())
+
+    async def replace_status(self, status_doc: dict):
+        await self.status_collection.replace_one(
+            {},  # Match any document
+            status_doc,
+            upsert=True,
+            session=_session.get()
+        )
+
+    # Client status checks
+    async def insert_status_check(self, check_doc: dict):
+        await self.status_checks_collection.insert_one(to_storage(check_doc))
+
+    async def list_status_checks(self, limit: int) -> List[dict]:
+        docs = await self.status_checks_collection.find().limit(limit).to_list(length=limit)
+        return unique_by_id([from_storage(doc) for doc in docs])
@@ -0,0 +1,39 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from models.analytics import RecordingAnalytics
+from services.analytics_service import AnalyticsService
+from database import get_repository
+from middleware.encoding import NegotiatedJSONResponse
+
+router = APIRouter(prefix="/camera/analytics", tags=["analytics"], default_response_class=NegotiatedJSONResponse)
+
+# Longest range a single report may cover
+MAX_REPORT_DAYS = 366
+
+def get_analytics_service() -> AnalyticsService:
+    return AnalyticsService(get_repository())
+
+@router.get("/recordings", response_model=RecordingAnalytics)
+async def get_recording_analytics(
+    start: Optional[date] = Query(None, description="First day (UTC), default 29 days before end"),
+    end: Optional[date] = Query(None, description="Last day (UTC), inclusive, default today"),
+    analytics_service: AnalyticsService = Depends(get_analytics_service)
+):
+    """Recording hours per day and totals by resolution, frame rate and color profile"""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Ranges are limited to {MAX_REPORT_DAYS} days")
+    return await analytics_service.recording_analytics(start, end)
+
+@router.post("/rollups/refresh")
+async def refresh_recording_rollups(
+    rebuild_from: Optional[date] = Query(None, alias="rebuildFrom", description="Recompute closed days from this day onwards"),
+    analytics_service: AnalyticsService = Depends(get_analytics_service)
+):
+    """Materialize newly closed days, or rebuild rollups from a given day"""
+    days = await analytics_service.refresh_rollups(rebuild_from=rebuild_from)
+    return {"daysMaterialized": days}
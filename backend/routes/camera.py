@@ -1,59 +1,171 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
-from models.camera import CameraSettings, CameraSettingsCreate, CameraSettingsUpdate, Recording, RecordingCreate, CameraStatus, CameraCapabilities
-from services.camera_service import CameraService
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response, WebSocket
+from fastapi.encoders import jsonable_encoder
+from typing import Any, Awaitable, Callable, List, Optional
+from models.camera import CameraSettings, CameraSettingsCreate, CameraSettingsUpdate, Recording, RecordingCreate, CameraStatus, CameraCapabilities, CameraBootstrap
+from services.camera_service import CameraService, SettingsVersionConflictError
+from services.batch_service import BatchService, BatchValidationError, TransactionsUnsupportedError
+from models.batch import BatchRequest, BatchResponse
+from services.idempotency_service import IdempotencyStore, IdempotencyConflictError, IdempotencyInProgressError
+from services.events_service import CHANNELS, STATUS_CHANNEL
+from database import get_database, get_event_bus, get_repository, uses_memory_storage
+from middleware.encoding import NegotiatedJSONResponse
+from services.metrics import record_cache_lookup
+import asyncio
+import hashlib
+import json
 import os
 
-router = APIRouter(prefix="/camera", tags=["camera"])
+router = APIRouter(prefix="/camera", tags=["camera"], default_response_class=NegotiatedJSONResponse)
+
+_idempotency_store: Optional[IdempotencyStore] = None
 
 def get_camera_service() -> CameraService:
-    from motor.motor_asyncio import AsyncIOMotorClient
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[os.environ['DB_NAME']]
-    return CameraService(db)
+    return CameraService(get_repository(), get_event_bus())
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _idempotency_store
+    if _idempotency_store is None:
+        _idempotency_store = IdempotencyStore(
+            None if uses_memory_storage() else get_database().idempotency_keys,
+            ttl_seconds=int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400)),
+            lease_seconds=float(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 10))
+        )
+    return _idempotency_store
+
+async def run_idempotent(
+    store: IdempotencyStore,
+    idempotency_key: Optional[str],
+    scope: str,
+    payload: Any,
+    response: Response,
+    operation: Callable[[], Awaitable[Any]],
+) -> Any:
+    """Run a write once per Idempotency-Key, replaying the stored response on retries"""
+    if not idempotency_key:
+        return await operation()
+    try:
+        body, replayed = await store.execute(idempotency_key, scope, payload, operation)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
+
+def compute_etag(content: Any) -> str:
+    """Strong ETag over the canonical JSON encoding of a response body"""
+    encoded = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha1(encoded.encode("utf-8")).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def conditional_json_response(content: Any, if_none_match: Optional[str]) -> Response:
+    """Return the body with an ETag, or 304 when the client's copy is current"""
+    content = jsonable_encoder(content)
+    etag = compute_etag(content)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match:
+        # Conditional GETs act as a client-side cache; count how often it is still valid
+        record_cache_lookup("etag", etag_matches(if_none_match, etag))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return NegotiatedJSONResponse(content=content, headers=headers)
+
+def settings_etag(settings: Any) -> str:
+    """Presets are versioned, so the version alone identifies a representation"""
+    version = settings["version"] if isinstance(settings, dict) else settings.version
+    return f'"{version}"'
+
+def parse_if_match(if_match: Optional[str]) -> Optional[List[int]]:
+    """Versions named by an If-Match header; None means no precondition (absent or ``*``).
+
+    Weak tags are accepted because compressed responses carry a weakened ETag.
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        try:
+            versions.append(int(tag.strip('"')))
+        except ValueError:
+            continue  # Not one of ours, so it can never match
+    return versions
 
 # Camera Settings Routes
 @router.post("/settings", response_model=CameraSettings)
 async def create_camera_settings(
     settings_data: CameraSettingsCreate,
-    camera_service: CameraService = Depends(get_camera_service)
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    camera_service: CameraService = Depends(get_camera_service),
+    idempotency_store: IdempotencyStore = Depends(get_idempotency_store)
 ):
     """Create new camera settings preset"""
     try:
-        return await camera_service.create_settings(settings_data)
+        settings = await run_idempotent(
+            idempotency_store, idempotency_key, "POST /camera/settings", settings_data, response,
+            lambda: camera_service.create_settings(settings_data)
+        )
+        response.headers["ETag"] = settings_etag(settings)
+        return settings
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/settings/{settings_id}", response_model=CameraSettings)
 async def get_camera_settings(
     settings_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     camera_service: CameraService = Depends(get_camera_service)
 ):
     """Get specific camera settings by ID"""
     settings = await camera_service.get_settings(settings_id)
     if not settings:
         raise HTTPException(status_code=404, detail="Camera settings not found")
+    etag = settings_etag(settings)
+    if if_none_match:
+        record_cache_lookup("etag", etag_matches(if_none_match, etag))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     return settings
 
 @router.get("/settings", response_model=List[CameraSettings])
 async def get_all_camera_settings(
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     camera_service: CameraService = Depends(get_camera_service)
 ):
     """Get all saved camera settings"""
-    return await camera_service.get_all_settings()
+    return conditional_json_response(await camera_service.get_all_settings(), if_none_match)
 
 @router.put("/settings/{settings_id}", response_model=CameraSettings)
 async def update_camera_settings(
     settings_id: str,
     update_data: CameraSettingsUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, alias="If-Match"),
     camera_service: CameraService = Depends(get_camera_service)
 ):
-    """Update existing camera settings"""
-    settings = await camera_service.update_settings(settings_id, update_data)
+    """Update existing camera settings; with If-Match only while the preset is still at that version"""
+    try:
+        settings = await camera_service.update_settings(settings_id, update_data, parse_if_match(if_match))
+    except SettingsVersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     if not settings:
         raise HTTPException(status_code=404, detail="Camera settings not found")
+    response.headers["ETag"] = settings_etag(settings)
     return settings
 
 @router.delete("/settings/{settings_id}")
@@ -71,24 +183,40 @@ async def delete_camera_settings(
 @router.post("/recordings", response_model=Recording)
 async def start_recording(
     recording_data: RecordingCreate,
-    camera_service: CameraService = Depends(get_camera_service)
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    camera_service: CameraService = Depends(get_camera_service),
+    idempotency_store: IdempotencyStore = Depends(get_idempotency_store)
 ):
     """Start a new recording session"""
     try:
-        return await camera_service.start_recording(recording_data)
+        return await run_idempotent(
+            idempotency_store, idempotency_key, "POST /camera/recordings", recording_data, response,
+            lambda: camera_service.start_recording(recording_data)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/recordings/{recording_id}/stop", response_model=Recording)
 async def stop_recording(
     recording_id: str,
-    camera_service: CameraService = Depends(get_camera_service)
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    camera_service: CameraService = Depends(get_camera_service),
+    idempotency_store: IdempotencyStore = Depends(get_idempotency_store)
 ):
     """Stop recording session"""
-    recording = await camera_service.stop_recording(recording_id)
-    if not recording:
-        raise HTTPException(status_code=404, detail="Recording not found or already stopped")
-    return recording
+    async def stop():
+        recording = await camera_service.stop_recording(recording_id)
+        if not recording:
+            raise HTTPException(status_code=404, detail="Recording not found or already stopped")
+        return recording
+
+    return await run_idempotent(
+        idempotency_store, idempotency_key, f"PUT /camera/recordings/{recording_id}/stop", None, response, stop
+    )
 
 @router.get("/recordings", response_model=List[Recording])
 async def get_all_recordings(
@@ -144,4 +272,68 @@ async def get_camera_capabilities(
     camera_service: CameraService = Depends(get_camera_service)
 ):
     """Get camera capabilities and supported values"""
-    return camera_service.get_camera_capabilities()
\ No newline at end of file
+    return camera_service.get_camera_capabilities()
+
+# Bootstrap Route
+@router.get("/bootstrap", response_model=CameraBootstrap)
+async def get_camera_bootstrap(
+    presets_limit: int = Query(20, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    camera_service: CameraService = Depends(get_camera_service)
+):
+    """Get capabilities, status, latest presets and any active recording in one round trip"""
+    bootstrap = await camera_service.get_bootstrap(presets_limit=presets_limit)
+    return conditional_json_response(bootstrap, if_none_match)
+
+# Batch Route
+@router.post("/batch", response_model=BatchResponse)
+async def run_camera_batch(
+    batch: BatchRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    idempotency_store: IdempotencyStore = Depends(get_idempotency_store)
+):
+    """Run several camera operations in one round trip, optionally in one transaction"""
+    batch_service = BatchService(get_repository(), get_event_bus())
+    try:
+        return await run_idempotent(
+            idempotency_store, idempotency_key, "POST /camera/batch", batch, response,
+            lambda: batch_service.execute(batch)
+        )
+    except BatchValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TransactionsUnsupportedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Change Events Route
+@router.websocket("/events/ws")
+async def stream_camera_events(
+    websocket: WebSocket,
+    channels: str = Query(",".join(CHANNELS), description="Comma-separated channels: status, settings")
+):
+    """Push status and settings changes made on any worker; the current status is sent first"""
+    event_bus = get_event_bus()
+    requested = [channel.strip() for channel in channels.split(",") if channel.strip() in CHANNELS]
+    await websocket.accept()
+    queue = event_bus.subscribe(requested)
+    receive = None
+    try:
+        if STATUS_CHANNEL in requested:
+            status = await get_camera_service().get_camera_status()
+            await websocket.send_json(jsonable_encoder({"channel": STATUS_CHANNEL, "operation": "snapshot", "document": status}))
+        receive = asyncio.create_task(websocket.receive())
+        while True:
+            next_event = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({next_event, receive}, return_when=asyncio.FIRST_COMPLETED)
+            if receive in done:
+                next_event.cancel()
+                if receive.result()["type"] == "websocket.disconnect":
+                    break
+                # Clients have nothing to say on this stream; ignore anything they send
+                receive = asyncio.create_task(websocket.receive())
+                continue
+            await websocket.send_json(jsonable_encoder(next_event.result()))
+    finally:
+        event_bus.unsubscribe(queue)
+        if receive is not None and not receive.done():
+            receive.cancel()
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Query
+from services.profiling import SLOW_LOG
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+@router.get("/slow")
+async def get_slow_offenders(limit: int = Query(20, ge=1, le=500)):
+    """Get the slowest recorded requests, Mongo commands and loop-blocking stacks"""
+    return SLOW_LOG.top(limit)
+
+@router.delete("/slow")
+async def clear_slow_offenders():
+    """Clear recorded slow requests, commands and stacks"""
+    SLOW_LOG.clear()
+    return {"message": "Slow log cleared"}
@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from typing import Optional
+from models.frames import FrameAppendResult, FrameMetadataRange, FrameMetadataSummary
+from services.frame_metadata_service import FrameMetadataService, FrameMetadataError, FrameConflictError, FramePartialAppendError, FRAMES_MEDIA_TYPE, FRAME_FIELDS
+from services.camera_service import CameraService
+from database import get_repository
+from routes.camera import get_camera_service
+from middleware.encoding import NegotiatedJSONResponse
+
+router = APIRouter(prefix="/camera/recordings", tags=["frames"], default_response_class=NegotiatedJSONResponse)
+
+def get_frame_metadata_service() -> FrameMetadataService:
+    return FrameMetadataService(get_repository())
+
+def parse_fields(fields: Optional[str]):
+    if not fields:
+        return FRAME_FIELDS
+    return [name.strip() for name in fields.split(",") if name.strip()]
+
+async def require_recording(camera_service: CameraService, recording_id: str):
+    recording = await camera_service.get_recording(recording_id)
+    if not recording:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    return recording
+
+@router.post("/{recording_id}/frames", response_model=FrameAppendResult)
+async def append_frames(
+    recording_id: str,
+    request: Request,
+    start_frame: Optional[int] = Query(None, alias="startFrame", ge=0),
+    content_type: str = Header(FRAMES_MEDIA_TYPE, alias="Content-Type"),
+    frame_service: FrameMetadataService = Depends(get_frame_metadata_service),
+    camera_service: CameraService = Depends(get_camera_service)
+):
+    """Append packed per-frame metadata records; startFrame guards against gaps and double uploads"""
+    if content_type.split(";")[0].strip().lower() not in (FRAMES_MEDIA_TYPE, "application/octet-stream"):
+        raise HTTPException(status_code=415, detail=f"Use {FRAMES_MEDIA_TYPE}")
+    await require_recording(camera_service, recording_id)
+    body = await request.body()
+    try:
+        return await frame_service.append_frames(recording_id, body, start_frame)
+    except FramePartialAppendError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), **e.result.dict()})
+    except FrameConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except FrameMetadataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{recording_id}/frames", response_model=FrameMetadataRange)
+async def get_frames(
+    recording_id: str,
+    start: int = Query(0, ge=0),
+    end: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = Query(None, description="Comma-separated columns, default all"),
+    accept: Optional[str] = Header(None),
+    frame_service: FrameMetadataService = Depends(get_frame_metadata_service),
+    camera_service: CameraService = Depends(get_camera_service)
+):
+    """Get per-frame metadata for [start, end) as columns, or as packed records when Accept asks for them"""
+    await require_recording(camera_service, recording_id)
+    try:
+        if accept and FRAMES_MEDIA_TYPE in accept:
+            return Response(content=await frame_service.read_range_packed(recording_id, start, end), media_type=FRAMES_MEDIA_TYPE)
+        return await frame_service.read_range(recording_id, start, end, parse_fields(fields))
+    except FrameMetadataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{recording_id}/frames/summary", response_model=FrameMetadataSummary)
+async def get_frame_summary(
+    recording_id: str,
+    start: int = Query(0, ge=0),
+    end: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = Query(None, description="Comma-separated columns, default all"),
+    frame_service: FrameMetadataService = Depends(get_frame_metadata_service),
+    camera_service: CameraService = Depends(get_camera_service)
+):
+    """Get per-second min/max/mean of each column at the recording's frame rate"""
+    recording = await require_recording(camera_service, recording_id)
+    try:
+        return await frame_service.summarize(recording_id, recording.frameRate, start, end, parse_fields(fields))
+    except FrameMetadataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
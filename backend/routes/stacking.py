@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from typing import Optional
+from services.stacking_service import (
+    STACK_DTYPES, STACK_METHODS, StackingBusyError, StackingEngine, StackingError,
+    exposures_from_query, get_stacking_engine, stacking_limits
+)
+from middleware.encoding import NegotiatedJSONResponse
+
+FRAME_MEDIA_TYPE = "application/octet-stream"
+
+router = APIRouter(prefix="/camera", tags=["stacking"], default_response_class=NegotiatedJSONResponse)
+
+@router.post("/stack")
+async def stack_frames(
+    request: Request,
+    count: int = Query(..., alias="frames", ge=1),
+    width: int = Query(..., ge=1),
+    height: int = Query(..., ge=1),
+    channels: int = Query(3, ge=1, le=4),
+    dtype: str = Query("uint8"),
+    method: str = Query("median"),
+    sigma: float = Query(3.0, gt=0),
+    shutter_speeds: Optional[str] = Query(None, alias="shutterSpeeds", description="Comma-separated, e.g. 1/250,1/60,1/15"),
+    apertures: Optional[str] = Query(None, description="Comma-separated f-numbers, one or one per frame"),
+    isos: Optional[str] = Query(None, description="Comma-separated ISO values, one or one per frame"),
+    tonemap: bool = Query(False, description="Tone map an HDR merge back to the input dtype"),
+    content_type: str = Header(FRAME_MEDIA_TYPE, alias="Content-Type"),
+    content_length: Optional[int] = Header(None, alias="Content-Length"),
+    engine: StackingEngine = Depends(get_stacking_engine)
+):
+    """Merge a burst of aligned raw frames (count x height x width x channels, row-major) into one frame"""
+    if content_type.split(";")[0].strip().lower() != FRAME_MEDIA_TYPE:
+        raise HTTPException(status_code=415, detail=f"Use {FRAME_MEDIA_TYPE}")
+    if dtype not in STACK_DTYPES:
+        raise HTTPException(status_code=400, detail=f"dtype must be one of {', '.join(STACK_DTYPES)}")
+    if method not in STACK_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(STACK_METHODS)}")
+    limits = stacking_limits()
+    if count > limits["maxFrames"]:
+        raise HTTPException(status_code=413, detail=f"At most {limits['maxFrames']} frames per stack")
+    expected = count * height * width * channels * STACK_DTYPES[dtype].itemsize
+    if expected > limits["maxBytes"]:
+        raise HTTPException(status_code=413, detail=f"Frame batch exceeds {limits['maxBytes']} bytes")
+    try:
+        exposures = exposures_from_query(shutter_speeds, apertures, isos)
+        if exposures is not None and len(exposures) != count:
+            raise StackingError(f"Expected {count} shutter speeds, got {len(exposures)}")
+        engine.validate((count, height, width, channels), method, exposures, sigma)
+    except StackingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Nothing is allocated until the declared body matches the batch shape
+    if content_length is None:
+        raise HTTPException(status_code=411, detail=f"Send Content-Length: {expected}")
+    if content_length != expected:
+        raise HTTPException(status_code=400, detail=f"Expected {expected} bytes, Content-Length is {content_length}")
+
+    try:
+        with engine.reserve(expected), engine.allocate(count, height, width, channels, STACK_DTYPES[dtype]) as frames:
+            # Stream the body straight into shared memory so the batch is copied exactly once
+            buffer = frames.shm.buf
+            received = 0
+            async for chunk in request.stream():
+                if received + len(chunk) > expected:
+                    raise HTTPException(status_code=400, detail=f"Body is larger than {expected} bytes")
+                buffer[received:received + len(chunk)] = chunk
+                received += len(chunk)
+            if received != expected:
+                raise HTTPException(status_code=400, detail=f"Expected {expected} bytes, got {received}")
+            try:
+                result = await engine.stack(frames, method, exposures, sigma, tonemap)
+            except StackingError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+    except StackingBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    return Response(content=result.tobytes(), media_type=FRAME_MEDIA_TYPE, headers={
+        "X-Frame-Width": str(width),
+        "X-Frame-Height": str(height),
+        "X-Frame-Channels": str(channels),
+        "X-Frame-Dtype": result.dtype.name,
+        "X-Stack-Method": method,
+        "X-Stack-Frames": str(count),
+    })
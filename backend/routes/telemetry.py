@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from models.telemetry import TelemetryIngestResult
+from services.telemetry_service import TelemetryService, TelemetryDecodeError, STRUCT_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+from services.camera_service import CameraService
+from database import get_event_bus, get_repository
+from middleware.encoding import NegotiatedJSONResponse
+
+router = APIRouter(prefix="/camera/telemetry", tags=["telemetry"], default_response_class=NegotiatedJSONResponse)
+
+def get_telemetry_service() -> TelemetryService:
+    repository = get_repository()
+    return TelemetryService(repository, CameraService(repository, get_event_bus()))
+
+@router.post("", response_model=TelemetryIngestResult)
+async def ingest_telemetry(
+    request: Request,
+    camera_id: str = Query("default", alias="cameraId"),
+    content_type: str = Header(STRUCT_MEDIA_TYPE, alias="Content-Type"),
+    telemetry_service: TelemetryService = Depends(get_telemetry_service)
+):
+    """Ingest a batch of telemetry samples as packed structs or length-prefixed MessagePack frames"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type not in (STRUCT_MEDIA_TYPE, MSGPACK_MEDIA_TYPE):
+        raise HTTPException(status_code=415, detail=f"Use {STRUCT_MEDIA_TYPE} or {MSGPACK_MEDIA_TYPE}")
+    body = await request.body()
+    try:
+        return await telemetry_service.ingest(camera_id, body, media_type)
+    except TelemetryDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.websocket("/ws")
+async def ingest_telemetry_stream(
+    websocket: WebSocket,
+    camera_id: str = Query("default", alias="cameraId"),
+    frame_format: str = Query("struct", alias="format")
+):
+    """Ingest telemetry over a WebSocket; each binary message is one batch and is acknowledged with counts"""
+    media_type = MSGPACK_MEDIA_TYPE if frame_format == "msgpack" else STRUCT_MEDIA_TYPE
+    telemetry_service = get_telemetry_service()
+    await websocket.accept()
+    try:
+        while True:
+            body = await websocket.receive_bytes()
+            try:
+                result = await telemetry_service.ingest(camera_id, body, media_type)
+                await websocket.send_json(result.dict())
+            except TelemetryDecodeError as e:
+                await websocket.send_json({"error": str(e)})
+    except WebSocketDisconnect:
+        pass
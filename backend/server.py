@@ -1,23 +1,39 @@
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from routes.camera import router as camera_router
+from routes.debug import router as debug_router
+from routes.telemetry import router as telemetry_router
+from routes.frames import router as frames_router
+from routes.analytics import router as analytics_router
+from routes.stacking import router as stacking_router
+from database import get_database, get_event_bus, get_repository, get_slow_query_listener, close_client
+from middleware.encoding import ContentEncodingMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.profiling import ProfilingMiddleware
+from services.metrics import REGISTRY
+from services.profiling import LoopBlockingSampler
+from services.loop_monitor import EventLoopLagMonitor
+from services.executor import shutdown_executors
+from services.camera_service import CameraService, get_camera_caches
+from services.retention_service import RetentionSweeper, load_retention_policies
+from services.reaper_service import RecordingReaper
+from services.id_migration_service import BinaryIdMigration
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+db = get_database()
 
 # Create the main app without a prefix
 app = FastAPI(title="Professional Camera API", version="1.0.0")
@@ -43,20 +59,53 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    await get_repository().insert_status_check(status_obj.dict())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
+    status_checks = await get_repository().list_status_checks(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
 # Include camera routes
 api_router.include_router(camera_router)
+api_router.include_router(telemetry_router)
+api_router.include_router(frames_router)
+api_router.include_router(analytics_router)
+api_router.include_router(stacking_router)
+
+# Profiling dumps are opt-in; they expose query shapes and stack traces
+if os.environ.get('ENABLE_DEBUG_ENDPOINTS', '0') == '1':
+    api_router.include_router(debug_router)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+app.add_middleware(
+    ContentEncodingMiddleware,
+    path_prefixes=("/api",),
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+)
+
+app.add_middleware(MetricsMiddleware)
+
+loop_blocking_sampler = None
+if os.environ.get('PROFILE_LOOP_BLOCKING', '0') == '1':
+    loop_blocking_sampler = LoopBlockingSampler(
+        block_threshold=float(os.environ.get('LOOP_BLOCK_THRESHOLD_MS', 50)) / 1000
+    )
+
+app.add_middleware(
+    ProfilingMiddleware,
+    threshold_ms=float(os.environ.get('SLOW_REQUEST_MS', 500)),
+    sampler=loop_blocking_sampler
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -72,11 +121,70 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+retention_sweeper = RetentionSweeper(
+    CameraService(get_repository()),
+    load_retention_policies(),
+    interval=float(os.environ.get('RETENTION_SWEEP_INTERVAL_SECONDS', 3600)),
+    batch_size=int(os.environ.get('RETENTION_BATCH_SIZE', 500)),
+    batch_pause=float(os.environ.get('RETENTION_BATCH_PAUSE_SECONDS', 0.5))
+)
+
+recording_reaper = RecordingReaper(
+    CameraService(get_repository()),
+    stale_after=timedelta(seconds=float(os.environ.get('REAPER_STALE_AFTER_SECONDS', 14400))),
+    action=os.environ.get('REAPER_ACTION', 'fail'),
+    interval=float(os.environ.get('REAPER_INTERVAL_SECONDS', 300)),
+    batch_size=int(os.environ.get('REAPER_BATCH_SIZE', 500))
+)
+
+id_migration = BinaryIdMigration(
+    get_repository(),
+    batch_size=int(os.environ.get('ID_MIGRATION_BATCH_SIZE', 500)),
+    batch_pause=float(os.environ.get('ID_MIGRATION_BATCH_PAUSE_SECONDS', 0.2))
+)
+
+loop_lag_monitor = EventLoopLagMonitor(
+    interval=float(os.environ.get('LOOP_LAG_INTERVAL_SECONDS', 0.5))
+)
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Camera API server starting up...")
+    await CameraService(get_repository()).ensure_indexes()
+    get_slow_query_listener().attach(asyncio.get_running_loop(), db)
+    event_bus = get_event_bus()
+    event_bus.add_listener(get_camera_caches().invalidate)
+    await event_bus.start()
+    if loop_blocking_sampler is not None:
+        loop_blocking_sampler.start()
+    retention_sweeper.start()
+    recording_reaper.start()
+    if os.environ.get('ID_MIGRATION_ENABLED', '1') == '1':
+        id_migration.start()
+    loop_lag_monitor.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
-    logger.info("Camera API server shutting down...")
\ No newline at end of file
+    await retention_sweeper.stop()
+    await recording_reaper.stop()
+    await id_migration.stop()
+    await loop_lag_monitor.stop()
+    await get_event_bus().stop()
+    shutdown_executors()
+    if loop_blocking_sampler is not None:
+        loop_blocking_sampler.stop()
+    close_client()
+    logger.info("Camera API server shutting down...")
+
+if __name__ == "__main__":
+    import uvicorn
+
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    if workers > 1 and os.environ.get('STORAGE_BACKEND', 'mongo').lower() == 'memory':
+        logger.warning("STORAGE_BACKEND=memory keeps separate data in each of the %d workers", workers)
+    uvicorn.run(
+        "server:app",
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 8001)),
+        workers=workers
+    )
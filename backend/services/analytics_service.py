@@ -0,0 +1,130 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+from models.analytics import DailyRecordingTotals, DimensionTotals, RecordingAnalytics
+from repositories.camera_repository import CameraRepository
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = {"byResolution": "resolution", "byFrameRate": "frameRate", "byColorProfile": "colorProfile"}
+
+# One refresh at a time per process; concurrent workers only repeat idempotent work
+_refresh_lock = asyncio.Lock()
+
+def start_of_day(value: date) -> datetime:
+    return datetime.combine(value, time.min)
+
+class AnalyticsService:
+    """Recording reports built from materialized daily rollups plus a live tail.
+
+    Days are closed once ``grace`` has passed since they ended, long enough
+    for any recording started that day to be stopped or reaped. Closed days
+    are aggregated once into ``recording_rollups``; a report reads rollups
+    up to the watermark and aggregates only the open days from
+    ``recordings``, so dashboards never scan the whole collection. Rollups
+    keep their totals after retention deletes the underlying recordings.
+    """
+
+    def __init__(self, repository: CameraRepository):
+        self.repository = repository
+        self.grace = timedelta(hours=float(os.environ.get('ROLLUP_GRACE_HOURS', 6)))
+
+    def closed_through(self, now: datetime) -> datetime:
+        """Start of the first day that is still open"""
+        return start_of_day((now - self.grace).date())
+
+    async def refresh_rollups(self, now: Optional[datetime] = None, rebuild_from: Optional[date] = None) -> int:
+        """Materialize closed days after the watermark (or from ``rebuild_from``); returns days written"""
+        async with _refresh_lock:
+            closed_through = self.closed_through(now or datetime.utcnow())
+            watermark = await self.repository.find_rollup_watermark()
+            start = watermark or datetime(1970, 1, 1)
+            if rebuild_from:
+                # Never skip closed days the watermark has not reached yet
+                start = min(start, start_of_day(rebuild_from))
+            if start >= closed_through:
+                return 0
+            days = await self.repository.materialize_recording_rollups(start, closed_through, datetime.utcnow())
+            if watermark is None or closed_through > watermark:
+                await self.repository.set_rollup_watermark(closed_through)
+            logger.info("Materialized %d recording rollup days from %s to %s", days, start.date(), closed_through.date())
+            return days
+
+    async def recording_analytics(self, first_day: date, last_day: date) -> RecordingAnalytics:
+        """Totals per day and per resolution, frame rate and color profile for days in [first_day, last_day]"""
+        start, end = start_of_day(first_day), start_of_day(last_day + timedelta(days=1))
+        watermark = await self.repository.find_rollup_watermark()
+        if watermark is None or watermark < self.closed_through(datetime.utcnow()):
+            await self.refresh_rollups()
+            watermark = await self.repository.find_rollup_watermark()
+
+        rows: List[dict] = []
+        split = min(max(start, watermark), end)
+        if start < split:
+            for rollup in await self.repository.find_recording_rollups(f"{start:%Y-%m-%d}", f"{split:%Y-%m-%d}"):
+                rows.extend(dict(group, day=rollup["day"]) for group in rollup["groups"])
+        if split < end:
+            rows.extend(await self.repository.aggregate_recording_groups(split, end))
+        return build_report(rows, first_day, last_day, watermark)
+
+def build_report(rows: Iterable[dict], first_day: date, last_day: date, watermark: Optional[datetime]) -> RecordingAnalytics:
+    """Fold grouped rows into daily totals and per-dimension breakdowns"""
+    rows = list(rows)
+    days: Dict[str, dict] = {}
+    dimensions: Dict[str, Dict[str, dict]] = {name: {} for name in DIMENSIONS}
+    for row in rows:
+        completed = row["status"] == "completed"
+        day = days.setdefault(row["day"], {"recordings": 0, "completed": 0, "failed": 0, "seconds": 0.0, "fileSizeMB": 0.0})
+        day["recordings"] += row["count"]
+        day["completed"] += row["count"] if completed else 0
+        day["failed"] += row["count"] if row["status"] == "failed" else 0
+        day["seconds"] += row["durationSeconds"]
+        day["fileSizeMB"] += row["fileSizeMB"]
+        for name, field in DIMENSIONS.items():
+            totals = dimensions[name].setdefault(str(row[field]), {"recordings": 0, "completed": 0, "completedSeconds": 0.0, "seconds": 0.0, "fileSizeMB": 0.0})
+            totals["recordings"] += row["count"]
+            totals["seconds"] += row["durationSeconds"]
+            totals["fileSizeMB"] += row["fileSizeMB"]
+            if completed:
+                totals["completed"] += row["count"]
+                totals["completedSeconds"] += row["durationSeconds"]
+
+    total_recordings = sum(day["recordings"] for day in days.values())
+
+    def breakdown(name: str) -> List[DimensionTotals]:
+        return sorted((
+            DimensionTotals(
+                key=key,
+                recordings=totals["recordings"],
+                share=round(totals["recordings"] / total_recordings, 4) if total_recordings else 0.0,
+                hours=round(totals["seconds"] / 3600, 3),
+                fileSizeMB=round(totals["fileSizeMB"], 2),
+                averageDurationSeconds=round(totals["completedSeconds"] / totals["completed"], 2) if totals["completed"] else 0.0,
+            )
+            for key, totals in dimensions[name].items()
+        ), key=lambda totals: totals.recordings, reverse=True)
+
+    return RecordingAnalytics(
+        start=first_day.isoformat(),
+        end=last_day.isoformat(),
+        recordings=total_recordings,
+        hours=round(sum(day["seconds"] for day in days.values()) / 3600, 3),
+        fileSizeMB=round(sum(day["fileSizeMB"] for day in days.values()), 2),
+        days=[
+            DailyRecordingTotals(
+                day=key,
+                recordings=day["recordings"],
+                completed=day["completed"],
+                failed=day["failed"],
+                hours=round(day["seconds"] / 3600, 3),
+                fileSizeMB=round(day["fileSizeMB"], 2),
+            )
+            for key, day in sorted(days.items())
+        ],
+        byResolution=breakdown("byResolution"),
+        byFrameRate=breakdown("byFrameRate"),
+        byColorProfile=breakdown("byColorProfile"),
+        rollupsThrough=f"{watermark:%Y-%m-%d}" if watermark else None
+    )
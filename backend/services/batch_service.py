@@ -0,0 +1,244 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from pymongo.errors import OperationFailure
+from models.batch import BatchOperation, BatchOperationResult, BatchRequest, BatchResponse
+from models.camera import CameraSettingsCreate, CameraSettingsUpdate, RecordingCreate
+from repositories.camera_repository import CameraRepository
+from services.camera_service import CameraService, SettingsVersionConflictError
+from services.events_service import DeferredEventBus, EventBus
+import asyncio
+import os
+
+# "Transaction numbers are only allowed on a replica set member or mongos"
+_TRANSACTIONS_UNSUPPORTED = {20}
+
+class BatchValidationError(ValueError):
+    """Raised when a batch is malformed as a whole (unknown op, bad reference, too many operations)"""
+
+class TransactionsUnsupportedError(Exception):
+    """Raised when a transactional batch runs against a MongoDB without transaction support"""
+
+class OperationError(Exception):
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+class _RollbackBatch(Exception):
+    """Aborts the transaction after an operation failed"""
+
+async def _create_settings(service: CameraService, params: dict):
+    return await service.create_settings(CameraSettingsCreate(**params))
+
+async def _get_settings(service: CameraService, params: dict):
+    settings = await service.get_settings(params["id"])
+    if not settings:
+        raise OperationError(404, "Camera settings not found")
+    return settings
+
+async def _update_settings(service: CameraService, params: dict):
+    fields = {k: v for k, v in params.items() if k not in ("id", "ifMatch")}
+    expected = [int(params["ifMatch"])] if params.get("ifMatch") is not None else None
+    try:
+        settings = await service.update_settings(params["id"], CameraSettingsUpdate(**fields), expected)
+    except SettingsVersionConflictError as e:
+        raise OperationError(412, str(e))
+    if not settings:
+        raise OperationError(404, "Camera settings not found")
+    return settings
+
+async def _delete_settings(service: CameraService, params: dict):
+    if not await service.delete_settings(params["id"]):
+        raise OperationError(404, "Camera settings not found")
+    return {"message": "Camera settings deleted successfully"}
+
+async def _get_status(service: CameraService, params: dict):
+    return await service.get_camera_status()
+
+async def _update_status(service: CameraService, params: dict):
+    return await service.update_camera_status(dict(params))
+
+async def _start_recording(service: CameraService, params: dict):
+    return await service.start_recording(RecordingCreate(**params))
+
+async def _stop_recording(service: CameraService, params: dict):
+    recording = await service.stop_recording(params["id"])
+    if not recording:
+        raise OperationError(404, "Recording not found or already stopped")
+    return recording
+
+async def _get_recording(service: CameraService, params: dict):
+    recording = await service.get_recording(params["id"])
+    if not recording:
+        raise OperationError(404, "Recording not found")
+    return recording
+
+Handler = Callable[[CameraService, dict], Awaitable[Any]]
+
+# op -> (handler, resource it touches given literal params, whether it writes)
+OPERATIONS: Dict[str, Tuple[Handler, Callable[[dict], Optional[str]], bool]] = {
+    "createSettings": (_create_settings, lambda p: None, True),
+    "getSettings": (_get_settings, lambda p: f"settings:{p.get('id')}", False),
+    "updateSettings": (_update_settings, lambda p: f"settings:{p.get('id')}", True),
+    "deleteSettings": (_delete_settings, lambda p: f"settings:{p.get('id')}", True),
+    "getStatus": (_get_status, lambda p: "status", False),
+    "updateStatus": (_update_status, lambda p: "status", True),
+    "startRecording": (_start_recording, lambda p: "recordings:active", True),
+    "stopRecording": (_stop_recording, lambda p: f"recording:{p.get('id')}", True),
+    "getRecording": (_get_recording, lambda p: f"recording:{p.get('id')}", False),
+}
+
+def find_references(value: Any) -> Set[str]:
+    """Operation ids named by {"$ref": "<id>.<path>"} values anywhere in ``value``"""
+    if isinstance(value, dict):
+        if set(value) == {"$ref"}:
+            return {str(value["$ref"]).split(".", 1)[0]}
+        return set().union(*(find_references(item) for item in value.values())) if value else set()
+    if isinstance(value, list):
+        return set().union(*(find_references(item) for item in value)) if value else set()
+    return set()
+
+def resolve_references(value: Any, results: Dict[str, Any]) -> Any:
+    """Replace {"$ref": "<id>.<path>"} values with fields of earlier results"""
+    if isinstance(value, dict):
+        if set(value) == {"$ref"}:
+            op_id, _, path = str(value["$ref"]).partition(".")
+            resolved = results[op_id]
+            for key in filter(None, path.split(".")):
+                if isinstance(resolved, list) and key.isdigit() and int(key) < len(resolved):
+                    resolved = resolved[int(key)]
+                elif isinstance(resolved, dict) and key in resolved:
+                    resolved = resolved[key]
+                else:
+                    raise OperationError(400, f"Reference {value['$ref']} does not resolve")
+            return resolved
+        return {key: resolve_references(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, results) for item in value]
+    return value
+
+class BatchService:
+    """Runs an ordered list of camera operations in one request.
+
+    Operations may use ``{"$ref": "<id>.<field>"}`` to take values from
+    earlier results. Each operation depends on the operations it references
+    and on earlier operations touching the same resource when either one
+    writes; operations whose dependencies are done run concurrently in
+    waves. A failed operation skips its dependents (424) but not unrelated
+    ones. Transactional batches run sequentially inside one repository
+    transaction, roll back entirely on the first failure, and publish
+    change events only after commit.
+    """
+
+    def __init__(self, repository: CameraRepository, event_bus: Optional[EventBus] = None):
+        self.repository = repository
+        self.event_bus = event_bus
+        self.max_operations = int(os.environ.get('BATCH_MAX_OPERATIONS', 50))
+
+    def plan(self, operations: List[BatchOperation]) -> Tuple[List[str], List[Set[str]]]:
+        """Validate the batch and return each operation's id and the ids it depends on"""
+        if not operations:
+            raise BatchValidationError("A batch needs at least one operation")
+        if len(operations) > self.max_operations:
+            raise BatchValidationError(f"A batch may hold at most {self.max_operations} operations")
+        ids: List[str] = []
+        dependencies: List[Set[str]] = []
+        touched: List[Tuple[str, Optional[str], bool]] = []
+        for index, operation in enumerate(operations):
+            op_id = operation.id or str(index)
+            if op_id in ids:
+                raise BatchValidationError(f"Duplicate operation id: {op_id}")
+            if operation.op not in OPERATIONS:
+                raise BatchValidationError(f"Unknown operation {operation.op}; expected one of {', '.join(OPERATIONS)}")
+            references = find_references(operation.params)
+            unknown = references - set(ids)
+            if unknown:
+                raise BatchValidationError(f"Operation {op_id} references {', '.join(sorted(unknown))}, which must be earlier operations")
+            _, resource_of, writes = OPERATIONS[operation.op]
+            params = operation.params
+            if isinstance(params.get("id"), dict) and set(params["id"]) == {"$ref"}:
+                # A referenced id is only known at run time, so operations naming the same reference share it
+                params = {**params, "id": f"ref:{params['id']['$ref']}"}
+            resource = resource_of(params)
+            depends = set(references)
+            for earlier_id, earlier_resource, earlier_writes in touched:
+                if resource is not None and resource == earlier_resource and (writes or earlier_writes):
+                    depends.add(earlier_id)
+            ids.append(op_id)
+            dependencies.append(depends)
+            touched.append((op_id, resource, writes))
+        return ids, dependencies
+
+    async def execute(self, request: BatchRequest) -> BatchResponse:
+        ids, dependencies = self.plan(request.operations)
+        if request.transactional:
+            return await self._execute_transaction(request.operations, ids)
+
+        service = CameraService(self.repository, self.event_bus)
+        outcomes: Dict[str, BatchOperationResult] = {}
+        values: Dict[str, Any] = {}
+        pending = list(range(len(ids)))
+        while pending:
+            ready = [i for i in pending if dependencies[i] <= set(outcomes)]
+            pending = [i for i in pending if i not in ready]
+            await asyncio.gather(*(
+                self._run_or_skip(service, request.operations[i], ids[i], dependencies[i], outcomes, values)
+                for i in ready
+            ))
+        return BatchResponse(transactional=False, committed=True, results=[outcomes[op_id] for op_id in ids])
+
+    async def _run_or_skip(self, service, operation, op_id, depends, outcomes, values):
+        failed = sorted(dep for dep in depends if outcomes[dep].status >= 400)
+        if failed:
+            outcomes[op_id] = BatchOperationResult(id=op_id, op=operation.op, status=424, error=f"Skipped: depends on failed {', '.join(failed)}")
+            return
+        outcomes[op_id] = await self._run(service, operation, op_id, values)
+
+    async def _run(self, service: CameraService, operation: BatchOperation, op_id: str, values: Dict[str, Any]) -> BatchOperationResult:
+        handler = OPERATIONS[operation.op][0]
+        try:
+            params = resolve_references(operation.params, values)
+            result = jsonable_encoder(await handler(service, params))
+        except OperationError as e:
+            return BatchOperationResult(id=op_id, op=operation.op, status=e.status, error=e.detail)
+        except KeyError as e:
+            return BatchOperationResult(id=op_id, op=operation.op, status=400, error=f"Missing parameter: {e.args[0]}")
+        except (ValidationError, ValueError, TypeError) as e:
+            return BatchOperationResult(id=op_id, op=operation.op, status=422, error=str(e))
+        except OperationFailure as e:
+            if e.code in _TRANSACTIONS_UNSUPPORTED:
+                raise TransactionsUnsupportedError("Transactional batches need MongoDB running as a replica set") from e
+            return BatchOperationResult(id=op_id, op=operation.op, status=500, error=str(e))
+        values[op_id] = result
+        return BatchOperationResult(id=op_id, op=operation.op, status=200, result=result)
+
+    async def _execute_transaction(self, operations: List[BatchOperation], ids: List[str]) -> BatchResponse:
+        # Reads inside the transaction may see uncommitted data, so they bypass the shared caches
+        events = DeferredEventBus(self.event_bus) if self.event_bus is not None else None
+        service = CameraService(self.repository, events, use_cache=False)
+        results: List[BatchOperationResult] = []
+        values: Dict[str, Any] = {}
+        try:
+            async with self.repository.transaction():
+                for operation, op_id in zip(operations, ids):
+                    outcome = await self._run(service, operation, op_id, values)
+                    results.append(outcome)
+                    if outcome.status >= 400:
+                        raise _RollbackBatch()
+        except _RollbackBatch:
+            if events is not None:
+                events.discard()
+            failed = results[-1].id
+            results.extend(
+                BatchOperationResult(id=op_id, op=operation.op, status=424, error=f"Not run: transaction rolled back after {failed} failed")
+                for operation, op_id in zip(operations[len(results):], ids[len(results):])
+            )
+            return BatchResponse(transactional=True, committed=False, results=results)
+        except BaseException:
+            if events is not None:
+                events.discard()
+            raise
+        if events is not None:
+            events.flush()
+        return BatchResponse(transactional=True, committed=True, results=results)
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from services.metrics import record_cache_lookup
+import time
+
+class LocalCache:
+    """Bounded per-process TTL cache whose entries are dropped by event bus invalidations.
+
+    ``generation`` increases on every invalidation; readers capture it before
+    hitting storage and pass it to ``set`` so a value read before a concurrent
+    invalidation is not cached. The TTL bounds staleness if an event is missed.
+    Cached values are shared and must be treated as read-only.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int = 1000):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+        record_cache_lookup(self.name, entry is not None)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None):
+        """Cache ``value`` unless the cache was invalidated since ``generation`` was read"""
+        if self.ttl_seconds <= 0 or (generation is not None and generation != self.generation):
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one entry, or everything when ``key`` is None"""
+        self.generation += 1
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
@@ -1,51 +1,133 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Optional
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from models.camera import CameraSettings, CameraSettingsCreate, CameraSettingsUpdate, Recording, RecordingCreate, CameraStatus, CameraCapabilities
+from models.camera import CameraSettings, CameraSettingsCreate, CameraSettingsUpdate, Recording, RecordingCreate, CameraStatus, CameraCapabilities, CameraBootstrap
+from repositories.camera_repository import CameraRepository
+from services.cache_service import LocalCache
+from services.events_service import CameraEvent, EventBus, STATUS_CHANNEL, SETTINGS_CHANNEL
+from services.executor import get_cpu_executor
+from services.profiling import profile_validation
+import asyncio
+import functools
+import os
 import time
 
+STATUS_CACHE_KEY = "current"
+
+class SettingsVersionConflictError(Exception):
+    """Raised when a conditional preset update targets a version that is no longer current"""
+
+class CameraCaches:
+    """Per-process caches for the hottest reads, kept coherent by event bus invalidations"""
+
+    def __init__(self, ttl_seconds: float):
+        self.status = LocalCache("camera_status", ttl_seconds, max_entries=1)
+        self.settings = LocalCache("camera_settings", ttl_seconds)
+
+    def invalidate(self, event: CameraEvent):
+        if event.channel == STATUS_CHANNEL:
+            self.status.invalidate()
+        elif event.channel == SETTINGS_CHANNEL:
+            self.settings.invalidate(event.documentId)
+
+_caches: Optional[CameraCaches] = None
+
+def get_camera_caches() -> CameraCaches:
+    global _caches
+    if _caches is None:
+        _caches = CameraCaches(ttl_seconds=float(os.environ.get('CACHE_TTL_SECONDS', 30)))
+    return _caches
+
 class CameraService:
-    def __init__(self, db: AsyncIOMotorDatabase):
-        self.db = db
-        self.settings_collection = db.camera_settings
-        self.recordings_collection = db.recordings
-        self.status_collection = db.camera_status
+    def __init__(self, repository: CameraRepository, event_bus: Optional[EventBus] = None, use_cache: bool = True):
+        self.repository = repository
+        # Changes are announced and reads cached only when an event bus keeps other workers in step
+        self.event_bus = event_bus
+        self.caches = get_camera_caches() if event_bus is not None and use_cache else None
+        self.max_recording_seconds = float(os.environ.get('MAX_RECORDING_SECONDS', 14400))
+        # Lists at least this long are validated on the CPU executor instead of the event loop
+        self.offload_model_threshold = int(os.environ.get('OFFLOAD_MODEL_THRESHOLD', 50))
+
+    @staticmethod
+    def _to_model(model, doc: Optional[dict]):
+        """Build one pydantic model from a stored document, timing validation"""
+        if not doc:
+            return None
+        with profile_validation():
+            return model(**doc)
+
+    @staticmethod
+    def _to_models(model, docs: List[dict]) -> list:
+        """Build pydantic models from stored documents, timing validation"""
+        with profile_validation():
+            return [model(**doc) for doc in docs]
+
+    async def _build_models(self, model, docs: List[dict]) -> list:
+        """Build models for a list, moving large lists off the event loop"""
+        if len(docs) >= self.offload_model_threshold:
+            return await get_cpu_executor().run(self._to_models, model, docs)
+        return self._to_models(model, docs)
+
+    def _publish(self, channel: str, operation: str, document_id: Optional[str] = None, document: Optional[dict] = None):
+        if self.event_bus is not None:
+            self.event_bus.publish(CameraEvent(channel=channel, operation=operation, documentId=document_id, document=document))
+
+    async def ensure_indexes(self):
+        """Create the indexes used by listing, retention and cleanup queries"""
+        await self.repository.ensure_indexes()
 
     async def create_settings(self, settings_data: CameraSettingsCreate) -> CameraSettings:
         """Create new camera settings preset"""
         settings = CameraSettings(**settings_data.dict())
-        await self.settings_collection.insert_one(settings.dict())
+        await self.repository.insert_settings(settings.dict())
+        self._publish(SETTINGS_CHANNEL, "insert", settings.id, settings.dict())
         return settings
 
     async def get_settings(self, settings_id: str) -> Optional[CameraSettings]:
         """Get specific camera settings by ID"""
-        settings_doc = await self.settings_collection.find_one({"id": settings_id})
-        if settings_doc:
-            return CameraSettings(**settings_doc)
-        return None
+        if self.caches is not None:
+            cached = self.caches.settings.get(settings_id)
+            if cached is not None:
+                return cached
+            generation = self.caches.settings.generation
+        settings_doc = await self.repository.find_settings(settings_id)
+        settings = self._to_model(CameraSettings, settings_doc)
+        if settings is not None and self.caches is not None:
+            self.caches.settings.set(settings_id, settings, generation)
+        return settings
 
-    async def get_all_settings(self) -> List[CameraSettings]:
+    async def get_all_settings(self, limit: int = 100) -> List[CameraSettings]:
         """Get all saved camera settings"""
-        cursor = self.settings_collection.find().sort("createdAt", -1)
-        settings_list = await cursor.to_list(length=100)
-        return [CameraSettings(**settings) for settings in settings_list]
+        settings_list = await self.repository.list_settings(limit)
+        return await self._build_models(CameraSettings, settings_list)
 
-    async def update_settings(self, settings_id: str, update_data: CameraSettingsUpdate) -> Optional[CameraSettings]:
-        """Update existing camera settings"""
+    async def update_settings(
+        self,
+        settings_id: str,
+        update_data: CameraSettingsUpdate,
+        expected_versions: Optional[List[int]] = None
+    ) -> Optional[CameraSettings]:
+        """Update existing camera settings, optionally only while at one of ``expected_versions``"""
         update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
         if update_dict:
             update_dict["updatedAt"] = datetime.utcnow()
-            await self.settings_collection.update_one(
-                {"id": settings_id}, 
-                {"$set": update_dict}
-            )
-            return await self.get_settings(settings_id)
+            settings_doc = await self.repository.update_settings(settings_id, update_dict, expected_versions)
+            if settings_doc is None:
+                if expected_versions is not None and await self.repository.find_settings(settings_id):
+                    raise SettingsVersionConflictError(f"Camera settings {settings_id} have been modified")
+                return None
+            if self.caches is not None:
+                self.caches.settings.invalidate(settings_id)
+            settings = self._to_model(CameraSettings, settings_doc)
+            self._publish(SETTINGS_CHANNEL, "update", settings_id, settings.dict())
+            return settings
         return None
 
     async def delete_settings(self, settings_id: str) -> bool:
         """Delete camera settings"""
-        result = await self.settings_collection.delete_one({"id": settings_id})
-        return result.deleted_count > 0
+        deleted = await self.repository.delete_settings(settings_id)
+        if deleted:
+            self._publish(SETTINGS_CHANNEL, "delete", settings_id)
+        return deleted
 
     async def start_recording(self, recording_data: RecordingCreate) -> Recording:
         """Start a new recording session"""
@@ -57,7 +139,7 @@ class CameraService:
             startTime=datetime.utcnow(),
             status="recording"
         )
-        await self.recordings_collection.insert_one(recording.dict())
+        await self.repository.insert_recording(recording.dict())
         return recording
 
     async def stop_recording(self, recording_id: str) -> Optional[Recording]:
@@ -66,85 +148,155 @@ class CameraService:
         if recording and recording.status == "recording":
             end_time = datetime.utcnow()
             duration = (end_time - recording.startTime).total_seconds()
+            if duration > self.max_recording_seconds:
+                # Session outlived its client; don't bill the whole gap as footage
+                duration = self.max_recording_seconds
+                end_time = recording.startTime + timedelta(seconds=duration)
             file_size = duration * 0.5  # Simulate file size (0.5 MB per second)
             
-            await self.recordings_collection.update_one(
-                {"id": recording_id},
-                {
-                    "$set": {
-                        "endTime": end_time,
-                        "duration": duration,
-                        "fileSize": file_size,
-                        "status": "completed"
-                    }
-                }
-            )
+            completed = await self.repository.complete_recording(recording_id, {
+                "endTime": end_time,
+                "duration": duration,
+                "fileSize": file_size,
+                "status": "completed"
+            })
+            if not completed:
+                return None  # Stopped or reaped concurrently
             return await self.get_recording(recording_id)
         return None
 
+    async def reap_stale_recordings(self, started_before: datetime, action: str, limit: int) -> int:
+        """Close up to ``limit`` active recordings started before the cutoff.
+
+        ``action`` is ``"fail"`` to mark them failed or ``"complete"`` to
+        complete them with a duration capped at ``max_recording_seconds``.
+        """
+        recording_ids = await self.repository.find_recording_ids("recording", started_before, limit)
+        if not recording_ids:
+            return 0
+
+        now = datetime.utcnow()
+        if action == "fail":
+            return await self.repository.fail_recordings(recording_ids, now)
+        if action == "complete":
+            return await self.repository.complete_recordings_capped(recording_ids, now, self.max_recording_seconds)
+        raise ValueError(f"Unknown reap action: {action}")
+
     async def get_recording(self, recording_id: str) -> Optional[Recording]:
         """Get specific recording by ID"""
-        recording_doc = await self.recordings_collection.find_one({"id": recording_id})
-        if recording_doc:
-            return Recording(**recording_doc)
-        return None
+        recording_doc = await self.repository.find_recording(recording_id)
+        return self._to_model(Recording, recording_doc)
+
+    async def get_active_recording(self) -> Optional[Recording]:
+        """Get the most recently started recording that is still running"""
+        recording_doc = await self.repository.find_active_recording()
+        return self._to_model(Recording, recording_doc)
 
     async def get_all_recordings(self) -> List[Recording]:
         """Get all recordings"""
-        cursor = self.recordings_collection.find().sort("startTime", -1)
-        recordings_list = await cursor.to_list(length=100)
-        return [Recording(**recording) for recording in recordings_list]
+        recordings_list = await self.repository.list_recordings(100)
+        return await self._build_models(Recording, recordings_list)
 
     async def delete_recording(self, recording_id: str) -> bool:
         """Delete recording"""
-        result = await self.recordings_collection.delete_one({"id": recording_id})
-        return result.deleted_count > 0
+        if await self.repository.delete_recording(recording_id):
+            await self.repository.delete_recording_media([recording_id])
+            return True
+        return False
+
+    async def purge_recordings(self, status: str, started_before: datetime, limit: int) -> int:
+        """Delete up to ``limit`` recordings with ``status`` started before the cutoff, with their media"""
+        recording_ids = await self.repository.find_recording_ids(status, started_before, limit)
+        if not recording_ids:
+            return 0
+        # Re-check the filter in the delete: a recording stopped or reaped since the lookup must survive
+        deleted = await self.repository.delete_recordings(recording_ids, status, started_before)
+        if deleted:
+            remaining = set(await self.repository.find_existing_recording_ids(recording_ids))
+            await self.repository.delete_recording_media([i for i in recording_ids if i not in remaining])
+        return deleted
 
     async def get_camera_status(self) -> CameraStatus:
         """Get current camera status"""
-        status_doc = await self.status_collection.find_one({}, sort=[("lastUpdate", -1)])
+        if self.caches is not None:
+            cached = self.caches.status.get(STATUS_CACHE_KEY)
+            if cached is not None:
+                return cached
+            generation = self.caches.status.generation
+        status_doc = await self.repository.find_latest_status()
         if status_doc:
-            return CameraStatus(**status_doc)
+            status = self._to_model(CameraStatus, status_doc)
+            if self.caches is not None:
+                self.caches.status.set(STATUS_CACHE_KEY, status, generation)
+            return status
         
         # Return default status if none exists
         default_status = CameraStatus()
-        await self.status_collection.insert_one(default_status.dict())
+        await self.repository.insert_status(default_status.dict())
         return default_status
 
+    async def apply_status_sample(self, fields: dict, sampled_at: datetime) -> Optional[CameraStatus]:
+        """Update the status from a telemetry sample; returns None when the snapshot already reflects a newer one"""
+        # The conditional update needs a snapshot to match
+        await self.get_camera_status()
+        status_doc = await self.repository.update_status_if_newer({**fields, "lastUpdate": datetime.utcnow()}, sampled_at)
+        if status_doc is None:
+            return None
+        status = self._to_model(CameraStatus, status_doc)
+        self._publish(STATUS_CHANNEL, "replace", document=status.dict())
+        return status
+
     async def update_camera_status(self, status_data: dict) -> CameraStatus:
         """Update camera status"""
         status_data["lastUpdate"] = datetime.utcnow()
         
         # Upsert the status (update if exists, create if doesn't)
-        await self.status_collection.replace_one(
-            {},  # Match any document
-            status_data,
-            upsert=True
+        await self.repository.replace_status(status_data)
+        status = CameraStatus(**status_data)
+        self._publish(STATUS_CHANNEL, "replace", document=status.dict())
+        return status
+
+    async def get_bootstrap(self, presets_limit: int = 20) -> CameraBootstrap:
+        """Get everything a client needs on startup, fetched concurrently"""
+        status, presets, active_recording = await asyncio.gather(
+            self.get_camera_status(),
+            self.get_all_settings(limit=presets_limit),
+            self.get_active_recording()
+        )
+        return CameraBootstrap(
+            capabilities=self.get_camera_capabilities(),
+            status=status,
+            presets=presets,
+            activeRecording=active_recording
         )
-        return CameraStatus(**status_data)
 
     def get_camera_capabilities(self) -> CameraCapabilities:
         """Get camera capabilities and supported values"""
-        return CameraCapabilities(
-            modes=[
-                {"id": "manual", "name": "Manual", "description": "Full manual control"},
-                {"id": "auto", "name": "Auto", "description": "Automatic settings"},
-                {"id": "cinema", "name": "Cinema", "description": "Cinema optimized"},
-                {"id": "portrait", "name": "Portrait", "description": "Portrait mode"},
-                {"id": "landscape", "name": "Landscape", "description": "Landscape mode"}
-            ],
-            isoValues=[100, 200, 400, 800, 1600, 3200, 6400, 12800],
-            apertureValues=[1.4, 2, 2.8, 4, 5.6, 8, 11, 16],
-            shutterSpeeds=["1/4000", "1/2000", "1/1000", "1/500", "1/250", "1/125", "1/60", "1/30", "1/15", "1/8"],
-            whiteBalanceOptions=[
-                {"id": "auto", "name": "Auto", "temp": 5500},
-                {"id": "daylight", "name": "Daylight", "temp": 5500},
-                {"id": "cloudy", "name": "Cloudy", "temp": 6500},
-                {"id": "tungsten", "name": "Tungsten", "temp": 3200},
-                {"id": "fluorescent", "name": "Fluorescent", "temp": 4000},
-                {"id": "flash", "name": "Flash", "temp": 5500}
-            ],
-            recordingFormats=["4K UHD", "FHD", "HD"],
-            frameRates=["24p", "30p", "60p", "120p"],
-            colorProfiles=["S-Log3", "Standard", "Cinema", "Vivid"]
-        )
\ No newline at end of file
+        return build_camera_capabilities()
+
+@functools.lru_cache(maxsize=1)
+def build_camera_capabilities() -> CameraCapabilities:
+    """Capabilities are static, so they are validated once per process and shared"""
+    return CameraCapabilities(
+        modes=[
+            {"id": "manual", "name": "Manual", "description": "Full manual control"},
+            {"id": "auto", "name": "Auto", "description": "Automatic settings"},
+            {"id": "cinema", "name": "Cinema", "description": "Cinema optimized"},
+            {"id": "portrait", "name": "Portrait", "description": "Portrait mode"},
+            {"id": "landscape", "name": "Landscape", "description": "Landscape mode"}
+        ],
+        isoValues=[100, 200, 400, 800, 1600, 3200, 6400, 12800],
+        apertureValues=[1.4, 2, 2.8, 4, 5.6, 8, 11, 16],
+        shutterSpeeds=["1/4000", "1/2000", "1/1000", "1/500", "1/250", "1/125", "1/60", "1/30", "1/15", "1/8"],
+        whiteBalanceOptions=[
+            {"id": "auto", "name": "Auto", "temp": 5500},
+            {"id": "daylight", "name": "Daylight", "temp": 5500},
+            {"id": "cloudy", "name": "Cloudy", "temp": 6500},
+            {"id": "tungsten", "name": "Tungsten", "temp": 3200},
+            {"id": "fluorescent", "name": "Fluorescent", "temp": 4000},
+            {"id": "flash", "name": "Flash", "temp": 5500}
+        ],
+        recordingFormats=["4K UHD", "FHD", "HD"],
+        frameRates=["24p", "30p", "60p", "120p"],
+        colorProfiles=["S-Log3", "Standard", "Cinema", "Vivid"]
+    )
\ No newline at end of file
@@ -0,0 +1,218 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel, Field
+from pymongo.errors import OperationFailure, PyMongoError
+from repositories.document_ids import api_id, from_storage
+from services.metrics import COORDINATION_CONNECTED, COORDINATION_EVENTS, EVENT_SUBSCRIBERS
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATUS_CHANNEL = "status"
+SETTINGS_CHANNEL = "settings"
+CHANNELS = (STATUS_CHANNEL, SETTINGS_CHANNEL)
+
+# Collections watched by the change stream and the channel each one feeds
+COLLECTION_CHANNELS = {"camera_status": STATUS_CHANNEL, "camera_settings": SETTINGS_CHANNEL}
+
+# "$changeStream is only supported on replica sets"
+_CHANGE_STREAMS_UNSUPPORTED = {40573}
+
+class CameraEvent(BaseModel):
+    channel: str
+    operation: str  # insert, update, replace, delete, or resync after missed events
+    documentId: Optional[str] = None
+    document: Optional[Dict[str, Any]] = None
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+EventListener = Callable[[CameraEvent], None]
+
+class EventBus(ABC):
+    """Fans camera change events out to cache invalidation listeners and subscriber queues.
+
+    Listeners run synchronously on the event loop for every event. Each
+    subscriber gets a bounded queue; a subscriber that falls behind loses
+    its oldest events rather than holding memory for the whole process.
+    """
+
+    def __init__(self, subscriber_queue_size: int = 100):
+        self.subscriber_queue_size = subscriber_queue_size
+        self._listeners: List[EventListener] = []
+        self._subscribers: Dict[asyncio.Queue, Set[str]] = {}
+
+    def add_listener(self, listener: EventListener):
+        self._listeners.append(listener)
+
+    def subscribe(self, channels: Iterable[str] = CHANNELS) -> asyncio.Queue:
+        """Queue that receives events on ``channels`` until ``unsubscribe`` is called"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self._subscribers[queue] = set(channels)
+        EVENT_SUBSCRIBERS.set(len(self._subscribers))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+        EVENT_SUBSCRIBERS.set(len(self._subscribers))
+
+    @abstractmethod
+    def publish(self, event: CameraEvent):
+        """Announce a change made by this process"""
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def invalidate(self, event: CameraEvent):
+        """Run the cache listeners for an event without delivering it to subscribers"""
+        self._notify_listeners(event)
+
+    def _notify_listeners(self, event: CameraEvent):
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Event listener failed for %s %s", event.channel, event.operation)
+
+    def _dispatch(self, event: CameraEvent):
+        COORDINATION_EVENTS.inc(channel=event.channel)
+        self._notify_listeners(event)
+        for queue, channels in self._subscribers.items():
+            if event.channel not in channels:
+                continue
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+class InProcessEventBus(EventBus):
+    """Delivers events only within this process; used for in-memory storage and single workers"""
+
+    def publish(self, event: CameraEvent):
+        self._dispatch(event)
+
+class DeferredEventBus(EventBus):
+    """Holds events published inside a transaction until it commits.
+
+    ``flush`` hands them to ``target`` after a commit; ``discard`` only
+    invalidates caches, since a rolled-back write must not reach subscribers.
+    """
+
+    def __init__(self, target: EventBus):
+        super().__init__()
+        self.target = target
+        self.pending: List[CameraEvent] = []
+
+    def publish(self, event: CameraEvent):
+        self.pending.append(event)
+
+    def flush(self):
+        for event in self.pending:
+            self.target.publish(event)
+        self.pending.clear()
+
+    def discard(self):
+        for event in self.pending:
+            self.target.invalidate(event)
+        self.pending.clear()
+
+class ChangeStreamEventBus(EventBus):
+    """Delivers changes from every worker by watching MongoDB change streams.
+
+    Writes reach all workers, including the one that made them, through the
+    stream, so ``publish`` only invalidates local caches straight away to
+    keep read-your-writes. The stream resumes from its last token after
+    errors; when events may have been missed a ``resync`` event clears every
+    cache. Change streams need a replica set (a single-node one is enough);
+    against a standalone server the bus falls back to in-process delivery.
+    """
+
+    def __init__(self, database: AsyncIOMotorDatabase, subscriber_queue_size: int = 100, max_retry_delay: float = 30.0):
+        super().__init__(subscriber_queue_size)
+        self.database = database
+        self.max_retry_delay = max_retry_delay
+        self.fallback = False
+        self.connected = False
+        self._resume_token: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self, event: CameraEvent):
+        if self.fallback:
+            self._dispatch(event)
+        else:
+            self.invalidate(event)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._set_connected(False)
+
+    async def _run(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(COLLECTION_CHANNELS)}}}]
+        delay = 1.0
+        while True:
+            try:
+                async with self.database.watch(pipeline, full_document="updateLookup", resume_after=self._resume_token) as stream:
+                    self._set_connected(True)
+                    delay = 1.0
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        event = change_to_event(change)
+                        if event is not None:
+                            self._dispatch(event)
+            except OperationFailure as e:
+                if e.code in _CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning("MongoDB change streams unavailable (%s); falling back to in-process events", e)
+                    self.fallback = True
+                    self._set_connected(False)
+                    return
+                logger.warning("Change stream failed: %s", e)
+                # The resume point may have aged out of the oplog
+                self._resume_token = None
+            except PyMongoError as e:
+                logger.warning("Change stream interrupted: %s", e)
+            if self.connected:
+                self._set_connected(False)
+                self._resync()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def _resync(self):
+        for channel in CHANNELS:
+            self._dispatch(CameraEvent(channel=channel, operation="resync"))
+
+    def _set_connected(self, connected: bool):
+        self.connected = connected
+        COORDINATION_CONNECTED.set(1 if connected else 0)
+
+def change_to_event(change: dict) -> Optional[CameraEvent]:
+    """Translate a change stream document into a CameraEvent"""
+    channel = COLLECTION_CHANNELS.get(change.get("ns", {}).get("coll"))
+    if channel is None:
+        return None
+    document = from_storage(change.get("fullDocument"))
+    document_id = document.get("id") if document else None
+    if document_id is None and channel != STATUS_CHANNEL:
+        # Deletes only carry the _id, which is the preset id unless the document predates binary ids
+        stored_id = change.get("documentKey", {}).get("_id")
+        document_id = api_id(stored_id) if stored_id is not None and not isinstance(stored_id, ObjectId) else None
+    return CameraEvent(
+        channel=channel,
+        operation=change["operationType"],
+        # Listeners treat a missing id as "anything on the channel"
+        documentId=document_id,
+        document=document
+    )
@@ -0,0 +1,112 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from services.metrics import EXECUTOR_ACTIVE, EXECUTOR_QUEUE_DEPTH, EXECUTOR_TASK_DURATION
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import time
+
+class BoundedExecutor:
+    """Runs CPU-heavy calls off the event loop with a cap on concurrent calls.
+
+    Callers beyond ``max_concurrency`` wait on an asyncio semaphore rather
+    than piling work into the pool, and the number waiting is exported as
+    the pool's queue depth. Thread pools copy the caller's context so
+    per-request profiling still sees the work; process pools require
+    picklable functions and arguments.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_concurrency: Optional[int] = None, use_processes: bool = False, mp_context: Optional[str] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers
+        self.use_processes = use_processes
+        self.mp_context = mp_context
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.queue_depth = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                context = multiprocessing.get_context(self.mp_context) if self.mp_context else None
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``func(*args, **kwargs)`` in the pool once a slot is free"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        call = functools.partial(func, *args, **kwargs)
+        if not self.use_processes:
+            call = functools.partial(contextvars.copy_context().run, call)
+
+        self.queue_depth += 1
+        EXECUTOR_QUEUE_DEPTH.inc(pool=self.name)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queue_depth -= 1
+            EXECUTOR_QUEUE_DEPTH.dec(pool=self.name)
+
+        EXECUTOR_ACTIVE.inc(pool=self.name)
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+        finally:
+            EXECUTOR_TASK_DURATION.observe(time.perf_counter() - start, pool=self.name)
+            EXECUTOR_ACTIVE.dec(pool=self.name)
+            self._semaphore.release()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+_cpu_executor: Optional[BoundedExecutor] = None
+
+def get_cpu_executor() -> BoundedExecutor:
+    """Get the shared thread pool for CPU work such as building large model lists"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        workers = int(os.environ.get('CPU_EXECUTOR_WORKERS', min(4, os.cpu_count() or 1)))
+        _cpu_executor = BoundedExecutor(
+            "cpu",
+            max_workers=workers,
+            max_concurrency=int(os.environ.get('CPU_EXECUTOR_CONCURRENCY', workers))
+        )
+    return _cpu_executor
+
+_stacking_executor: Optional[BoundedExecutor] = None
+
+def get_stacking_executor() -> BoundedExecutor:
+    """Get the process pool that merges frame tiles for multi-frame stacking.
+
+    Workers are spawned rather than forked so they never inherit the
+    server's driver threads or open sockets.
+    """
+    global _stacking_executor
+    if _stacking_executor is None:
+        workers = int(os.environ.get('STACKING_WORKERS', os.cpu_count() or 1))
+        _stacking_executor = BoundedExecutor(
+            "stacking",
+            max_workers=workers,
+            max_concurrency=int(os.environ.get('STACKING_CONCURRENCY', workers * 2)),
+            use_processes=True,
+            mp_context="spawn"
+        )
+    return _stacking_executor
+
+def shutdown_executors():
+    global _cpu_executor, _stacking_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown()
+        _cpu_executor = None
+    if _stacking_executor is not None:
+        _stacking_executor.shutdown()
+        _stacking_executor = None
@@ -0,0 +1,209 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from bson.binary import Binary
+from models.frames import FrameAppendResult, FrameColumnSummary, FrameMetadataRange, FrameMetadataSummary
+from repositories.camera_repository import CameraRepository
+from services.executor import get_cpu_executor
+import numpy as np
+import os
+import re
+import zlib
+
+FRAMES_MEDIA_TYPE = "application/vnd.camera.frames+struct"
+
+# Packed little-endian per-frame record (16 bytes); uploads and binary reads use this layout
+FRAME_DTYPE = np.dtype([
+    ("iso", "<u2"),
+    ("shutter", "<f4"),  # exposure time in seconds
+    ("exposure", "<f4"),  # exposure compensation (EV)
+    ("focus", "<u2"),  # focal distance in mm
+    ("zoom", "<f4"),
+])
+FRAME_FIELDS = FRAME_DTYPE.names
+
+class FrameMetadataError(ValueError):
+    """Raised for malformed uploads or out-of-range reads"""
+
+class FrameConflictError(Exception):
+    """Raised when an append does not start where the stored frames end"""
+
+class FramePartialAppendError(FrameConflictError):
+    """Raised when a concurrent append wins a later chunk after earlier chunks of this append were stored"""
+
+    def __init__(self, message: str, result: FrameAppendResult):
+        super().__init__(message)
+        self.result = result
+
+def frames_per_second(frame_rate: str) -> int:
+    """Parse '24p' / '119.88p' style frame rates into whole frames per second"""
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", frame_rate or "")
+    if not match:
+        raise FrameMetadataError(f"Unrecognised frame rate: {frame_rate}")
+    return max(1, int(round(float(match.group(1)))))
+
+def encode_chunk(records: np.ndarray, level: int) -> Dict[str, Binary]:
+    """Compress each column of a chunk separately so reads can decode only what they need"""
+    return {
+        name: Binary(zlib.compress(np.ascontiguousarray(records[name]).tobytes(), level))
+        for name in FRAME_FIELDS
+    }
+
+def decode_column(chunk: dict, name: str) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(chunk["columns"][name]), dtype=FRAME_DTYPE.fields[name][0])
+
+def decode_chunk(chunk: dict) -> np.ndarray:
+    records = np.empty(chunk["count"], dtype=FRAME_DTYPE)
+    for name in FRAME_FIELDS:
+        records[name] = decode_column(chunk, name)
+    return records
+
+def summarize_columns(columns: Dict[str, np.ndarray], first_frame: int, fps: int) -> Tuple[List[int], Dict[str, FrameColumnSummary]]:
+    """Per-second min/max/mean for each column using reduceat over second boundaries"""
+    count = len(next(iter(columns.values()))) if columns else 0
+    if count == 0:
+        return [], {name: FrameColumnSummary(min=[], max=[], mean=[]) for name in columns}
+    frame_numbers = np.arange(first_frame, first_frame + count)
+    second_index = frame_numbers // fps
+    boundaries = np.flatnonzero(np.diff(second_index, prepend=second_index[0] - 1))
+    sizes = np.diff(np.append(boundaries, count))
+
+    summaries = {}
+    for name, values in columns.items():
+        values = values.astype(np.float64)
+        summaries[name] = FrameColumnSummary(
+            min=np.minimum.reduceat(values, boundaries).tolist(),
+            max=np.maximum.reduceat(values, boundaries).tolist(),
+            mean=(np.add.reduceat(values, boundaries) / sizes).tolist(),
+        )
+    return second_index[boundaries].tolist(), summaries
+
+class FrameMetadataService:
+    """Stores per-frame recording metadata as chunked, zlib-compressed columnar arrays.
+
+    Frames are grouped into chunks of ``chunk_frames`` and each column of a
+    chunk is compressed on its own, so a range read fetches only the chunks
+    that overlap the window and decompresses only the requested columns.
+    Uploads must be contiguous: each append starts at the current frame count.
+    Chunks are written in order without a transaction, so an append spanning
+    several chunks can lose a race part-way; the frames stored so far stay
+    stored and are reported so the client can resume from that frame.
+    """
+
+    def __init__(self, repository: CameraRepository):
+        self.repository = repository
+        self.chunk_frames = int(os.environ.get('FRAME_CHUNK_SIZE', 4096))
+        self.compression_level = int(os.environ.get('FRAME_COMPRESSION_LEVEL', 6))
+
+    async def frame_count(self, recording_id: str) -> int:
+        last_chunk = await self.repository.find_last_frame_chunk(recording_id)
+        if last_chunk is None:
+            return 0
+        return last_chunk["startFrame"] + last_chunk["count"]
+
+    async def append_frames(self, recording_id: str, body: bytes, start_frame: Optional[int] = None) -> FrameAppendResult:
+        """Append packed frame records, merging into the partially filled last chunk"""
+        if len(body) % FRAME_DTYPE.itemsize:
+            raise FrameMetadataError(
+                f"Body length {len(body)} is not a multiple of the {FRAME_DTYPE.itemsize}-byte frame record size"
+            )
+        records = np.frombuffer(body, dtype=FRAME_DTYPE)
+        last_chunk = await self.repository.find_last_frame_chunk(recording_id)
+        stored = 0 if last_chunk is None else last_chunk["startFrame"] + last_chunk["count"]
+        if start_frame is not None and start_frame != stored:
+            raise FrameConflictError(f"Append must start at frame {stored}")
+        if len(records) == 0:
+            return FrameAppendResult(recordingId=recording_id, frameCount=stored)
+
+        chunks = await get_cpu_executor().run(self._build_chunks, recording_id, records, last_chunk)
+        written: List[int] = []
+        for chunk, expected_count in chunks:
+            if not await self.repository.save_frame_chunk(chunk, expected_count):
+                if not written:
+                    raise FrameConflictError("Frames were appended concurrently; refetch the frame count and retry")
+                raise FramePartialAppendError(
+                    f"Frames were appended concurrently after {len(written)} of {len(chunks)} chunks were stored; "
+                    f"resume from frame {stored}",
+                    FrameAppendResult(recordingId=recording_id, frameCount=stored, chunksWritten=len(written), chunkIndexes=written)
+                )
+            written.append(chunk["chunkIndex"])
+            stored = chunk["startFrame"] + chunk["count"]
+        return FrameAppendResult(recordingId=recording_id, frameCount=stored, chunksWritten=len(chunks), chunkIndexes=written)
+
+    def _build_chunks(self, recording_id: str, records: np.ndarray, last_chunk: Optional[dict]) -> List[Tuple[dict, Optional[int]]]:
+        """Split new records on chunk boundaries; returns (chunk, count it must replace)"""
+        start = 0 if last_chunk is None else last_chunk["startFrame"] + last_chunk["count"]
+        if last_chunk is not None and last_chunk["count"] < self.chunk_frames:
+            # Re-encode the partial last chunk together with the new frames
+            records = np.concatenate([decode_chunk(last_chunk), records])
+            start = last_chunk["startFrame"]
+
+        chunks = []
+        for offset in range(0, len(records), self.chunk_frames):
+            part = records[offset:offset + self.chunk_frames]
+            first_frame = start + offset
+            chunk_index = first_frame // self.chunk_frames
+            expected = last_chunk["count"] if last_chunk is not None and chunk_index == last_chunk["chunkIndex"] else None
+            chunks.append(({
+                "recordingId": recording_id,
+                "chunkIndex": chunk_index,
+                "startFrame": first_frame,
+                "count": len(part),
+                "columns": encode_chunk(part, self.compression_level),
+            }, expected))
+        return chunks
+
+    async def _read_columns(self, recording_id: str, start: int, end: Optional[int], fields: Sequence[str]) -> Tuple[int, int, Dict[str, np.ndarray]]:
+        unknown = [name for name in fields if name not in FRAME_FIELDS]
+        if unknown:
+            raise FrameMetadataError(f"Unknown frame fields: {', '.join(unknown)}")
+        total = await self.frame_count(recording_id)
+        end = total if end is None else min(end, total)
+        if start < 0 or start > end:
+            raise FrameMetadataError(f"Invalid frame range {start}-{end} (recording has {total} frames)")
+        if start == end:
+            return start, end, {name: np.empty(0, dtype=FRAME_DTYPE.fields[name][0]) for name in fields}
+
+        chunks = await self.repository.find_frame_chunks(
+            recording_id, start // self.chunk_frames, (end - 1) // self.chunk_frames, list(fields)
+        )
+
+        def decode() -> Dict[str, np.ndarray]:
+            window_start = chunks[0]["startFrame"]
+            columns = {}
+            for name in fields:
+                column = np.concatenate([decode_column(chunk, name) for chunk in chunks])
+                columns[name] = column[start - window_start:end - window_start]
+            return columns
+
+        return start, end, await get_cpu_executor().run(decode)
+
+    async def read_range(self, recording_id: str, start: int, end: Optional[int], fields: Sequence[str] = FRAME_FIELDS) -> FrameMetadataRange:
+        """Decode only the chunks and columns covering [start, end)"""
+        start, end, columns = await self._read_columns(recording_id, start, end, fields)
+        return FrameMetadataRange(
+            recordingId=recording_id,
+            start=start,
+            end=end,
+            columns={name: values.tolist() for name, values in columns.items()}
+        )
+
+    async def read_range_packed(self, recording_id: str, start: int, end: Optional[int]) -> bytes:
+        """Frames in [start, end) as packed FRAME_DTYPE records"""
+        start, end, columns = await self._read_columns(recording_id, start, end, FRAME_FIELDS)
+        records = np.empty(end - start, dtype=FRAME_DTYPE)
+        for name, values in columns.items():
+            records[name] = values
+        return records.tobytes()
+
+    async def summarize(self, recording_id: str, frame_rate: str, start: int, end: Optional[int], fields: Sequence[str] = FRAME_FIELDS) -> FrameMetadataSummary:
+        """Per-second min/max/mean of each column over [start, end)"""
+        fps = frames_per_second(frame_rate)
+        start, end, columns = await self._read_columns(recording_id, start, end, fields)
+        seconds, summaries = await get_cpu_executor().run(summarize_columns, columns, start, fps)
+        return FrameMetadataSummary(
+            recordingId=recording_id,
+            fps=fps,
+            start=start,
+            end=end,
+            seconds=seconds,
+            columns=summaries
+        )
@@ -0,0 +1,73 @@
+from typing import Optional
+from repositories.camera_repository import CameraRepository
+import asyncio
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "binary_id_migration"
+
+class BinaryIdMigration:
+    """Background task that rewrites documents keyed by a string ``id`` to binary UUID ``_id``s.
+
+    Runs online in batches of ``batch_size`` with a ``batch_pause`` between
+    them. Only the worker holding the migration lease works; the others
+    check back every ``retry_interval`` seconds and exit once nothing is
+    left. The task ends when a batch finds no legacy documents.
+    """
+
+    def __init__(
+        self,
+        repository: CameraRepository,
+        batch_size: int = 500,
+        batch_pause: float = 0.2,
+        lease_seconds: float = 60.0,
+        retry_interval: float = 300.0,
+    ):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.lease_seconds = lease_seconds
+        self.retry_interval = retry_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.migrated = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def migrate(self) -> bool:
+        """Migrate batches while holding the lease; returns whether everything is migrated"""
+        while await self.repository.acquire_lease(LEASE_NAME, self.owner, self.lease_seconds):
+            processed = await self.repository.migrate_legacy_ids(self.batch_size)
+            if processed == 0:
+                return True
+            self.migrated += processed
+            logger.info("Migrated %d documents to binary ids (%d so far)", processed, self.migrated)
+            await asyncio.sleep(self.batch_pause)
+        return False
+
+    async def _run(self):
+        while True:
+            try:
+                if await self.migrate():
+                    if self.migrated:
+                        logger.info("Binary id migration finished after %d documents", self.migrated)
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Binary id migration batch failed")
+            await asyncio.sleep(self.retry_interval)
@@ -0,0 +1,234 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from services.metrics import record_cache_lookup
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class IdempotencyConflictError(Exception):
+    """Raised when an idempotency key is reused with a different request payload"""
+
+class IdempotencyInProgressError(Exception):
+    """Raised when the original request for a key is still running elsewhere"""
+
+class IdempotencyStore:
+    """Stores responses by Idempotency-Key so retried writes replay instead of re-running.
+
+    Completed responses live in a Mongo collection with a TTL index on
+    ``createdAt`` and in a bounded in-memory LRU used as the fast path.
+    Concurrent duplicates inside this process share one in-flight future;
+    duplicates from other processes are collapsed by the unique ``_id`` of
+    the pending key document. A pending document holds a lease
+    (``pendingUntil``) for ``lease_seconds`` that its owner renews while
+    the operation runs; if the owner dies before finishing, a retry takes
+    the key over once the lease has expired instead of waiting for the TTL.
+    Without a collection (in-memory storage) the store only deduplicates
+    within this process.
+    """
+
+    def __init__(
+        self,
+        collection: Optional[AsyncIOMotorCollection],
+        ttl_seconds: int = 86400,
+        max_memory_entries: int = 10000,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+        lease_seconds: float = 10.0,
+    ):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.wait_timeout = wait_timeout
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._memory: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._indexes_ready = False
+
+    async def ensure_indexes(self):
+        """Create the TTL index that expires stored keys"""
+        if not self._indexes_ready and self.collection is not None:
+            await self.collection.create_index("createdAt", expireAfterSeconds=self.ttl_seconds)
+            self._indexes_ready = True
+
+    async def execute(
+        self,
+        key: str,
+        scope: str,
+        payload: Any,
+        operation: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """Run ``operation`` once per key and scope.
+
+        Returns the JSON-compatible response body and whether it was replayed
+        from an earlier request.
+        """
+        storage_key = f"{scope}:{key}"
+        fingerprint = self._fingerprint(payload)
+
+        while True:
+            record = self._get_cached(storage_key)
+            if record is not None:
+                return self._replay(record, fingerprint), True
+
+            inflight = self._inflight.get(storage_key)
+            if inflight is None:
+                break
+            record = await asyncio.shield(inflight)
+            if record is not None:
+                return self._replay(record, fingerprint), True
+            # The in-flight request failed, so this one gets to try
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[storage_key] = future
+        record = None
+        try:
+            record, replayed = await self._execute_once(storage_key, fingerprint, operation)
+        finally:
+            del self._inflight[storage_key]
+            future.set_result(record)
+
+        if replayed:
+            return self._replay(record, fingerprint), True
+        return record["response"], False
+
+    async def _execute_once(
+        self,
+        storage_key: str,
+        fingerprint: str,
+        operation: Callable[[], Awaitable[Any]],
+    ) -> Tuple[dict, bool]:
+        if self.collection is None:
+            record = {"fingerprint": fingerprint, "response": jsonable_encoder(await operation())}
+            self._remember(storage_key, record)
+            return record, False
+
+        await self.ensure_indexes()
+        lease_id = uuid.uuid4().hex
+        while True:
+            now = datetime.utcnow()
+            try:
+                await self.collection.insert_one({
+                    "_id": storage_key,
+                    "fingerprint": fingerprint,
+                    "status": "pending",
+                    "leaseId": lease_id,
+                    "pendingUntil": now + timedelta(seconds=self.lease_seconds),
+                    "createdAt": now,
+                })
+                break
+            except DuplicateKeyError:
+                record = await self._wait_for_completion(storage_key, fingerprint, lease_id)
+                if record is None:
+                    # The original request failed and released the key; claim it
+                    continue
+                if record.get("leaseId") == lease_id:
+                    # The original owner died and its lease expired; this request took over
+                    break
+                self._remember(storage_key, record)
+                return record, True
+
+        heartbeat = asyncio.create_task(self._renew_lease(storage_key, lease_id))
+        try:
+            result = await operation()
+        except BaseException:
+            await self.collection.delete_one({"_id": storage_key, "status": "pending", "leaseId": lease_id})
+            raise
+        finally:
+            heartbeat.cancel()
+
+        record = {"fingerprint": fingerprint, "response": jsonable_encoder(result)}
+        completed = await self.collection.update_one(
+            {"_id": storage_key, "status": "pending", "leaseId": lease_id},
+            {"$set": {"status": "completed", "response": record["response"]}, "$unset": {"pendingUntil": ""}}
+        )
+        if completed.matched_count == 0:
+            # Another request took the key over, so the operation may have run twice
+            logger.error("Idempotency lease for %s was lost before the operation finished", storage_key)
+        self._remember(storage_key, record)
+        return record, False
+
+    async def _renew_lease(self, storage_key: str, lease_id: str):
+        """Push ``pendingUntil`` forward while the owner's operation runs; stops once the lease is lost"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await self.collection.update_one(
+                    {"_id": storage_key, "status": "pending", "leaseId": lease_id},
+                    {"$set": {"pendingUntil": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+                )
+            except Exception:
+                logger.warning("Failed to renew idempotency lease for %s", storage_key, exc_info=True)
+                continue
+            if renewed.matched_count == 0:
+                logger.error("Idempotency lease for %s was taken over while the operation was running", storage_key)
+                return
+
+    async def _wait_for_completion(self, storage_key: str, fingerprint: str, lease_id: str) -> Optional[dict]:
+        """Poll until another process finishes the request for this key.
+
+        Returns the completed record, None if the key was released, or the
+        taken-over pending document (carrying ``lease_id``) if the owner's
+        lease expired.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            doc = await self.collection.find_one({"_id": storage_key})
+            if doc is None:
+                return None
+            if doc.get("status") == "completed":
+                return {"fingerprint": doc["fingerprint"], "response": doc["response"]}
+            now = datetime.utcnow()
+            # Pending documents written before leases existed never expire on their own
+            if doc.get("pendingUntil", datetime.max) <= now:
+                if doc["fingerprint"] != fingerprint:
+                    raise IdempotencyConflictError("Idempotency-Key was already used with a different request payload")
+                taken = await self.collection.find_one_and_update(
+                    {"_id": storage_key, "status": "pending", "leaseId": doc.get("leaseId")},
+                    {"$set": {"leaseId": lease_id, "pendingUntil": now + timedelta(seconds=self.lease_seconds)}},
+                    return_document=ReturnDocument.AFTER
+                )
+                if taken is not None:
+                    return taken
+                continue
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgressError("A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(self.poll_interval)
+
+    def _get_cached(self, storage_key: str) -> Optional[dict]:
+        entry = self._memory.get(storage_key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._memory[storage_key]
+            entry = None
+        record_cache_lookup("idempotency", entry is not None)
+        if entry is None:
+            return None
+        self._memory.move_to_end(storage_key)
+        return entry[1]
+
+    def _remember(self, storage_key: str, record: dict):
+        self._memory[storage_key] = (time.monotonic() + self.ttl_seconds, record)
+        self._memory.move_to_end(storage_key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _replay(record: dict, fingerprint: str) -> Any:
+        if record["fingerprint"] != fingerprint:
+            raise IdempotencyConflictError("Idempotency-Key was already used with a different request payload")
+        return record["response"]
+
+    @staticmethod
+    def _fingerprint(payload: Any) -> str:
+        encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,47 @@
+from typing import Optional
+from services.metrics import EVENT_LOOP_LAG
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps for ``interval``.
+
+    Any lag beyond a few milliseconds means synchronous work is holding the
+    loop and delaying every concurrent request. Lag is exported as the
+    ``event_loop_lag_seconds`` histogram; stalls over ``warn_threshold``
+    are also logged.
+    """
+
+    def __init__(self, interval: float = 0.5, warn_threshold: float = 0.25):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag >= self.warn_threshold:
+                logger.warning("Event loop lagged %.1fms", lag * 1000)
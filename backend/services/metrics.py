@@ -0,0 +1,233 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+from pymongo import monitoring
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        # Updated from Motor's executor threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# HTTP
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code", ("method", "route", "status")))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method, route template and status code", ("method", "route", "status")))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"))
+
+# MongoDB
+MONGO_COMMAND_DURATION = REGISTRY.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trip time by command and outcome", ("command", "outcome"), MONGO_BUCKETS))
+MONGO_POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    "mongodb_pool_connections", "Open MongoDB pool connections by server", ("address",)))
+MONGO_POOL_CHECKED_OUT = REGISTRY.register(Gauge(
+    "mongodb_pool_checked_out_connections", "MongoDB pool connections currently checked out by server", ("address",)))
+MONGO_POOL_CHECKOUT_FAILURES = REGISTRY.register(Counter(
+    "mongodb_pool_checkout_failures_total", "Failed MongoDB pool checkouts by reason", ("reason",)))
+
+# Caches
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result")))
+
+# Background maintenance
+RECORDINGS_RETENTION_DELETED = REGISTRY.register(Counter(
+    "recordings_retention_deleted_total", "Recordings deleted by the retention sweeper by status", ("status",)))
+RECORDINGS_REAPED = REGISTRY.register(Counter(
+    "recordings_reaped_total", "Stale recording sessions closed by the reaper by action", ("action",)))
+
+# Event loop and executors
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a scheduled wakeup",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)))
+EXECUTOR_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "executor_queue_depth", "Offloaded calls waiting for an executor slot by pool", ("pool",)))
+EXECUTOR_ACTIVE = REGISTRY.register(Gauge(
+    "executor_active_tasks", "Offloaded calls currently running by pool", ("pool",)))
+EXECUTOR_TASK_DURATION = REGISTRY.register(Histogram(
+    "executor_task_duration_seconds", "Run time of offloaded calls by pool", ("pool",)))
+
+# Multi-worker coordination
+COORDINATION_EVENTS = REGISTRY.register(Counter(
+    "coordination_events_total", "Change events delivered to local caches and subscribers by channel", ("channel",)))
+COORDINATION_CONNECTED = REGISTRY.register(Gauge(
+    "coordination_change_stream_connected", "Whether this worker's MongoDB change stream is open"))
+EVENT_SUBSCRIBERS = REGISTRY.register(Gauge(
+    "event_subscribers", "Event stream subscribers connected to this worker"))
+
+# Multi-frame stacking
+STACKING_FRAMES = REGISTRY.register(Counter(
+    "stacking_frames_total", "Input frames merged by the stacking engine by method", ("method",)))
+STACKING_DURATION = REGISTRY.register(Histogram(
+    "stacking_duration_seconds", "Wall time to merge one frame batch by method", ("method",)))
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records MongoDB command durations from pymongo command monitoring"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, command=event.command_name, outcome="success")
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, command=event.command_name, outcome="failure")
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks MongoDB connection pool size and checkouts"""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc(address=_address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec(address=_address(event))
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.inc(reason=str(event.reason))
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.inc(address=_address(event))
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec(address=_address(event))
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
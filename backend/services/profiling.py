@@ -0,0 +1,239 @@
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from pymongo import monitoring
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Commands whose plan can be explained; anything else is only logged
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Driver/session fields that must not be passed back into explain
+_DRIVER_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+# Per-request profile filled in while the request runs (see ProfilingMiddleware)
+_request_profile: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_profile", default=None)
+
+def start_request_profile() -> Dict[str, float]:
+    profile = {"validation_s": 0.0}
+    _request_profile.set(profile)
+    return profile
+
+@contextmanager
+def profile_validation():
+    """Attribute the time spent building pydantic models to the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile = _request_profile.get()
+        if profile is not None:
+            profile["validation_s"] += time.perf_counter() - start
+
+def command_shape(value: Any, depth: int = 0) -> Any:
+    """Replace literal values in a command with '?' so similar queries group together"""
+    if depth > 6:
+        return "..."
+    if isinstance(value, dict):
+        return {key: command_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [command_shape(value[0], depth + 1)] if value else []
+    return "?"
+
+def summarize_plan(explain: dict) -> str:
+    """Flatten a winning plan into 'IXSCAN(index) -> FETCH -> LIMIT' form"""
+    planner = explain.get("queryPlanner") or explain.get("stages", [{}])[0].get("$cursor", {}).get("queryPlanner", {})
+    stage = planner.get("winningPlan", {})
+    stage = stage.get("queryPlan", stage)
+    parts = []
+    while stage:
+        name = stage.get("stage", "?")
+        if stage.get("indexName"):
+            name += f"({stage['indexName']})"
+        parts.append(name)
+        stage = stage.get("inputStage") or (stage.get("inputStages") or [None])[0]
+    return " -> ".join(reversed(parts)) if parts else "unknown"
+
+class SlowLog:
+    """Bounded record of slow requests, slow Mongo commands and loop-blocking stacks"""
+
+    def __init__(self, max_entries: int = 500):
+        self.max_entries = max_entries
+        self._entries: Dict[str, Deque[dict]] = {
+            "requests": deque(maxlen=max_entries),
+            "queries": deque(maxlen=max_entries),
+        }
+        self._stack_counts: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, entry: dict) -> dict:
+        entry.setdefault("timestamp", datetime.utcnow().isoformat())
+        with self._lock:
+            self._entries[kind].append(entry)
+        return entry
+
+    def record_stack(self, stack: str, blocked_ms: float):
+        with self._lock:
+            stats = self._stack_counts.get(stack)
+            if stats is None:
+                if len(self._stack_counts) >= self.max_entries:
+                    return
+                stats = self._stack_counts[stack] = {"stack": stack, "samples": 0, "maxBlockedMs": 0.0}
+            stats["samples"] += 1
+            stats["maxBlockedMs"] = max(stats["maxBlockedMs"], round(blocked_ms, 1))
+
+    def top(self, limit: int = 20) -> dict:
+        """Slowest entries of each kind plus the most frequently sampled blocking stacks"""
+        with self._lock:
+            requests = sorted(self._entries["requests"], key=lambda e: e["durationMs"], reverse=True)[:limit]
+            queries = sorted(self._entries["queries"], key=lambda e: e["durationMs"], reverse=True)[:limit]
+            stacks = sorted(self._stack_counts.values(), key=lambda s: s["samples"], reverse=True)[:limit]
+        return {"requests": requests, "queries": queries, "blockingStacks": [dict(s) for s in stacks]}
+
+    def clear(self):
+        with self._lock:
+            for entries in self._entries.values():
+                entries.clear()
+            self._stack_counts.clear()
+
+SLOW_LOG = SlowLog()
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Logs Mongo commands slower than ``threshold_ms`` with their shape and plan summary.
+
+    pymongo calls listeners from Motor's executor threads, so explains are
+    scheduled back onto the event loop. Each command shape is explained at
+    most once per ``explain_interval`` seconds.
+    """
+
+    def __init__(self, threshold_ms: float, explain: bool = True, explain_interval: float = 300.0, max_pending: int = 1000):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.max_pending = max_pending
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.database = None
+        self._pending: Dict[int, tuple] = {}
+        self._explained_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, loop: asyncio.AbstractEventLoop, database):
+        """Give the listener a loop and database to run explains on"""
+        self.loop = loop
+        self.database = database
+
+    def started(self, event):
+        if event.command_name == "explain":
+            return
+        with self._lock:
+            if len(self._pending) < self.max_pending:
+                self._pending[event.request_id] = (event.command_name, event.database_name, event.command)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        with self._lock:
+            pending = self._pending.pop(event.request_id, None)
+        duration_ms = event.duration_micros / 1000
+        if pending is None or duration_ms < self.threshold_ms:
+            return
+        command_name, database_name, command = pending
+        shape = command_shape({k: v for k, v in command.items() if k not in _DRIVER_FIELDS and not k.startswith("$")})
+        # The collection name is the command's value; keep it readable
+        shape[command_name] = command.get(command_name)
+        entry = SLOW_LOG.record("queries", {
+            "command": command_name,
+            "database": database_name,
+            "durationMs": round(duration_ms, 2),
+            "shape": shape,
+        })
+        logger.warning("Slow Mongo command %s took %.1fms: %s", command_name, duration_ms, shape)
+        if self.explain and command_name in EXPLAINABLE_COMMANDS:
+            self._schedule_explain(entry, command)
+
+    def _schedule_explain(self, entry: dict, command: dict):
+        if self.loop is None or self.database is None or self.loop.is_closed():
+            return
+        key = repr(entry["shape"])
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(key, -self.explain_interval) < self.explain_interval:
+                return
+            self._explained_at[key] = now
+        explainable = {k: v for k, v in command.items() if k not in _DRIVER_FIELDS and not k.startswith("$")}
+        asyncio.run_coroutine_threadsafe(self._explain(entry, explainable), self.loop)
+
+    async def _explain(self, entry: dict, command: dict):
+        try:
+            result = await self.database.command({"explain": command, "verbosity": "queryPlanner"})
+            entry["plan"] = summarize_plan(result)
+            logger.warning("Slow Mongo command %s plan: %s", entry["command"], entry["plan"])
+        except Exception as e:
+            entry["plan"] = f"explain failed: {e}"
+
+class LoopBlockingSampler:
+    """Opt-in watchdog thread that captures the event loop's stack while it is blocked.
+
+    A callback on the loop refreshes a heartbeat every ``interval`` seconds.
+    When the watchdog sees the heartbeat go stale for ``block_threshold``
+    seconds it samples the loop thread's current stack, so slow requests
+    can be traced to the synchronous code that stalled them.
+    """
+
+    def __init__(self, interval: float = 0.01, block_threshold: float = 0.05, max_samples: int = 2000):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.samples: Deque[dict] = deque(maxlen=max_samples)
+        self._heartbeat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._loop.call_soon(self._beat)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-blocking-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def samples_between(self, start: float, end: float) -> List[dict]:
+        """Stacks sampled while the loop was blocked between two monotonic timestamps"""
+        return [sample for sample in list(self.samples) if start <= sample["at"] <= end]
+
+    def _beat(self):
+        self._heartbeat = time.monotonic()
+        if not self._stop.is_set():
+            self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._heartbeat
+            if blocked < self.block_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=15))
+            self.samples.append({"at": time.monotonic(), "blockedMs": blocked * 1000, "stack": stack})
+            SLOW_LOG.record_stack(stack, blocked * 1000)
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from services.camera_service import CameraService
+from services.metrics import RECORDINGS_REAPED
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RecordingReaper:
+    """Background task that closes recording sessions abandoned by crashed clients.
+
+    Stale sessions are found through the ``(status, startTime)`` index and
+    closed with batched ``update_many`` calls, either as ``failed`` or as
+    ``completed`` with a capped duration.
+    """
+
+    def __init__(
+        self,
+        camera_service: CameraService,
+        stale_after: timedelta,
+        action: str = "fail",
+        interval: float = 300.0,
+        batch_size: int = 500,
+        batch_pause: float = 0.1,
+    ):
+        if action not in ("fail", "complete"):
+            raise ValueError(f"Unknown reap action: {action}")
+        self.camera_service = camera_service
+        self.stale_after = stale_after
+        self.action = action
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.stats: Dict[str, int] = {"runs": 0, "reaped": 0, "errors": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the periodic reap on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the periodic reap and wait for it to exit"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reap(self) -> int:
+        """Close every stale session once and return how many were closed"""
+        cutoff = datetime.utcnow() - self.stale_after
+        total = 0
+        while True:
+            count = await self.camera_service.reap_stale_recordings(cutoff, self.action, self.batch_size)
+            total += count
+            if count < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+        self.stats["runs"] += 1
+        self.stats["reaped"] += total
+        RECORDINGS_REAPED.inc(total, action=self.action)
+        return total
+
+    async def _run(self):
+        while True:
+            try:
+                reaped = await self.reap()
+                if reaped:
+                    logger.info("Reaped %d stale recording sessions (action=%s)", reaped, self.action)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats["errors"] += 1
+                logger.exception("Recording reaper failed")
+            await asyncio.sleep(self.interval)
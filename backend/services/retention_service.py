@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+from services.camera_service import CameraService
+from services.metrics import RECORDINGS_RETENTION_DELETED
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class RetentionPolicy(BaseModel):
+    status: str
+    max_age: timedelta
+
+def load_retention_policies() -> List[RetentionPolicy]:
+    """Build per-status retention policies from the environment.
+
+    A value of 0 disables retention for that status.
+    """
+    hours_by_status = {
+        "failed": float(os.environ.get('RETENTION_FAILED_HOURS', 168)),
+        "recording": float(os.environ.get('RETENTION_RECORDING_HOURS', 72)),
+        "completed": float(os.environ.get('RETENTION_COMPLETED_HOURS', 0)),
+    }
+    return [
+        RetentionPolicy(status=status, max_age=timedelta(hours=hours))
+        for status, hours in hours_by_status.items()
+        if hours > 0
+    ]
+
+class RetentionSweeper:
+    """Background task that deletes expired recordings in bounded, throttled batches.
+
+    Each batch removes at most ``batch_size`` recordings (and their media
+    blobs) and is followed by a ``batch_pause`` sleep so a large backlog never
+    monopolises Mongo or the event loop.
+    """
+
+    def __init__(
+        self,
+        camera_service: CameraService,
+        policies: List[RetentionPolicy],
+        interval: float = 3600.0,
+        batch_size: int = 500,
+        batch_pause: float = 0.5,
+    ):
+        self.camera_service = camera_service
+        self.policies = policies
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.stats: Dict[str, int] = {policy.status: 0 for policy in policies}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the periodic sweep on the running event loop"""
+        if self._task is None and self.policies:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the periodic sweep and wait for it to exit"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sweep(self) -> Dict[str, int]:
+        """Apply every policy once and return the number of recordings deleted per status"""
+        deleted: Dict[str, int] = {}
+        for policy in self.policies:
+            cutoff = datetime.utcnow() - policy.max_age
+            total = 0
+            while True:
+                count = await self.camera_service.purge_recordings(policy.status, cutoff, self.batch_size)
+                total += count
+                if count < self.batch_size:
+                    break
+                await asyncio.sleep(self.batch_pause)
+            deleted[policy.status] = total
+            self.stats[policy.status] += total
+            RECORDINGS_RETENTION_DELETED.inc(total, status=policy.status)
+        return deleted
+
+    async def _run(self):
+        while True:
+            try:
+                deleted = await self.sweep()
+                if any(deleted.values()):
+                    logger.info("Retention sweep deleted recordings: %s", deleted)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Retention sweep failed")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,372 @@
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from services.executor import BoundedExecutor, get_cpu_executor, get_stacking_executor
+from services.metrics import STACKING_DURATION, STACKING_FRAMES
+import asyncio
+import numpy as np
+import os
+import re
+import time
+
+STACK_METHODS = ("mean", "median", "sigma_clip", "hdr")
+STACK_DTYPES = {"uint8": np.dtype(np.uint8), "uint16": np.dtype(np.uint16), "float32": np.dtype(np.float32)}
+
+# Rec. 709 luma weights used to key the HDR tone curve on RGB frames
+LUMA_WEIGHTS = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+# Scaled median absolute deviation matches the standard deviation for Gaussian noise
+MAD_TO_SIGMA = 1.4826
+# Bursts up to this many frames are ranked with a min/max sorting network instead of np.sort
+SORT_NETWORK_MAX_FRAMES = 12
+# Floor for HDR pixel weights so fully clipped pixels still get a value
+MIN_HDR_WEIGHT = 1e-4
+
+class StackingError(ValueError):
+    """Raised for frame batches or exposure lists that cannot be stacked"""
+
+class StackingBusyError(Exception):
+    """Raised when a batch would push shared memory held by in-flight stacks past the budget"""
+
+def parse_shutter_speed(value: str) -> float:
+    """Parse '1/60', '0.5' or '2"' style shutter speeds into seconds"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*(?:/\s*(\d+(?:\.\d+)?))?\s*(?:s|"|sec)?\s*', value or "")
+    if not match or (match.group(2) is not None and float(match.group(2)) == 0):
+        raise StackingError(f"Unrecognised shutter speed: {value}")
+    seconds = float(match.group(1)) / (float(match.group(2)) if match.group(2) else 1.0)
+    if seconds <= 0:
+        raise StackingError(f"Shutter speed must be positive: {value}")
+    return seconds
+
+def relative_exposures(
+    shutter_speeds: Sequence[str],
+    apertures: Optional[Sequence[float]] = None,
+    isos: Optional[Sequence[int]] = None
+) -> np.ndarray:
+    """Exposure of each bracketed frame (t * ISO / N^2) relative to the brightest one"""
+    count = len(shutter_speeds)
+    times = np.array([parse_shutter_speed(value) for value in shutter_speeds], dtype=np.float64)
+    f_numbers = _per_frame(apertures, count, "apertures", 1.0)
+    gains = _per_frame(isos, count, "isos", 100.0) / 100.0
+    if (f_numbers <= 0).any() or (gains <= 0).any():
+        raise StackingError("Apertures and ISO values must be positive")
+    exposures = times * gains / f_numbers ** 2
+    return (exposures / exposures.max()).astype(np.float32)
+
+def _per_frame(values: Optional[Sequence[float]], count: int, name: str, default: float) -> np.ndarray:
+    if not values:
+        return np.full(count, default, dtype=np.float64)
+    if len(values) == 1:
+        return np.full(count, float(values[0]), dtype=np.float64)
+    if len(values) != count:
+        raise StackingError(f"Expected 1 or {count} {name}, got {len(values)}")
+    return np.asarray(values, dtype=np.float64)
+
+def full_scale(dtype: np.dtype) -> float:
+    """Value of a fully exposed pixel; float frames are taken as already normalized to [0, 1]"""
+    return float(np.iinfo(dtype).max) if dtype.kind == "u" else 1.0
+
+# Vectorized kernels over (count, rows, width, channels) blocks; each returns float32 (rows, width, channels)
+def mean_stack(frames: np.ndarray) -> np.ndarray:
+    return frames.mean(axis=0, dtype=np.float32)
+
+def ranked(frames: np.ndarray) -> Sequence[np.ndarray]:
+    """Frames sorted per pixel along the frame axis, lowest first.
+
+    Short bursts go through an odd-even transposition network of
+    elementwise min/max, which beats np.sort's strided sort along axis 0
+    up to about a dozen frames.
+    """
+    if len(frames) > SORT_NETWORK_MAX_FRAMES:
+        return np.sort(frames, axis=0)
+    rows = list(frames)
+    for step in range(len(rows)):
+        for i in range(step % 2, len(rows) - 1, 2):
+            low = np.minimum(rows[i], rows[i + 1])
+            rows[i + 1] = np.maximum(rows[i], rows[i + 1])
+            rows[i] = low
+    return rows
+
+def median_stack(frames: np.ndarray) -> np.ndarray:
+    ordered = ranked(frames)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle].astype(np.float32)
+    return (ordered[middle - 1].astype(np.float32) + ordered[middle]) * np.float32(0.5)
+
+def sigma_clip_stack(frames: np.ndarray, sigma: float) -> np.ndarray:
+    """Mean of the samples within ``sigma`` robust deviations of each pixel's median.
+
+    The median and scaled MAD are used instead of the mean and standard
+    deviation because a single hot pixel or passing object in a short burst
+    drags the mean far enough that it would never be rejected.
+    """
+    data = frames.astype(np.float32, copy=False)
+    centre = median_stack(data)
+    deviation = np.abs(data - centre)
+    spread = median_stack(deviation) * MAD_TO_SIGMA
+    kept = deviation <= sigma * spread
+    # The median is always within zero deviations, except for even counts with a zero spread
+    kept |= ~kept.any(axis=0)
+    return np.sum(data, axis=0, where=kept, dtype=np.float32) / kept.sum(axis=0, dtype=np.float32)
+
+def hdr_merge(frames: np.ndarray, exposures: np.ndarray, scale: float) -> np.ndarray:
+    """Exposure-weighted radiance: sum(w * z / e) / sum(w) with a hat weight on normalized values.
+
+    Pixels near black or clipping get little weight, so each output pixel
+    comes mostly from the brackets that exposed it well. Radiance is in
+    units of the brightest frame's full scale.
+    """
+    normalized = frames.astype(np.float32, copy=False) / np.float32(scale)
+    weights = np.maximum(1.0 - np.abs(2.0 * normalized - 1.0), MIN_HDR_WEIGHT)
+    per_frame = exposures.reshape((-1,) + (1,) * (frames.ndim - 1))
+    return (np.sum(weights * normalized / per_frame, axis=0) / np.sum(weights, axis=0)).astype(np.float32, copy=False)
+
+def stack_frames(frames: np.ndarray, method: str, exposures: Optional[np.ndarray] = None, sigma: float = 3.0) -> np.ndarray:
+    """Merge a (count, rows, width, channels) block into one float32 (rows, width, channels) block"""
+    if method == "mean":
+        return mean_stack(frames)
+    if method == "median":
+        return median_stack(frames)
+    if method == "sigma_clip":
+        return sigma_clip_stack(frames, sigma)
+    if method == "hdr":
+        return hdr_merge(frames, exposures, full_scale(frames.dtype))
+    raise StackingError(f"Unknown stacking method: {method}")
+
+def log_luminance(radiance: np.ndarray) -> Tuple[float, int]:
+    """Sum of log luminance and pixel count, combined across tiles into the log-average key"""
+    if radiance.shape[-1] == 3:
+        luminance = radiance @ LUMA_WEIGHTS
+    else:
+        luminance = radiance.mean(axis=-1)
+    return float(np.log(luminance + 1e-6, dtype=np.float64).sum()), int(luminance.size)
+
+def tonemap(radiance: np.ndarray, key_scale: float, dtype: np.dtype) -> np.ndarray:
+    """Global Reinhard curve L / (1 + L) back into ``dtype``'s range"""
+    scaled = radiance * np.float32(key_scale)
+    return to_dtype(scaled / (1.0 + scaled) * np.float32(full_scale(dtype)), dtype)
+
+def to_dtype(values: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    if dtype.kind == "f":
+        return values.astype(dtype, copy=False)
+    return np.clip(np.rint(values), 0, full_scale(dtype)).astype(dtype)
+
+class SharedFrames:
+    """An ndarray backed by a named shared memory block.
+
+    The creating process owns the block and unlinks it on close; pool
+    workers attach by name, so tiles are mapped rather than pickled.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype, name: Optional[str] = None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def spec(self) -> Tuple[str, Tuple[int, ...], str]:
+        """Picklable (name, shape, dtype) a worker needs to attach"""
+        return self.name, self.shape, self.dtype.str
+
+    def close(self):
+        # Views into the buffer must be released before the mapping can close
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self) -> "SharedFrames":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _attach(spec: Tuple[str, Tuple[int, ...], str]) -> SharedFrames:
+    name, shape, dtype = spec
+    return SharedFrames(shape, np.dtype(dtype), name=name)
+
+def _stack_tile(source_spec, target_spec, rows: Tuple[int, int], method: str,
+                exposures: Optional[np.ndarray], sigma: float, measure_key: bool) -> Optional[Tuple[float, int]]:
+    """Pool worker: merge rows [start, end) of the shared batch into the shared output"""
+    source, target = _attach(source_spec), _attach(target_spec)
+    try:
+        start, end = rows
+        merged = stack_frames(source.array[:, start:end], method, exposures, sigma)
+        target.array[start:end] = to_dtype(merged, target.dtype)
+        return log_luminance(merged) if measure_key else None
+    finally:
+        source.close()
+        target.close()
+
+def _tonemap_tile(source_spec, target_spec, rows: Tuple[int, int], key_scale: float):
+    """Pool worker: tone map rows [start, end) of shared radiance into the shared output"""
+    source, target = _attach(source_spec), _attach(target_spec)
+    try:
+        start, end = rows
+        target.array[start:end] = tonemap(source.array[start:end], key_scale, target.dtype)
+    finally:
+        source.close()
+        target.close()
+
+class StackingEngine:
+    """Merges bursts of aligned frames for high-ISO denoise or bracketed HDR.
+
+    Frames arrive as a ``SharedFrames`` batch of shape (count, height,
+    width, channels). Batches of at least ``min_parallel_pixels`` per frame
+    are split into bands of ``tile_rows`` rows that pool workers merge
+    straight from and into shared memory; smaller ones are merged on the
+    CPU thread pool. Denoise methods return the input dtype. HDR returns
+    float32 radiance, or the input dtype when tone mapping is requested,
+    keyed on the log-average luminance of the whole frame. Callers
+    ``reserve`` a batch's bytes before allocating it, so concurrent
+    requests cannot hold more than ``max_inflight_bytes`` of shared memory.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[BoundedExecutor] = None,
+        tile_rows: Optional[int] = None,
+        min_parallel_pixels: Optional[int] = None,
+        max_inflight_bytes: Optional[int] = None
+    ):
+        self.executor = executor or get_stacking_executor()
+        self.tile_rows = tile_rows or int(os.environ.get('STACKING_TILE_ROWS', 64))
+        self.min_parallel_pixels = (
+            min_parallel_pixels if min_parallel_pixels is not None
+            else int(os.environ.get('STACKING_MIN_PARALLEL_PIXELS', 512 * 512))
+        )
+        self.max_inflight_bytes = (
+            max_inflight_bytes if max_inflight_bytes is not None
+            else int(os.environ.get('STACKING_MAX_INFLIGHT_BYTES', 1024 * 1024 * 1024))
+        )
+        self.inflight_bytes = 0
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        """Hold ``nbytes`` of the in-flight budget for the block; raises StackingBusyError when it is spent"""
+        if self.inflight_bytes + nbytes > self.max_inflight_bytes:
+            raise StackingBusyError(
+                f"Stacking is busy: {self.inflight_bytes} of {self.max_inflight_bytes} in-flight bytes in use"
+            )
+        self.inflight_bytes += nbytes
+        try:
+            yield
+        finally:
+            self.inflight_bytes -= nbytes
+
+    def allocate(self, count: int, height: int, width: int, channels: int, dtype: np.dtype) -> SharedFrames:
+        """Shared buffer for a batch; fill ``.array`` (or ``.shm.buf``) and pass it to ``stack``"""
+        return SharedFrames((count, height, width, channels), dtype)
+
+    def output_dtype(self, method: str, dtype: np.dtype, tonemap_hdr: bool) -> np.dtype:
+        return np.dtype(np.float32) if method == "hdr" and not tonemap_hdr else np.dtype(dtype)
+
+    async def stack(
+        self,
+        frames: SharedFrames,
+        method: str,
+        exposures: Optional[np.ndarray] = None,
+        sigma: float = 3.0,
+        tonemap_hdr: bool = False
+    ) -> np.ndarray:
+        """Merge the batch into one (height, width, channels) frame"""
+        count, height, width, _ = frames.shape
+        self.validate(frames.shape, method, exposures, sigma)
+        out_dtype = self.output_dtype(method, frames.dtype, tonemap_hdr)
+
+        start = time.perf_counter()
+        if height * width < self.min_parallel_pixels:
+            result = await get_cpu_executor().run(self._stack_inline, frames.array, method, exposures, sigma, tonemap_hdr, out_dtype)
+        else:
+            result = await self._stack_tiled(frames, method, exposures, sigma, tonemap_hdr, out_dtype)
+        STACKING_DURATION.observe(time.perf_counter() - start, method=method)
+        STACKING_FRAMES.inc(count, method=method)
+        return result
+
+    def validate(self, shape: Tuple[int, ...], method: str, exposures: Optional[np.ndarray], sigma: float):
+        if method not in STACK_METHODS:
+            raise StackingError(f"Unknown stacking method: {method}; use one of {', '.join(STACK_METHODS)}")
+        if len(shape) != 4 or min(shape) < 1:
+            raise StackingError("Frames must be a non-empty (count, height, width, channels) batch")
+        if method == "hdr" and (exposures is None or len(exposures) != shape[0]):
+            raise StackingError("HDR merge needs one exposure per frame")
+        if method == "sigma_clip" and sigma <= 0:
+            raise StackingError("sigma must be positive")
+
+    def tiles(self, height: int) -> List[Tuple[int, int]]:
+        return [(start, min(start + self.tile_rows, height)) for start in range(0, height, self.tile_rows)]
+
+    @staticmethod
+    def _stack_inline(frames: np.ndarray, method: str, exposures: Optional[np.ndarray], sigma: float,
+                      tonemap_hdr: bool, out_dtype: np.dtype) -> np.ndarray:
+        merged = stack_frames(frames, method, exposures, sigma)
+        if method == "hdr" and tonemap_hdr:
+            log_sum, pixels = log_luminance(merged)
+            return tonemap(merged, key_scale(log_sum, pixels), out_dtype)
+        return to_dtype(merged, out_dtype)
+
+    async def _stack_tiled(self, frames: SharedFrames, method: str, exposures: Optional[np.ndarray], sigma: float,
+                           tonemap_hdr: bool, out_dtype: np.dtype) -> np.ndarray:
+        _, height, width, channels = frames.shape
+        tiles = self.tiles(height)
+        merged_dtype = np.dtype(np.float32) if method == "hdr" else out_dtype
+        measure_key = method == "hdr" and tonemap_hdr
+        with SharedFrames((height, width, channels), merged_dtype) as merged:
+            keys = await asyncio.gather(*(
+                self.executor.run(_stack_tile, frames.spec(), merged.spec(), rows, method, exposures, sigma, measure_key)
+                for rows in tiles
+            ))
+            if not measure_key:
+                return merged.array.copy()
+            scale = key_scale(sum(key[0] for key in keys), sum(key[1] for key in keys))
+            with SharedFrames((height, width, channels), out_dtype) as mapped:
+                await asyncio.gather(*(
+                    self.executor.run(_tonemap_tile, merged.spec(), mapped.spec(), rows, scale)
+                    for rows in tiles
+                ))
+                return mapped.array.copy()
+
+def key_scale(log_sum: float, pixels: int, key: float = 0.18) -> float:
+    """Scale that maps the log-average luminance to middle grey"""
+    return key / float(np.exp(log_sum / max(pixels, 1)))
+
+_engine: Optional[StackingEngine] = None
+
+def get_stacking_engine() -> StackingEngine:
+    global _engine
+    if _engine is None:
+        _engine = StackingEngine()
+    return _engine
+
+def parse_list(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+def exposures_from_query(shutter_speeds: Optional[str], apertures: Optional[str], isos: Optional[str]) -> Optional[np.ndarray]:
+    """Relative exposures from comma-separated bracket settings, or None when no shutter speeds were sent"""
+    speeds = parse_list(shutter_speeds)
+    if not speeds:
+        return None
+    try:
+        return relative_exposures(
+            speeds,
+            [float(value) for value in parse_list(apertures)],
+            [int(value) for value in parse_list(isos)]
+        )
+    except ValueError as e:
+        raise StackingError(str(e))
+
+def stacking_limits() -> Dict[str, int]:
+    return {
+        "maxFrames": int(os.environ.get('STACKING_MAX_FRAMES', 32)),
+        "maxBytes": int(os.environ.get('STACKING_MAX_BYTES', 512 * 1024 * 1024)),
+    }
@@ -0,0 +1,206 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+from bson.binary import Binary
+from models.telemetry import TelemetryIngestResult
+from repositories.camera_repository import CameraRepository
+from services.camera_service import CameraService
+from services.executor import get_cpu_executor
+import msgpack
+import numpy as np
+import os
+import struct
+
+STRUCT_MEDIA_TYPE = "application/vnd.camera.telemetry+struct"
+MSGPACK_MEDIA_TYPE = "application/vnd.camera.telemetry+msgpack"
+
+# One packed little-endian record per sample (24 bytes); the struct wire format is
+# a plain concatenation of these records
+TELEMETRY_DTYPE = np.dtype([
+    ("timestamp", "<f8"),  # seconds since the Unix epoch
+    ("battery", "<f4"),  # percentage
+    ("temperature", "<f4"),  # degrees Celsius
+    ("storageUsed", "<f4"),  # GB used
+    ("exposure", "<f4"),  # per-frame exposure compensation (EV)
+])
+TELEMETRY_FIELDS = TELEMETRY_DTYPE.names
+
+# Vectorized range checks; samples outside them are dropped
+_VALID_RANGES = {
+    "battery": (0.0, 100.0),
+    "temperature": (-40.0, 125.0),
+    "storageUsed": (0.0, float("inf")),
+    "exposure": (-10.0, 10.0),
+}
+# Latest timestamp that still converts to a datetime bucket start
+_MAX_TIMESTAMP = (datetime.max - datetime(1970, 1, 1)).total_seconds()
+
+_LENGTH_PREFIX = struct.Struct("<I")
+
+class TelemetryDecodeError(ValueError):
+    """Raised when a telemetry body does not match its declared wire format"""
+
+def decode_struct_frames(body: bytes) -> np.ndarray:
+    """View a concatenation of packed records as a structured array without copying"""
+    if len(body) % TELEMETRY_DTYPE.itemsize:
+        raise TelemetryDecodeError(
+            f"Body length {len(body)} is not a multiple of the {TELEMETRY_DTYPE.itemsize}-byte record size"
+        )
+    return np.frombuffer(body, dtype=TELEMETRY_DTYPE)
+
+def decode_msgpack_frames(body: bytes) -> np.ndarray:
+    """Decode length-prefixed MessagePack frames of columns into one structured array.
+
+    Each frame is a uint32 little-endian length followed by a MessagePack
+    map from field name to either a ``bin`` of packed values in the field's
+    dtype (no per-sample objects) or a plain list.
+    """
+    frames = []
+    offset = 0
+    while offset < len(body):
+        if offset + _LENGTH_PREFIX.size > len(body):
+            raise TelemetryDecodeError("Truncated frame length prefix")
+        (length,) = _LENGTH_PREFIX.unpack_from(body, offset)
+        offset += _LENGTH_PREFIX.size
+        if offset + length > len(body):
+            raise TelemetryDecodeError("Frame length exceeds body size")
+        try:
+            columns = msgpack.unpackb(body[offset:offset + length], raw=False)
+        except Exception:
+            raise TelemetryDecodeError("Malformed MessagePack frame")
+        offset += length
+        frames.append(_columns_to_records(columns))
+    if not frames:
+        return np.empty(0, dtype=TELEMETRY_DTYPE)
+    return frames[0] if len(frames) == 1 else np.concatenate(frames)
+
+def _columns_to_records(columns: dict) -> np.ndarray:
+    if not isinstance(columns, dict) or "timestamp" not in columns:
+        raise TelemetryDecodeError("Frame must be a map of columns including 'timestamp'")
+    arrays = {}
+    for name in TELEMETRY_FIELDS:
+        value = columns.get(name)
+        if value is None:
+            continue
+        dtype = TELEMETRY_DTYPE.fields[name][0]
+        if isinstance(value, (bytes, bytearray)):
+            if len(value) % dtype.itemsize:
+                raise TelemetryDecodeError(f"Column '{name}' is not a whole number of {dtype} values")
+            arrays[name] = np.frombuffer(value, dtype=dtype)
+        else:
+            try:
+                arrays[name] = np.asarray(value, dtype=dtype)
+            except (TypeError, ValueError):
+                raise TelemetryDecodeError(f"Column '{name}' must contain only numbers")
+        if arrays[name].ndim != 1:
+            raise TelemetryDecodeError(f"Column '{name}' must be a flat list or packed bytes")
+    count = len(arrays["timestamp"])
+    if any(len(array) != count for array in arrays.values()):
+        raise TelemetryDecodeError("All columns in a frame must have the same length")
+    records = np.empty(count, dtype=TELEMETRY_DTYPE)
+    for name in TELEMETRY_FIELDS:
+        records[name] = arrays.get(name, np.nan)
+    return records
+
+def decode_telemetry(body: bytes, media_type: str) -> np.ndarray:
+    if media_type == STRUCT_MEDIA_TYPE:
+        return decode_struct_frames(body)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return decode_msgpack_frames(body)
+    raise TelemetryDecodeError(f"Unsupported telemetry media type: {media_type}")
+
+def filter_valid(records: np.ndarray) -> np.ndarray:
+    """Drop samples with a timestamp outside the datetime range or any present value out of range"""
+    valid = (records["timestamp"] > 0) & (records["timestamp"] < _MAX_TIMESTAMP)
+    for name, (low, high) in _VALID_RANGES.items():
+        column = records[name]
+        # NaN means the camera did not report this field; it is kept as missing
+        valid &= np.isnan(column) | ((column >= low) & (column <= high))
+    return records[valid]
+
+def build_bucket_documents(camera_id: str, records: np.ndarray, bucket_seconds: int) -> List[dict]:
+    """Group samples into fixed time buckets, one document per bucket with columnar blobs"""
+    if len(records) == 0:
+        return []
+    records = records[np.argsort(records["timestamp"], kind="stable")]
+    bucket_keys = (records["timestamp"] // bucket_seconds).astype(np.int64)
+    starts = np.flatnonzero(np.diff(bucket_keys, prepend=bucket_keys[0] - 1))
+    ends = np.append(starts[1:], len(records))
+
+    documents = []
+    for start, end in zip(starts, ends):
+        bucket = records[start:end]
+        stats: Dict[str, Dict[str, float]] = {}
+        for name in TELEMETRY_FIELDS[1:]:
+            column = bucket[name]
+            present = column[~np.isnan(column)]
+            if len(present):
+                stats[name] = {
+                    "min": float(present.min()),
+                    "max": float(present.max()),
+                    "mean": float(present.mean()),
+                }
+        documents.append({
+            "cameraId": camera_id,
+            "bucketStart": datetime.utcfromtimestamp(int(bucket_keys[start]) * bucket_seconds),
+            "bucketSeconds": bucket_seconds,
+            "count": int(end - start),
+            "firstTimestamp": float(bucket["timestamp"][0]),
+            "lastTimestamp": float(bucket["timestamp"][-1]),
+            "dtype": TELEMETRY_DTYPE.descr,
+            # Column-wise blobs compress and range-scan better than row records
+            "columns": {name: Binary(np.ascontiguousarray(bucket[name]).tobytes()) for name in TELEMETRY_FIELDS},
+            "stats": stats,
+        })
+    return documents
+
+def temperature_label(celsius: float) -> str:
+    if celsius >= 60:
+        return "Hot"
+    if celsius >= 45:
+        return "Warning"
+    return "Normal"
+
+class TelemetryService:
+    """Decodes batched telemetry frames with NumPy and stores them in time buckets"""
+
+    def __init__(self, repository: CameraRepository, camera_service: CameraService):
+        self.repository = repository
+        self.camera_service = camera_service
+        self.bucket_seconds = int(os.environ.get('TELEMETRY_BUCKET_SECONDS', 60))
+        # Bodies at least this large are decoded on the CPU executor
+        self.offload_bytes = int(os.environ.get('TELEMETRY_OFFLOAD_BYTES', 64 * 1024))
+
+    def _prepare(self, camera_id: str, body: bytes, media_type: str) -> Tuple[List[dict], int, int, dict, float]:
+        records = decode_telemetry(body, media_type)
+        valid = filter_valid(records)
+        documents = build_bucket_documents(camera_id, valid, self.bucket_seconds)
+        latest, latest_timestamp = {}, 0.0
+        if len(valid):
+            last = valid[np.argmax(valid["timestamp"])]
+            latest = {name: float(last[name]) for name in ("battery", "temperature", "storageUsed") if not np.isnan(last[name])}
+            latest_timestamp = float(last["timestamp"])
+        return documents, len(valid), len(records) - len(valid), latest, latest_timestamp
+
+    async def ingest(self, camera_id: str, body: bytes, media_type: str) -> TelemetryIngestResult:
+        """Decode, validate and persist one batch; refreshes the status snapshot from the newest sample unless it already holds a newer one"""
+        if len(body) >= self.offload_bytes:
+            prepared = await get_cpu_executor().run(self._prepare, camera_id, body, media_type)
+        else:
+            prepared = self._prepare(camera_id, body, media_type)
+        documents, accepted, rejected, latest, latest_timestamp = prepared
+
+        if documents:
+            await self.repository.insert_telemetry_buckets(documents)
+        if latest:
+            await self._update_status(latest, datetime.utcfromtimestamp(latest_timestamp))
+        return TelemetryIngestResult(cameraId=camera_id, accepted=accepted, rejected=rejected, buckets=len(documents))
+
+    async def _update_status(self, latest: Dict[str, float], sampled_at: datetime):
+        fields = {}
+        if "battery" in latest:
+            fields["battery"] = int(round(latest["battery"]))
+        if "storageUsed" in latest:
+            fields["storageUsed"] = latest["storageUsed"]
+        if "temperature" in latest:
+            fields["temperature"] = temperature_label(latest["temperature"])
+        await self.camera_service.apply_status_sample(fields, sampled_at)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Play, Square, Settings, Camera, Video, Zap, Battery, HardDrive, Save, Loader } from 'lucide-react';
 import { Button } from './ui/button';
 import { Card } from './ui/card';
@@ -7,12 +7,25 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '.
 import { Badge } from './ui/badge';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from './ui/tabs';
 import { useToast } from '../hooks/use-toast';
-import cameraApi from '../services/cameraApi';
+import cameraApi, { newIdempotencyKey } from '../services/cameraApi';
 
 // Fallback stream for viewfinder
 const mockCameraStream = "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iODAwIiBoZWlnaHQ9IjYwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KICA8ZGVmcz4KICAgIDxsaW5lYXJHcmFkaWVudCBpZD0iZ3JhZGllbnQiIHgxPSIwJSIgeTE9IjAlIiB4Mj0iMTAwJSIgeTI9IjEwMCUiPgogICAgICA8c3RvcCBvZmZzZXQ9IjAlIiBzdHlsZT0ic3RvcC1jb2xvcjojMmEyYTJhO3N0b3Atb3BhY2l0eToxIiAvPgogICAgICA8c3RvcCBvZmZzZXQ9IjUwJSIgc3R5bGU9InN0b3AtY29sb3I6IzM3MzczNztzdG9wLW9wYWNpdHk6MSIgLz4KICAgICAgPHN0b3Agb2Zmc2V0PSIxMDAlIiBzdHlsZT0ic3RvcC1jb2xvcjojMmEyYTJhO3N0b3Atb3BhY2l0eToxIiAvPgogICAgPC9saW5lYXJHcmFkaWVudD4KICA8L2RlZnM+CiAgPHJlY3Qgd2lkdGg9IjEwMCUiIGhlaWdodD0iMTAwJSIgZmlsbD0idXJsKCNncmFkaWVudCkiLz4KICA8Y2lyY2xlIGN4PSI0MDAiIGN5PSIzMDAiIHI9IjUwIiBmaWxsPSIjNWY1ZjVmIiBvcGFjaXR5PSIwLjMiLz4KICA8dGV4dCB4PSI0MDAiIHk9IjMxMCIgZm9udC1mYW1pbHk9IkFyaWFsLCBzYW5zLXNlcmlmIiBmb250LXNpemU9IjE0IiBmaWxsPSIjOWY5ZjlmIiB0ZXh0LWFuY2hvcj0ibWlkZGxlIj5WSUVXRKLOREVSPC90ZXh0Pgo8L3N2Zz4=";
 
+// Keep a failed write's Idempotency-Key (and creation time, used for generated names)
+// so pressing the button again with the same payload retries it instead of duplicating it
+const pendingWrite = (pending, payload) => {
+  const fingerprint = JSON.stringify(payload);
+  if (!pending.current || pending.current.fingerprint !== fingerprint) {
+    pending.current = { fingerprint, key: newIdempotencyKey(), createdAt: Date.now() };
+  }
+  return pending.current;
+};
+
 const CameraApp = () => {
+  const pendingStart = useRef(null);
+  const pendingStop = useRef(null);
+  const pendingSave = useRef(null);
   const [settings, setSettings] = useState({
     iso: 800,
     aperture: 2.8,
@@ -34,6 +47,7 @@ const CameraApp = () => {
     temperature: "Normal"
   });
   const [capabilities, setCapabilities] = useState(null);
+  const [presets, setPresets] = useState([]);
   const [currentRecording, setCurrentRecording] = useState(null);
   const [showMenu, setShowMenu] = useState(false);
   const [recordingTime, setRecordingTime] = useState(0);
@@ -41,18 +55,21 @@ const CameraApp = () => {
   const { toast } = useToast();
 
   useEffect(() => {
-    // Load camera capabilities and status on component mount
+    // Load capabilities, status, presets and any active recording on component mount
     const initializeCamera = async () => {
       try {
         setIsLoading(true);
         
-        // Load capabilities
-        const capsData = await cameraApi.getCameraCapabilities();
-        setCapabilities(capsData);
+        const bootstrap = await cameraApi.getBootstrap();
+        setCapabilities(bootstrap.capabilities);
+        setStatus(prev => ({ ...prev, ...bootstrap.status }));
+        setPresets(bootstrap.presets);
         
-        // Load current status
-        const statusData = await cameraApi.getCameraStatus();
-        setStatus(prev => ({ ...prev, ...statusData }));
+        // Resume a session that was still running when the page was reloaded
+        if (bootstrap.activeRecording) {
+          setCurrentRecording(bootstrap.activeRecording);
+          setSettings(prev => ({ ...prev, recording: true }));
+        }
         
       } catch (error) {
         console.error('Error initializing camera:', error);
@@ -96,14 +113,16 @@ const CameraApp = () => {
     try {
       if (!settings.recording) {
         // Start recording
-        const recordingData = {
-          fileName: `recording_${Date.now()}.mp4`,
+        const payload = {
           resolution: status.resolution,
           frameRate: `${status.fps}p`,
           settings: settings
         };
+        const write = pendingWrite(pendingStart, payload);
+        const recordingData = { fileName: `recording_${write.createdAt}.mp4`, ...payload };
         
-        const recording = await cameraApi.startRecording(recordingData);
+        const recording = await cameraApi.startRecording(recordingData, write.key);
+        pendingStart.current = null;
         setCurrentRecording(recording);
         updateSetting('recording', true);
         
@@ -114,7 +133,9 @@ const CameraApp = () => {
       } else {
         // Stop recording
         if (currentRecording) {
-          await cameraApi.stopRecording(currentRecording.id);
+          const write = pendingWrite(pendingStop, currentRecording.id);
+          await cameraApi.stopRecording(currentRecording.id, write.key);
+          pendingStop.current = null;
           updateSetting('recording', false);
           setCurrentRecording(null);
           
@@ -138,15 +159,32 @@ const CameraApp = () => {
     updateSetting('mode', settings.mode === 'manual' ? 'auto' : 'manual');
   };
 
+  const applyPreset = (preset) => {
+    setSettings(prev => ({
+      ...prev,
+      iso: preset.iso,
+      aperture: preset.aperture,
+      shutterSpeed: preset.shutterSpeed,
+      focus: preset.focus,
+      whiteBalance: preset.whiteBalance,
+      exposure: preset.exposure,
+      mode: preset.mode,
+      zoom: preset.zoom
+    }));
+  };
+
   const saveSettings = async () => {
     try {
       setIsLoading(true);
+      const write = pendingWrite(pendingSave, settings);
       const settingsData = {
-        name: `Settings_${Date.now()}`,
+        name: `Settings_${write.createdAt}`,
         ...settings
       };
       
-      await cameraApi.createSettings(settingsData);
+      const savedPreset = await cameraApi.createSettings(settingsData, write.key);
+      pendingSave.current = null;
+      setPresets(prev => [savedPreset, ...prev]);
       
       toast({
         title: "Settings Saved",
@@ -471,6 +509,26 @@ const CameraApp = () => {
                   </Select>
                 </Card>
 
+                {presets.length > 0 && (
+                  <Card className="p-4 bg-gray-900/50 border-gray-600">
+                    <h4 className="font-medium mb-3">Saved Presets</h4>
+                    <div className="space-y-2">
+                      {presets.map(preset => (
+                        <Button
+                          key={preset.id}
+                          variant="outline"
+                          size="sm"
+                          className="w-full justify-between bg-gray-800 border-gray-600"
+                          onClick={() => applyPreset(preset)}
+                        >
+                          <span>{preset.name}</span>
+                          <span className="text-xs text-gray-400">ISO {preset.iso} • f/{preset.aperture}</span>
+                        </Button>
+                      ))}
+                    </div>
+                  </Card>
+                )}
+
                 <Card className="p-4 bg-gray-900/50 border-gray-600">
                   <div className="flex justify-between items-center">
                     <span className="font-medium">Image Stabilization</span>
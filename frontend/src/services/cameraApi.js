@@ -3,11 +3,42 @@ import axios from 'axios';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Retried writes carry the same key so the backend replays instead of duplicating.
+// Create one key per user action and pass it to every attempt of that action.
+export const newIdempotencyKey = () =>
+  (window.crypto && window.crypto.randomUUID)
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+
+const MAX_WRITE_ATTEMPTS = 3;
+const RETRY_DELAY_MS = 500;
+
+// Network errors, 5xx and 409 (the same key still running elsewhere) are safe to retry with the same key
+const isRetryable = (error) =>
+  !error.response || error.response.status >= 500 || error.response.status === 409;
+
+const sendKeyed = async (request, idempotencyKey) => {
+  const headers = { 'Idempotency-Key': idempotencyKey };
+  for (let attempt = 1; ; attempt += 1) {
+    try {
+      return await request(headers);
+    } catch (error) {
+      if (attempt >= MAX_WRITE_ATTEMPTS || !isRetryable(error)) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, RETRY_DELAY_MS * attempt));
+    }
+  }
+};
+
 class CameraApiService {
   // Camera Settings API
-  async createSettings(settingsData) {
+  async createSettings(settingsData, idempotencyKey) {
     try {
-      const response = await axios.post(`${API}/camera/settings`, settingsData);
+      const response = await sendKeyed(
+        (headers) => axios.post(`${API}/camera/settings`, settingsData, { headers }),
+        idempotencyKey || newIdempotencyKey()
+      );
       return response.data;
     } catch (error) {
       console.error('Error creating camera settings:', error);
@@ -35,9 +66,11 @@ class CameraApiService {
     }
   }
 
-  async updateSettings(settingsId, updateData) {
+  // Pass the preset's version to reject the update (412) if someone else changed it first
+  async updateSettings(settingsId, updateData, version = null) {
     try {
-      const response = await axios.put(`${API}/camera/settings/${settingsId}`, updateData);
+      const headers = version === null ? {} : { 'If-Match': `"${version}"` };
+      const response = await axios.put(`${API}/camera/settings/${settingsId}`, updateData, { headers });
       return response.data;
     } catch (error) {
       console.error('Error updating camera settings:', error);
@@ -56,9 +89,12 @@ class CameraApiService {
   }
 
   // Recording API
-  async startRecording(recordingData) {
+  async startRecording(recordingData, idempotencyKey) {
     try {
-      const response = await axios.post(`${API}/camera/recordings`, recordingData);
+      const response = await sendKeyed(
+        (headers) => axios.post(`${API}/camera/recordings`, recordingData, { headers }),
+        idempotencyKey || newIdempotencyKey()
+      );
       return response.data;
     } catch (error) {
       console.error('Error starting recording:', error);
@@ -66,9 +102,12 @@ class CameraApiService {
     }
   }
 
-  async stopRecording(recordingId) {
+  async stopRecording(recordingId, idempotencyKey) {
     try {
-      const response = await axios.put(`${API}/camera/recordings/${recordingId}/stop`);
+      const response = await sendKeyed(
+        (headers) => axios.put(`${API}/camera/recordings/${recordingId}/stop`, null, { headers }),
+        idempotencyKey || newIdempotencyKey()
+      );
       return response.data;
     } catch (error) {
       console.error('Error stopping recording:', error);
@@ -127,6 +166,32 @@ class CameraApiService {
     }
   }
 
+  // Batch API: run several operations in one round trip. Later operations can
+  // use earlier results via { $ref: '<operation id>.<field>' }.
+  async runBatch(operations, { transactional = false, idempotencyKey } = {}) {
+    try {
+      const response = await sendKeyed(
+        (headers) => axios.post(`${API}/camera/batch`, { operations, transactional }, { headers }),
+        idempotencyKey || newIdempotencyKey()
+      );
+      return response.data;
+    } catch (error) {
+      console.error('Error running camera batch:', error);
+      throw error;
+    }
+  }
+
+  // Bootstrap API: capabilities, status, presets and active recording in one call
+  async getBootstrap() {
+    try {
+      const response = await axios.get(`${API}/camera/bootstrap`);
+      return response.data;
+    } catch (error) {
+      console.error('Error getting camera bootstrap:', error);
+      throw error;
+    }
+  }
+
   // Camera Capabilities API
   async getCameraCapabilities() {
     try {
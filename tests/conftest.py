@@ -0,0 +1,43 @@
+from pathlib import Path
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Run the API on the in-memory engine; set before server.py loads its .env
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "camera_tests")
+os.environ["CACHE_TTL_SECONDS"] = "0"
+os.environ["ID_MIGRATION_ENABLED"] = "0"
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+def memory_repository():
+    from repositories.memory_repository import InMemoryCameraRepository
+    return InMemoryCameraRepository()
+
+@pytest.fixture
+def mongo_database():
+    """A mongomock-backed Motor database, skipped when mongomock_motor is not installed"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["camera_tests"]
+
+@pytest.fixture
+def client():
+    """TestClient for the API with empty in-memory storage"""
+    from fastapi.testclient import TestClient
+    from database import get_repository
+    import routes.camera
+    import server
+
+    get_repository().__init__()
+    routes.camera._idempotency_store = None
+    with TestClient(server.app) as test_client:
+        yield test_client
@@ -0,0 +1,86 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models.camera import Recording
+from services.analytics_service import AnalyticsService
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime(2024, 3, 10, 12)
+
+def recording(day: int, status: str = "completed", duration: float = 3600.0, resolution: str = "4K UHD") -> dict:
+    start = datetime(2024, 3, day, 9)
+    return Recording(
+        fileName="clip.mp4", resolution=resolution, frameRate="24p", settings={"colorProfile": "S-Log3"}, status=status,
+        startTime=start, endTime=start + timedelta(seconds=duration), duration=duration, fileSize=duration / 2,
+    ).dict()
+
+async def insert(repository, *docs):
+    for doc in docs:
+        await repository.insert_recording(doc)
+
+async def test_refresh_materializes_closed_days_and_advances_watermark(memory_repository):
+    await insert(memory_repository, recording(1), recording(2), recording(10))
+    service = AnalyticsService(memory_repository)
+
+    assert await service.refresh_rollups(NOW) == 2
+    assert await memory_repository.find_rollup_watermark() == datetime(2024, 3, 10)
+    assert sorted(memory_repository.rollups) == ["2024-03-01", "2024-03-02"]
+    assert await service.refresh_rollups(NOW) == 0
+
+async def test_rebuild_after_watermark_does_not_skip_days(memory_repository):
+    await insert(memory_repository, recording(1), recording(3), recording(5))
+    service = AnalyticsService(memory_repository)
+    await service.refresh_rollups(datetime(2024, 3, 2, 12))
+    assert await memory_repository.find_rollup_watermark() == datetime(2024, 3, 2)
+
+    # Rebuilding from the 5th must still close the 2nd to the 4th
+    await service.refresh_rollups(NOW, rebuild_from=date(2024, 3, 5))
+    assert sorted(memory_repository.rollups) == ["2024-03-01", "2024-03-03", "2024-03-05"]
+    assert await memory_repository.find_rollup_watermark() == datetime(2024, 3, 10)
+
+async def test_rebuild_before_watermark_recomputes_closed_days(memory_repository):
+    await insert(memory_repository, recording(1), recording(2))
+    service = AnalyticsService(memory_repository)
+    await service.refresh_rollups(NOW)
+    await insert(memory_repository, recording(2, duration=1800.0))
+
+    await service.refresh_rollups(NOW, rebuild_from=date(2024, 3, 2))
+    assert memory_repository.rollups["2024-03-02"]["recordings"] == 2
+    assert memory_repository.rollups["2024-03-01"]["recordings"] == 1
+
+async def test_report_keeps_rolled_up_totals_after_retention(memory_repository):
+    docs = [recording(1), recording(1, "failed", 0.0, "1080p"), recording(2, duration=1800.0)]
+    await insert(memory_repository, *docs)
+    service = AnalyticsService(memory_repository)
+    await service.refresh_rollups(NOW)
+    await memory_repository.delete_recordings([doc["id"] for doc in docs])
+
+    report = await service.recording_analytics(date(2024, 3, 1), date(2024, 3, 10))
+    assert [(day.day, day.recordings, day.completed, day.failed) for day in report.days] == [
+        ("2024-03-01", 2, 1, 1), ("2024-03-02", 1, 1, 0),
+    ]
+    assert report.hours == 1.5
+    assert [(totals.key, totals.recordings, totals.share) for totals in report.byResolution] == [("4K UHD", 2, 0.6667), ("1080p", 1, 0.3333)]
+    assert report.byResolution[0].averageDurationSeconds == 2700
+
+async def test_report_aggregates_open_days_live(memory_repository):
+    today = datetime.utcnow().date()
+    started = datetime.combine(today, datetime.min.time())
+    await memory_repository.insert_recording(Recording(
+        fileName="clip.mp4", resolution="4K UHD", frameRate="24p", settings={}, status="completed",
+        startTime=started, duration=60.0, fileSize=30.0,
+    ).dict())
+    service = AnalyticsService(memory_repository)
+
+    report = await service.recording_analytics(today, today)
+    assert [(day.day, day.recordings) for day in report.days] == [(today.isoformat(), 1)]
+    assert today.isoformat() not in memory_repository.rollups
+
+def test_analytics_api_validates_ranges_and_refreshes(client):
+    assert client.get("/api/camera/analytics/recordings?start=2024-03-02&end=2024-03-01").status_code == 400
+    assert client.get("/api/camera/analytics/recordings?start=2023-01-01&end=2024-03-01").status_code == 400
+    assert client.post("/api/camera/analytics/rollups/refresh").json() == {"daysMaterialized": 0}
+    report = client.get("/api/camera/analytics/recordings").json()
+    assert (report["recordings"], report["days"]) == (0, [])
@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from models.batch import BatchOperation, BatchRequest
+from repositories.memory_repository import InMemoryCameraRepository
+from services.batch_service import BatchService, BatchValidationError, find_references, resolve_references
+
+def op(op_name: str, op_id: str = None, **params) -> BatchOperation:
+    return BatchOperation(id=op_id, op=op_name, params=params)
+
+def batch(client, *operations, transactional: bool = False, headers: dict = None):
+    body = {"operations": [operation.dict() for operation in operations], "transactional": transactional}
+    return client.post("/api/camera/batch", json=body, headers=headers or {})
+
+def test_references_are_found_and_resolved():
+    params = {"id": {"$ref": "a.id"}, "nested": [{"$ref": "b.items.1"}]}
+    assert find_references(params) == {"a", "b"}
+    assert resolve_references(params, {"a": {"id": "x"}, "b": {"items": [1, 2]}}) == {"id": "x", "nested": [2]}
+
+def test_plan_orders_writes_to_the_same_resource_and_references(memory_repository):
+    ids, dependencies = BatchService(memory_repository).plan([
+        op("createSettings", "create", name="Night"),
+        op("getSettings", "read", id={"$ref": "create.id"}),
+        op("getStatus", "status"),
+        op("updateStatus", "charge", battery=90),
+        op("getStatus", "status-after"),
+        op("getSettings", "other", id="p1"),
+        op("getSettings", "other-again", id="p1"),
+    ])
+    assert ids == ["create", "read", "status", "charge", "status-after", "other", "other-again"]
+    assert dependencies == [set(), {"create"}, set(), {"status"}, {"charge"}, set(), set()]
+
+def test_plan_orders_operations_on_the_same_reference(memory_repository):
+    _, dependencies = BatchService(memory_repository).plan([
+        op("createSettings", "c", name="Night"),
+        op("updateSettings", "tune", id={"$ref": "c.id"}, iso=6400),
+        op("getSettings", "read", id={"$ref": "c.id"}),
+        op("startRecording", "r", fileName="clip.mp4", settings={}),
+        op("stopRecording", "stop", id={"$ref": "r.id"}),
+        op("getRecording", "check", id={"$ref": "r.id"}),
+        op("getSettings", "name", id={"$ref": "c.name"}),
+    ])
+    assert dependencies == [set(), {"c"}, {"c", "tune"}, set(), {"r"}, {"r", "stop"}, {"c"}]
+
+class YieldingRepository(InMemoryCameraRepository):
+    """Yields to the event loop before each call, later calls finishing sooner, so unordered operations would overtake each other"""
+
+    def __init__(self):
+        super().__init__()
+        self.delays = iter(range(40, 0, -1))
+
+    def __getattribute__(self, name):
+        method = super().__getattribute__(name)
+        if not name.startswith(("find_", "update_", "delete_", "complete_")):
+            return method
+
+        async def yielding(*args, **kwargs):
+            await asyncio.sleep(next(self.delays, 0) / 1000)
+            return await method(*args, **kwargs)
+        return yielding
+
+@pytest.mark.anyio
+async def test_operations_on_the_same_reference_run_in_request_order():
+    response = await BatchService(YieldingRepository()).execute(BatchRequest(operations=[
+        op("createSettings", "c", name="Night", iso=800),
+        op("getSettings", "before", id={"$ref": "c.id"}),
+        op("updateSettings", "tune", id={"$ref": "c.id"}, iso=6400),
+        op("deleteSettings", "remove", id={"$ref": "c.id"}),
+        op("getSettings", "after", id={"$ref": "c.id"}),
+        op("startRecording", "r", fileName="clip.mp4", settings={}),
+        op("stopRecording", "stop", id={"$ref": "r.id"}),
+        op("getRecording", "check", id={"$ref": "r.id"}),
+    ]))
+
+    results = {result.id: result for result in response.results}
+    assert [result.status for result in response.results] == [200, 200, 200, 200, 404, 200, 200, 200]
+    # The settings exist until the delete, so only the delete explains the final 404
+    assert results["before"].result["iso"] == 800
+    assert results["tune"].result["iso"] == 6400
+    assert results["after"].error == "Camera settings not found"
+    assert results["check"].result["status"] == "completed"
+
+@pytest.mark.parametrize("operations, message", [
+    ([], "at least one"),
+    ([op("launch")], "Unknown operation"),
+    ([op("getStatus", "a"), op("getStatus", "a")], "Duplicate"),
+    ([op("getSettings", id={"$ref": "later.id"}), op("getStatus", "later")], "earlier operations"),
+])
+def test_plan_rejects_malformed_batches(memory_repository, operations, message):
+    with pytest.raises(BatchValidationError, match=message):
+        BatchService(memory_repository).plan(operations)
+
+def test_batch_runs_dependent_operations_with_references(client):
+    response = batch(
+        client,
+        op("createSettings", "create", name="Night", iso=3200),
+        op("updateSettings", "tune", id={"$ref": "create.id"}, ifMatch={"$ref": "create.version"}, iso=6400),
+        op("getSettings", "read", id={"$ref": "create.id"}),
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [200, 200, 200]
+    assert (results[2]["result"]["iso"], results[2]["result"]["version"]) == (6400, 2)
+
+def test_failed_operation_skips_dependents_but_not_unrelated_operations(client):
+    results = batch(
+        client,
+        op("getSettings", "missing", id="nope"),
+        op("updateSettings", "update-missing", id={"$ref": "missing.id"}, iso=100),
+        op("updateStatus", "charge", battery=77),
+    ).json()["results"]
+
+    assert [result["status"] for result in results] == [404, 424, 200]
+    assert "missing" in results[1]["error"]
+    assert client.get("/api/camera/status").json()["battery"] == 77
+
+def test_operation_errors_map_to_http_statuses(client):
+    results = batch(client, op("getRecording"), op("updateStatus", battery="full")).json()["results"]
+    assert [result["status"] for result in results] == [400, 422]
+
+def test_transactional_batch_rolls_back_on_first_failure(client):
+    before = client.get("/api/camera/status").json()["battery"]
+    response = batch(
+        client,
+        op("createSettings", "create", name="Night"),
+        op("updateStatus", "charge", battery=5),
+        op("stopRecording", "stop", id="missing"),
+        op("getStatus", "after"),
+        transactional=True,
+    ).json()
+
+    assert response["committed"] is False
+    assert [result["status"] for result in response["results"]] == [200, 200, 404, 424]
+    assert client.get("/api/camera/settings").json() == []
+    assert client.get("/api/camera/status").json()["battery"] == before
+
+def test_transactional_batch_commits_and_publishes_after_commit(client):
+    with client.websocket_connect("/api/camera/events/ws?channels=settings") as websocket:
+        response = batch(client, op("createSettings", "create", name="Night"), op("createSettings", name="Day"), transactional=True).json()
+        events = [websocket.receive_json() for _ in range(2)]
+
+    assert response["committed"] is True
+    assert [event["operation"] for event in events] == ["insert", "insert"]
+    assert len(client.get("/api/camera/settings").json()) == 2
+
+def test_invalid_batch_is_a_400(client):
+    assert batch(client, op("launch")).status_code == 400
+
+def test_batch_replays_with_idempotency_key(client):
+    headers = {"Idempotency-Key": "batch-1"}
+    first = batch(client, op("createSettings", name="Night"), headers=headers).json()
+    second = batch(client, op("createSettings", name="Night"), headers=headers).json()
+    assert first == second
+    assert len(client.get("/api/camera/settings").json()) == 1
@@ -0,0 +1,69 @@
+import uuid
+
+from bson import ObjectId
+from bson.binary import Binary
+import pytest
+
+from models.camera import CameraSettings
+from repositories.document_ids import api_id, from_storage, id_filter, storage_id, to_storage, unique_by_id
+from repositories.motor_repository import MotorCameraRepository
+from services.id_migration_service import LEASE_NAME, BinaryIdMigration
+
+pytestmark = pytest.mark.anyio
+
+def legacy_settings(name: str) -> dict:
+    """A preset as written before binary ids: ObjectId _id plus a string id field"""
+    return {"_id": ObjectId(), **CameraSettings(name=name).dict()}
+
+def test_uuid_ids_are_stored_as_binary_and_round_trip():
+    preset_id = str(uuid.uuid4())
+    stored = storage_id(preset_id)
+    assert isinstance(stored, Binary) and stored.subtype == 4
+    assert api_id(stored) == preset_id
+    assert storage_id("not-a-uuid") == "not-a-uuid"
+
+    doc = {"id": preset_id, "name": "Night"}
+    assert to_storage(doc) == {"_id": stored, "name": "Night"}
+    assert from_storage(to_storage(doc)) == doc
+    assert from_storage(None) is None
+
+def test_id_filter_matches_legacy_documents_only_while_they_remain():
+    ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+    assert id_filter(ids[:1], legacy=False) == {"_id": storage_id(ids[0])}
+    assert id_filter(ids, legacy=True) == {"$or": [{"_id": {"$in": [storage_id(i) for i in ids]}}, {"id": {"$in": ids}}]}
+
+def test_unique_by_id_drops_copies_caught_mid_migration():
+    assert unique_by_id([{"id": "a", "n": 1}, {"id": "b"}, {"id": "a", "n": 2}]) == [{"id": "a", "n": 1}, {"id": "b"}]
+
+async def test_legacy_documents_are_readable_then_migrated(mongo_database):
+    collection = mongo_database.camera_settings
+    legacy = [legacy_settings(f"preset {i}") for i in range(3)]
+    await collection.insert_many(legacy)
+    repository = MotorCameraRepository(mongo_database)
+    await repository.ensure_indexes()
+    new = CameraSettings(name="new")
+    await repository.insert_settings(new.dict())
+
+    assert (await repository.find_settings(legacy[0]["id"]))["name"] == "preset 0"
+    assert len(await repository.list_settings(10)) == 4
+
+    migration = BinaryIdMigration(repository, batch_size=2, batch_pause=0)
+    assert await migration.migrate() is True
+    assert migration.migrated == 3
+
+    stored = await collection.find().to_list(length=None)
+    assert all(isinstance(doc["_id"], Binary) and "id" not in doc for doc in stored)
+    assert sorted(api_id(doc["_id"]) for doc in stored) == sorted([doc["id"] for doc in legacy] + [new.id])
+    assert (await repository.find_settings(legacy[1]["id"]))["name"] == "preset 1"
+    assert (await repository.update_settings(legacy[2]["id"], {"iso": 800}))["iso"] == 800
+    assert await repository.delete_settings(legacy[0]["id"]) is True
+
+async def test_migration_waits_while_another_worker_holds_the_lease(mongo_database):
+    repository = MotorCameraRepository(mongo_database)
+    await mongo_database.camera_settings.insert_one(legacy_settings("preset"))
+    await repository.ensure_indexes()
+    assert await repository.acquire_lease(LEASE_NAME, "other-worker", ttl_seconds=60)
+
+    migration = BinaryIdMigration(repository, batch_pause=0)
+    assert await migration.migrate() is False
+    assert await mongo_database.camera_settings.count_documents({"id": {"$exists": True}}) == 1
@@ -0,0 +1,26 @@
+def test_bootstrap_returns_everything_a_client_needs(client):
+    for name in ("A", "B", "C"):
+        client.post("/api/camera/settings", json={"name": name})
+    recording = client.post("/api/camera/recordings", json={"fileName": "clip.mp4", "settings": {}}).json()
+
+    response = client.get("/api/camera/bootstrap", params={"presets_limit": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["capabilities"]["isoValues"][-1] == 12800
+    assert "battery" in body["status"]
+    assert [preset["name"] for preset in body["presets"]] == ["C", "B"]
+    assert body["activeRecording"]["id"] == recording["id"]
+
+def test_bootstrap_etag_returns_304_until_something_changes(client):
+    first = client.get("/api/camera/bootstrap")
+    etag = first.headers["ETag"]
+
+    assert client.get("/api/camera/bootstrap", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/api/camera/settings", json={"name": "New"})
+    changed = client.get("/api/camera/bootstrap", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+def test_bootstrap_without_active_recording(client):
+    assert client.get("/api/camera/bootstrap").json()["activeRecording"] is None
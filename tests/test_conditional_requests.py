@@ -0,0 +1,61 @@
+from routes.camera import etag_matches, parse_if_match
+
+def create_preset(client, name: str = "Night") -> dict:
+    return client.post("/api/camera/settings", json={"name": name}).json()
+
+def test_parse_if_match():
+    assert parse_if_match(None) is None
+    assert parse_if_match("*") is None
+    assert parse_if_match('"3", W/"4", "abc"') == [3, 4]
+
+def test_etag_matches():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
+    assert not etag_matches('"a"', '"b"')
+
+def test_presets_start_at_version_one_and_carry_it_as_etag(client):
+    created = client.post("/api/camera/settings", json={"name": "Night"})
+    assert created.json()["version"] == 1
+    assert created.headers["ETag"] == '"1"'
+
+def test_get_preset_returns_304_for_current_etag(client):
+    preset = create_preset(client)
+    url = f"/api/camera/settings/{preset['id']}"
+
+    fresh = client.get(url)
+    assert (fresh.status_code, fresh.headers["ETag"]) == (200, '"1"')
+    cached = client.get(url, headers={"If-None-Match": '"1"'})
+    assert (cached.status_code, cached.content) == (304, b"")
+
+    client.put(url, json={"iso": 3200})
+    assert client.get(url, headers={"If-None-Match": '"1"'}).status_code == 200
+
+def test_update_with_if_match_only_applies_at_that_version(client):
+    preset = create_preset(client)
+    url = f"/api/camera/settings/{preset['id']}"
+
+    updated = client.put(url, json={"iso": 3200}, headers={"If-Match": '"1"'})
+    assert (updated.status_code, updated.json()["version"], updated.headers["ETag"]) == (200, 2, '"2"')
+
+    stale = client.put(url, json={"iso": 6400}, headers={"If-Match": '"1"'})
+    assert stale.status_code == 412
+    assert client.get(url).json()["iso"] == 3200
+
+    assert client.put(url, json={"iso": 6400}, headers={"If-Match": 'W/"2"'}).status_code == 200
+    assert client.put(url, json={"iso": 100}, headers={"If-Match": "*"}).json()["version"] == 4
+
+def test_if_match_on_missing_preset_is_404(client):
+    response = client.put("/api/camera/settings/missing", json={"iso": 100}, headers={"If-Match": '"1"'})
+    assert response.status_code == 404
+
+def test_list_and_bootstrap_revalidate_with_content_etags(client):
+    create_preset(client)
+    for url in ("/api/camera/settings", "/api/camera/bootstrap"):
+        first = client.get(url)
+        assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    etag = client.get("/api/camera/settings").headers["ETag"]
+    create_preset(client, "Day")
+    assert client.get("/api/camera/settings", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,54 @@
+import gzip
+
+import msgpack
+
+from middleware.encoding import accepts_msgpack, choose_content_encoding
+
+def test_accept_header_negotiation():
+    assert accepts_msgpack("application/msgpack")
+    assert accepts_msgpack("application/json;q=0.5, application/x-msgpack")
+    assert not accepts_msgpack("application/json, application/msgpack;q=0.5")
+    assert not accepts_msgpack("*/*")
+    assert choose_content_encoding("gzip") == "gzip"
+    assert choose_content_encoding("identity") is None
+    assert choose_content_encoding("gzip;q=0, br;q=0") is None
+
+def test_msgpack_response_matches_json(client):
+    client.post("/api/camera/settings", json={"name": "Night"})
+    as_json = client.get("/api/camera/settings").json()
+    response = client.get("/api/camera/settings", headers={"Accept": "application/msgpack", "Accept-Encoding": "identity"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == as_json
+
+def test_msgpack_request_body_is_decoded(client):
+    body = msgpack.packb({"name": "Packed", "iso": 1600})
+    response = client.post("/api/camera/settings", content=body, headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.json()["iso"] == 1600
+
+def test_malformed_msgpack_request_is_rejected(client):
+    response = client.post("/api/camera/settings", content=b"\xc1", headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 400
+
+def test_gzip_request_body_is_decoded(client):
+    body = gzip.compress(b'{"name": "Zipped"}')
+    response = client.post(
+        "/api/camera/settings", content=body,
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.json()["name"] == "Zipped"
+
+def test_large_responses_are_compressed_and_etag_weakened(client):
+    for index in range(10):
+        client.post("/api/camera/settings", json={"name": f"Preset {index}"})
+    response = client.get("/api/camera/settings", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 10
+    assert response.headers["ETag"].startswith("W/")
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/api/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,123 @@
+import uuid
+
+from bson.binary import Binary
+import pytest
+
+from models.camera import CameraSettings
+from services.cache_service import LocalCache
+from services.camera_service import CameraService, get_camera_caches
+from services.events_service import (
+    SETTINGS_CHANNEL, STATUS_CHANNEL, CameraEvent, ChangeStreamEventBus, DeferredEventBus, EventBus, InProcessEventBus,
+    change_to_event,
+)
+
+def settings_event(document_id: str = "p1", operation: str = "update") -> CameraEvent:
+    return CameraEvent(channel=SETTINGS_CHANNEL, operation=operation, documentId=document_id)
+
+def test_event_bus_requires_publish():
+    with pytest.raises(TypeError):
+        EventBus()
+
+@pytest.mark.anyio
+async def test_in_process_bus_fans_out_by_channel_and_drops_oldest():
+    bus = InProcessEventBus(subscriber_queue_size=2)
+    seen = []
+    bus.add_listener(lambda event: 1 / 0)
+    bus.add_listener(seen.append)
+    settings_queue = bus.subscribe([SETTINGS_CHANNEL])
+    status_queue = bus.subscribe([STATUS_CHANNEL])
+
+    for document_id in ("a", "b", "c"):
+        bus.publish(settings_event(document_id))
+
+    assert [event.documentId for event in seen] == ["a", "b", "c"]
+    assert [settings_queue.get_nowait().documentId for _ in range(2)] == ["b", "c"]
+    assert status_queue.empty()
+    bus.unsubscribe(settings_queue)
+    bus.publish(settings_event("d"))
+    assert settings_queue.empty()
+
+@pytest.mark.anyio
+async def test_deferred_bus_delivers_on_flush_and_only_invalidates_on_discard():
+    target = InProcessEventBus()
+    invalidated = []
+    target.add_listener(invalidated.append)
+    queue = target.subscribe()
+
+    deferred = DeferredEventBus(target)
+    deferred.publish(settings_event("a"))
+    assert invalidated == [] and queue.empty()
+    deferred.flush()
+    assert queue.get_nowait().documentId == "a"
+
+    deferred.publish(settings_event("b"))
+    deferred.discard()
+    assert [event.documentId for event in invalidated] == ["a", "b"]
+    assert queue.empty()
+
+def test_change_stream_bus_publish_only_invalidates_until_fallback(mongo_database):
+    bus = ChangeStreamEventBus(mongo_database)
+    invalidated = []
+    bus.add_listener(invalidated.append)
+    queue = bus.subscribe()
+
+    bus.publish(settings_event("a"))
+    assert len(invalidated) == 1 and queue.empty()
+    bus.fallback = True
+    bus.publish(settings_event("b"))
+    assert queue.get_nowait().documentId == "b"
+
+def test_change_to_event_translates_changes():
+    preset_id = str(uuid.uuid4())
+    update = change_to_event({
+        "ns": {"coll": "camera_settings"}, "operationType": "update",
+        "fullDocument": {"_id": Binary.from_uuid(uuid.UUID(preset_id)), "name": "Night"},
+    })
+    assert (update.channel, update.operation, update.documentId, update.document["name"]) == (SETTINGS_CHANNEL, "update", preset_id, "Night")
+
+    delete = change_to_event({"ns": {"coll": "camera_settings"}, "operationType": "delete", "documentKey": {"_id": Binary.from_uuid(uuid.UUID(preset_id))}})
+    assert (delete.documentId, delete.document) == (preset_id, None)
+    assert change_to_event({"ns": {"coll": "recordings"}, "operationType": "insert"}) is None
+
+def test_local_cache_ttl_generation_and_bounds(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("services.cache_service.time.monotonic", lambda: now[0])
+    cache = LocalCache("test", ttl_seconds=10, max_entries=2)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.set("a", "stale read", generation)
+    assert cache.get("a") is None
+
+    now[0] += 11
+    assert cache.get("c") is None
+
+@pytest.mark.anyio
+async def test_service_cache_is_invalidated_by_published_changes(memory_repository, monkeypatch):
+    monkeypatch.setattr("services.camera_service._caches", None)
+    monkeypatch.setenv("CACHE_TTL_SECONDS", "60")
+    bus = InProcessEventBus()
+    bus.add_listener(get_camera_caches().invalidate)
+    service = CameraService(memory_repository, bus)
+    settings = CameraSettings(name="Night")
+    await memory_repository.insert_settings(settings.dict())
+
+    cached = await service.get_settings(settings.id)
+    assert await service.get_settings(settings.id) is cached
+    # Another worker's write reaches this one only as an event
+    await memory_repository.update_settings(settings.id, {"name": "Day"})
+    assert (await service.get_settings(settings.id)).name == "Night"
+    bus.publish(settings_event(settings.id))
+    assert (await service.get_settings(settings.id)).name == "Day"
+
+def test_events_websocket_streams_settings_changes(client):
+    with client.websocket_connect("/api/camera/events/ws?channels=settings") as websocket:
+        created = client.post("/api/camera/settings", json={"name": "Night"}).json()
+        event = websocket.receive_json()
+    assert (event["channel"], event["operation"], event["documentId"]) == (SETTINGS_CHANNEL, "insert", created["id"])
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from database import get_repository
+from services.frame_metadata_service import (
+    FRAME_DTYPE, FRAMES_MEDIA_TYPE, FrameConflictError, FrameMetadataService, FramePartialAppendError,
+    encode_chunk, frames_per_second, summarize_columns,
+)
+
+pytestmark = pytest.mark.anyio
+
+def frames(start: int, count: int) -> np.ndarray:
+    records = np.zeros(count, dtype=FRAME_DTYPE)
+    records["iso"] = np.arange(start, start + count) + 100
+    records["zoom"] = np.arange(start, start + count) / 10
+    return records
+
+def race_on_chunk_one(repository, monkeypatch, recording_id: str):
+    """Make a concurrent append store chunk 1 right after this append stores chunk 0"""
+    save_frame_chunk = repository.save_frame_chunk
+
+    async def racing_save(chunk_doc, expected_count):
+        saved = await save_frame_chunk(chunk_doc, expected_count)
+        if saved and chunk_doc["chunkIndex"] == 0:
+            await save_frame_chunk({
+                "recordingId": recording_id, "chunkIndex": 1, "startFrame": 4, "count": 1, "columns": encode_chunk(frames(4, 1), 1),
+            }, None)
+        return saved
+
+    monkeypatch.setattr(repository, "save_frame_chunk", racing_save)
+
+@pytest.fixture
+def service(memory_repository):
+    service = FrameMetadataService(memory_repository)
+    service.chunk_frames = 4
+    return service
+
+def test_frames_per_second_parses_frame_rates():
+    assert [frames_per_second(rate) for rate in ("24p", "119.88p", "0.2p")] == [24, 120, 1]
+
+def test_summarize_columns_per_second():
+    seconds, summaries = summarize_columns({"iso": np.array([1, 3, 5, 7, 9])}, first_frame=1, fps=2)
+    assert seconds == [0, 1, 2]
+    assert (summaries["iso"].min, summaries["iso"].max, summaries["iso"].mean) == ([1, 3, 7], [1, 5, 9], [1, 4, 8])
+
+async def test_appends_merge_into_partial_chunks_and_round_trip(service, memory_repository):
+    first = await service.append_frames("r1", frames(0, 3).tobytes(), start_frame=0)
+    second = await service.append_frames("r1", frames(3, 7).tobytes(), start_frame=3)
+
+    assert (first.frameCount, first.chunkIndexes) == (3, [0])
+    assert (second.frameCount, second.chunksWritten, second.chunkIndexes) == (10, 3, [0, 1, 2])
+    assert sorted(memory_repository.frame_chunks["r1"]) == [0, 1, 2]
+    assert np.array_equal(np.frombuffer(await service.read_range_packed("r1", 0, None), FRAME_DTYPE), frames(0, 10))
+
+    window = await service.read_range("r1", 2, 7, ["iso"])
+    assert window.columns == {"iso": [102, 103, 104, 105, 106]}
+
+async def test_append_must_start_at_the_stored_frame_count(service):
+    await service.append_frames("r1", frames(0, 2).tobytes())
+    with pytest.raises(FrameConflictError):
+        await service.append_frames("r1", frames(0, 2).tobytes(), start_frame=0)
+
+async def test_lost_race_on_a_later_chunk_reports_the_stored_chunks(service, memory_repository, monkeypatch):
+    await service.append_frames("r1", frames(0, 2).tobytes())
+    race_on_chunk_one(memory_repository, monkeypatch, "r1")
+
+    with pytest.raises(FramePartialAppendError) as raised:
+        await service.append_frames("r1", frames(2, 4).tobytes())
+    result = raised.value.result
+    assert (result.frameCount, result.chunksWritten, result.chunkIndexes) == (4, 1, [0])
+    assert memory_repository.frame_chunks["r1"][0]["count"] == 4
+
+async def test_first_chunk_conflict_stores_nothing(service, memory_repository, monkeypatch):
+    await service.append_frames("r1", frames(0, 2).tobytes())
+    stale = await memory_repository.find_last_frame_chunk("r1")
+    await service.append_frames("r1", frames(2, 1).tobytes())
+
+    async def find_stale_chunk(recording_id):
+        return stale
+
+    # This append read the last chunk before the one above was stored
+    monkeypatch.setattr(memory_repository, "find_last_frame_chunk", find_stale_chunk)
+    with pytest.raises(FrameConflictError) as raised:
+        await service.append_frames("r1", frames(2, 5).tobytes())
+    assert type(raised.value) is FrameConflictError
+    assert sorted(memory_repository.frame_chunks["r1"]) == [0]
+    assert memory_repository.frame_chunks["r1"][0]["count"] == 3
+
+def test_frames_api_append_read_and_summary(client, monkeypatch):
+    monkeypatch.setenv("FRAME_CHUNK_SIZE", "4")
+    recording = client.post("/api/camera/recordings", json={"fileName": "clip.mp4", "frameRate": "2p", "settings": {}}).json()
+    url = f"/api/camera/recordings/{recording['id']}/frames"
+    headers = {"Content-Type": FRAMES_MEDIA_TYPE}
+
+    appended = client.post(f"{url}?startFrame=0", content=frames(0, 6).tobytes(), headers=headers)
+    assert appended.json()["chunkIndexes"] == [0, 1]
+    assert client.post(f"{url}?startFrame=0", content=frames(0, 1).tobytes(), headers=headers).status_code == 409
+    assert client.post(url, content=b"\x00" * 3, headers=headers).status_code == 400
+
+    assert client.get(f"{url}?start=4&fields=iso").json()["columns"] == {"iso": [104, 105]}
+    packed = client.get(url, headers={"Accept": FRAMES_MEDIA_TYPE}).content
+    assert np.array_equal(np.frombuffer(packed, FRAME_DTYPE), frames(0, 6))
+    summary = client.get(f"{url}/summary?fields=iso").json()
+    assert (summary["fps"], summary["seconds"], summary["columns"]["iso"]["mean"]) == (2, [0, 1, 2], [100.5, 102.5, 104.5])
+
+def test_frames_api_returns_stored_chunks_on_partial_append(client, monkeypatch):
+    monkeypatch.setenv("FRAME_CHUNK_SIZE", "4")
+    recording = client.post("/api/camera/recordings", json={"fileName": "clip.mp4", "settings": {}}).json()
+    url = f"/api/camera/recordings/{recording['id']}/frames"
+    headers = {"Content-Type": FRAMES_MEDIA_TYPE}
+    client.post(url, content=frames(0, 2).tobytes(), headers=headers)
+    race_on_chunk_one(get_repository(), monkeypatch, recording["id"])
+
+    response = client.post(url, content=frames(2, 4).tobytes(), headers=headers)
+    assert response.status_code == 409
+    assert {key: response.json()["detail"][key] for key in ("frameCount", "chunksWritten", "chunkIndexes")} == {
+        "frameCount": 4, "chunksWritten": 1, "chunkIndexes": [0],
+    }
@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+import asyncio
+
+import pytest
+
+from services.idempotency_service import IdempotencyConflictError, IdempotencyInProgressError, IdempotencyStore
+
+pytestmark = pytest.mark.anyio
+
+def test_settings_create_replays_with_same_key(client):
+    headers = {"Idempotency-Key": "save-1"}
+    first = client.post("/api/camera/settings", json={"name": "Night"}, headers=headers)
+    second = client.post("/api/camera/settings", json={"name": "Night"}, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert len(client.get("/api/camera/settings").json()) == 1
+
+def test_key_reused_with_different_payload_is_rejected(client):
+    headers = {"Idempotency-Key": "save-2"}
+    client.post("/api/camera/settings", json={"name": "Night"}, headers=headers)
+    response = client.post("/api/camera/settings", json={"name": "Day"}, headers=headers)
+    assert response.status_code == 422
+
+def test_recording_start_and_stop_replay(client):
+    body = {"fileName": "clip.mp4", "settings": {}}
+    started = client.post("/api/camera/recordings", json=body, headers={"Idempotency-Key": "start-1"})
+    again = client.post("/api/camera/recordings", json=body, headers={"Idempotency-Key": "start-1"})
+    assert again.json()["id"] == started.json()["id"]
+
+    recording_id = started.json()["id"]
+    stopped = client.put(f"/api/camera/recordings/{recording_id}/stop", headers={"Idempotency-Key": "stop-1"})
+    stopped_again = client.put(f"/api/camera/recordings/{recording_id}/stop", headers={"Idempotency-Key": "stop-1"})
+    assert stopped.status_code == stopped_again.status_code == 200
+    assert stopped_again.headers["Idempotent-Replayed"] == "true"
+
+async def test_concurrent_duplicates_run_once():
+    store = IdempotencyStore(None)
+    calls = 0
+
+    async def operation():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"value": calls}
+
+    results = await asyncio.gather(*(store.execute("k", "scope", {"a": 1}, operation) for _ in range(5)))
+    assert calls == 1
+    assert [body for body, _ in results] == [{"value": 1}] * 5
+    assert sum(replayed for _, replayed in results) == 4
+
+async def test_failed_operation_releases_key():
+    store = IdempotencyStore(None)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await store.execute("k", "scope", None, failing)
+
+    async def succeeding():
+        return {"ok": True}
+
+    assert await store.execute("k", "scope", None, succeeding) == ({"ok": True}, False)
+
+async def test_other_process_replays_completed_key(mongo_database):
+    first = IdempotencyStore(mongo_database.idempotency_keys)
+    second = IdempotencyStore(mongo_database.idempotency_keys)
+
+    async def operation():
+        return {"id": "abc"}
+
+    await first.execute("k", "scope", {"a": 1}, operation)
+    body, replayed = await second.execute("k", "scope", {"a": 1}, operation)
+    assert (body, replayed) == ({"id": "abc"}, True)
+    with pytest.raises(IdempotencyConflictError):
+        await second.execute("k", "scope", {"a": 2}, operation)
+
+async def test_live_pending_key_reports_in_progress(mongo_database):
+    collection = mongo_database.idempotency_keys
+    store = IdempotencyStore(collection, wait_timeout=0.1, poll_interval=0.01)
+    fingerprint = store._fingerprint(None)
+    await collection.insert_one({
+        "_id": "scope:k", "fingerprint": fingerprint, "status": "pending", "leaseId": "other",
+        "pendingUntil": datetime.utcnow() + timedelta(minutes=5), "createdAt": datetime.utcnow(),
+    })
+
+    async def operation():
+        return {"ok": True}
+
+    with pytest.raises(IdempotencyInProgressError):
+        await store.execute("k", "scope", None, operation)
+
+async def test_expired_pending_lease_is_taken_over(mongo_database):
+    collection = mongo_database.idempotency_keys
+    store = IdempotencyStore(collection, wait_timeout=0.1, poll_interval=0.01)
+    # Left behind by a process that died after claiming the key
+    await collection.insert_one({
+        "_id": "scope:k", "fingerprint": store._fingerprint(None), "status": "pending", "leaseId": "dead",
+        "pendingUntil": datetime.utcnow() - timedelta(seconds=1), "createdAt": datetime.utcnow(),
+    })
+
+    async def operation():
+        return {"ok": True}
+
+    assert await store.execute("k", "scope", None, operation) == ({"ok": True}, False)
+    doc = await collection.find_one({"_id": "scope:k"})
+    assert doc["status"] == "completed"
+    assert doc["response"] == {"ok": True}
+
+async def test_lease_is_renewed_while_a_slow_operation_runs(mongo_database):
+    collection = mongo_database.idempotency_keys
+    owner = IdempotencyStore(collection, lease_seconds=0.15, poll_interval=0.01)
+    retry = IdempotencyStore(collection, lease_seconds=0.15, wait_timeout=2, poll_interval=0.01)
+    calls = 0
+
+    async def slow_operation():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.6)
+        return {"id": "abc"}
+
+    async def retry_later():
+        await asyncio.sleep(0.2)
+        return await retry.execute("k", "scope", None, slow_operation)
+
+    (first, first_replayed), (second, second_replayed) = await asyncio.gather(
+        owner.execute("k", "scope", None, slow_operation), retry_later()
+    )
+    assert calls == 1
+    assert (first, first_replayed) == ({"id": "abc"}, False)
+    assert (second, second_replayed) == ({"id": "abc"}, True)
+
+async def test_lost_lease_is_logged_on_completion(mongo_database, caplog):
+    collection = mongo_database.idempotency_keys
+    store = IdempotencyStore(collection, lease_seconds=60)
+
+    async def operation():
+        # Simulate a retry that took the key over after the lease expired
+        await collection.update_one({"_id": "scope:k"}, {"$set": {"leaseId": "other"}})
+        return {"ok": True}
+
+    assert await store.execute("k", "scope", None, operation) == ({"ok": True}, False)
+    assert "was lost" in caplog.text
+    assert (await collection.find_one({"_id": "scope:k"}))["status"] == "pending"
@@ -0,0 +1,42 @@
+import httpx
+import pytest
+
+from benchmarks.load_benchmark import LoadBenchmark, compare_to_baseline, percentile
+
+pytestmark = pytest.mark.anyio
+
+def endpoint_stats(p95_ms: float, throughput_rps: float = 100.0) -> dict:
+    return {"p95_ms": p95_ms, "throughput_rps": throughput_rps}
+
+def test_percentile_uses_nearest_rank():
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 95) == 95.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile(samples, 100) == 100.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 95) == 0.0
+
+def test_compare_to_baseline_flags_only_regressions_past_threshold():
+    baseline = {"endpoints": {"GET /a": endpoint_stats(10.0), "GET /b": endpoint_stats(10.0), "GET /c": endpoint_stats(0.0)}}
+    current = {"endpoints": {
+        "GET /a": endpoint_stats(11.5),
+        "GET /b": endpoint_stats(13.0),
+        "GET /c": endpoint_stats(5.0),
+        "GET /new": endpoint_stats(50.0),
+    }}
+    assert compare_to_baseline(current, baseline, max_regression=0.2) == ["GET /b"]
+
+async def test_traffic_mix_runs_against_the_api(client):
+    transport = httpx.ASGITransport(app=client.app)
+    benchmark = LoadBenchmark("http://test/api/", concurrency=2, duration=0, seed=1)
+    async with httpx.AsyncClient(transport=transport) as http:
+        await benchmark.seed(http, presets=3)
+        for scenario in ("status_tick", "status_read", "recording_cycle", "preset_read", "settings_page", "recordings_page"):
+            await getattr(benchmark, scenario)(http)
+
+    report = benchmark.report(elapsed=1.0)
+    assert report["total_errors"] == 0
+    assert report["total_requests"] == 7
+    assert len(benchmark.preset_ids) == 3
+    assert report["endpoints"]["PUT /camera/recordings/{id}/stop"]["requests"] == 1
@@ -0,0 +1,55 @@
+import pytest
+
+from services.metrics import Counter, Gauge, Histogram, MetricsRegistry, _Metric
+
+def test_metric_base_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        _Metric("base", "no samples")
+
+def test_counter_and_gauge_render_per_label_set():
+    requests = Counter("requests_total", "Requests", ("route",))
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    requests.inc(route='/b"x')
+    in_flight = Gauge("in_flight", "In flight")
+    in_flight.inc()
+    in_flight.dec(0.5)
+
+    assert requests.value(route="/a") == 3
+    assert requests.render() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a"} 3',
+        'requests_total{route="/b\\"x"} 1',
+    ]
+    assert in_flight.render()[-1] == "in_flight 0.5"
+    in_flight.set(4)
+    assert in_flight.render()[-1] == "in_flight 4"
+
+def test_histogram_renders_cumulative_buckets():
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    assert latency.render()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+def test_registry_renders_every_metric():
+    registry = MetricsRegistry()
+    registry.register(Counter("a_total", "A")).inc()
+    registry.register(Gauge("b", "B")).set(2)
+    assert registry.render().endswith("a_total 1\n# HELP b B\n# TYPE b gauge\nb 2\n")
+
+def test_metrics_endpoint_records_route_templates(client):
+    created = client.post("/api/camera/settings", json={"name": "Night"}).json()
+    client.get(f"/api/camera/settings/{created['id']}")
+
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/api/camera/settings/{settings_id}",status="200"}' in body
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'route="/metrics"' not in body
@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+from models.camera import CameraSettings, RecordingCreate
+from services.camera_service import CameraService
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def build_threads(monkeypatch):
+    """Names of the threads that built each model list"""
+    threads = []
+    to_models = CameraService._to_models
+
+    def recording_to_models(model, docs):
+        threads.append(threading.current_thread().name)
+        return to_models(model, docs)
+
+    monkeypatch.setattr(CameraService, "_to_models", staticmethod(recording_to_models))
+    return threads
+
+async def test_default_threshold_offloads_full_list_pages(memory_repository, build_threads):
+    service = CameraService(memory_repository)
+    for i in range(100):
+        await memory_repository.insert_settings(CameraSettings(name=f"preset {i}").dict())
+
+    assert service.offload_model_threshold < 100
+    assert len(await service.get_all_settings()) == 100
+    assert build_threads[-1].startswith("cpu")
+
+async def test_short_lists_stay_on_the_event_loop(memory_repository, build_threads):
+    service = CameraService(memory_repository)
+    await service.start_recording(RecordingCreate(fileName="clip.mp4", settings={}))
+
+    assert len(await service.get_all_recordings()) == 1
+    assert build_threads == [threading.current_thread().name]
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from middleware.profiling import ProfilingMiddleware
+from services.profiling import SLOW_LOG, LoopBlockingSampler, SlowLog, SlowQueryListener, command_shape, summarize_plan
+
+@pytest.fixture(autouse=True)
+def empty_slow_log():
+    SLOW_LOG.clear()
+    yield
+    SLOW_LOG.clear()
+
+def command_event(request_id: int, duration_ms: float = 0.0, **command):
+    return SimpleNamespace(
+        command_name=next(iter(command)), database_name="camera", command=command,
+        request_id=request_id, duration_micros=int(duration_ms * 1000),
+    )
+
+def test_command_shape_masks_literals():
+    command = {"find": "recordings", "filter": {"status": "recording", "startTime": {"$lt": 5}}, "sort": [{"startTime": -1}, {"id": 1}]}
+    assert command_shape(command) == {"find": "?", "filter": {"status": "?", "startTime": {"$lt": "?"}}, "sort": [{"startTime": "?"}]}
+
+def test_summarize_plan_for_find_and_aggregate():
+    find_plan = {"queryPlanner": {"winningPlan": {
+        "stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "status_1"}},
+    }}}
+    assert summarize_plan(find_plan) == "IXSCAN(status_1) -> FETCH -> LIMIT"
+
+    aggregate_plan = {"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}}}}]}
+    assert summarize_plan(aggregate_plan) == "COLLSCAN"
+    assert summarize_plan({}) == "unknown"
+
+def test_slow_log_keeps_the_slowest_and_bounds_stacks():
+    log = SlowLog(max_entries=2)
+    for duration in (5, 50, 20):
+        log.record("requests", {"durationMs": duration})
+    for stack in ("a", "a", "b", "c"):
+        log.record_stack(stack, 60)
+
+    top = log.top()
+    assert [entry["durationMs"] for entry in top["requests"]] == [50, 20]
+    assert [(stack["stack"], stack["samples"]) for stack in top["blockingStacks"]] == [("a", 2), ("b", 1)]
+    log.clear()
+    assert log.top() == {"requests": [], "queries": [], "blockingStacks": []}
+
+def test_slow_query_listener_records_only_slow_commands():
+    listener = SlowQueryListener(threshold_ms=10, explain=False)
+    fast = command_event(1, 2, find="recordings", filter={"status": "recording"})
+    slow = command_event(2, 25, find="recordings", filter={"status": "recording"}, lsid={"id": "session"})
+    for event in (fast, slow):
+        listener.started(event)
+        listener.succeeded(event)
+
+    queries = SLOW_LOG.top()["queries"]
+    assert len(queries) == 1
+    assert queries[0]["durationMs"] == 25
+    assert queries[0]["shape"] == {"find": "recordings", "filter": {"status": "?"}}
+
+def test_middleware_records_slow_requests_with_route_template():
+    inner = FastAPI()
+
+    @inner.get("/items/{item_id}")
+    async def slow(item_id: int):
+        await asyncio.sleep(0.02)
+        return {"id": item_id}
+
+    app = ProfilingMiddleware(inner, threshold_ms=10)
+    with TestClient(app) as client:
+        client.get("/items/42")
+        client.get("/metrics")
+
+    [entry] = SLOW_LOG.top()["requests"]
+    assert (entry["route"], entry["path"], entry["status"]) == ("/items/{item_id}", "/items/42", 200)
+    assert entry["durationMs"] >= 10
+
+@pytest.mark.anyio
+async def test_loop_blocking_sampler_captures_the_blocking_stack():
+    sampler = LoopBlockingSampler(interval=0.01, block_threshold=0.05)
+    sampler.start()
+    try:
+        await asyncio.sleep(0.02)
+        time.sleep(0.3)
+        await asyncio.sleep(0.02)
+    finally:
+        sampler.stop()
+
+    assert sampler.samples
+    assert any("test_loop_blocking_sampler_captures_the_blocking_stack" in sample["stack"] for sample in sampler.samples)
+    assert SLOW_LOG.top()["blockingStacks"]
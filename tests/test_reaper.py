@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.camera import Recording
+from services.camera_service import CameraService
+from services.reaper_service import RecordingReaper
+
+pytestmark = pytest.mark.anyio
+
+def recording(status: str, age_hours: float) -> dict:
+    return Recording(
+        fileName="clip.mp4", resolution="4K UHD", frameRate="24p", settings={},
+        startTime=datetime.utcnow() - timedelta(hours=age_hours), status=status
+    ).dict()
+
+async def test_fail_action_closes_only_stale_active_sessions(memory_repository):
+    stale, fresh, finished = recording("recording", 10), recording("recording", 1), recording("completed", 10)
+    for doc in (stale, fresh, finished):
+        await memory_repository.insert_recording(doc)
+
+    reaper = RecordingReaper(CameraService(memory_repository), stale_after=timedelta(hours=4), batch_size=1, batch_pause=0)
+    assert await reaper.reap() == 1
+
+    reaped = await memory_repository.find_recording(stale["id"])
+    assert reaped["status"] == "failed"
+    assert reaped["endTime"] is not None
+    assert (await memory_repository.find_recording(fresh["id"]))["status"] == "recording"
+    assert (await memory_repository.find_recording(finished["id"]))["status"] == "completed"
+    assert reaper.stats["reaped"] == 1
+
+async def test_complete_action_caps_duration(memory_repository, monkeypatch):
+    monkeypatch.setenv("MAX_RECORDING_SECONDS", "3600")
+    stale = recording("recording", 10)
+    await memory_repository.insert_recording(stale)
+
+    reaper = RecordingReaper(CameraService(memory_repository), stale_after=timedelta(hours=4), action="complete")
+    assert await reaper.reap() == 1
+
+    completed = await memory_repository.find_recording(stale["id"])
+    assert completed["status"] == "completed"
+    assert completed["duration"] == 3600
+    assert completed["endTime"] == completed["startTime"] + timedelta(hours=1)
+
+async def test_reaped_session_cannot_be_stopped_again(memory_repository):
+    stale = recording("recording", 10)
+    await memory_repository.insert_recording(stale)
+    service = CameraService(memory_repository)
+    await RecordingReaper(service, stale_after=timedelta(hours=4)).reap()
+    assert await service.stop_recording(stale["id"]) is None
+
+def test_unknown_action_is_rejected(memory_repository):
+    with pytest.raises(ValueError):
+        RecordingReaper(CameraService(memory_repository), stale_after=timedelta(hours=4), action="delete")
@@ -0,0 +1,176 @@
+"""Behaviour every CameraRepository engine must share, run against the in-memory and Motor engines"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.camera import CameraSettings, CameraStatus, Recording
+from repositories.memory_repository import InMemoryCameraRepository
+from repositories.motor_repository import MotorCameraRepository
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(params=["memory", "motor"])
+async def repository(request):
+    if request.param == "memory":
+        return InMemoryCameraRepository()
+    repository = MotorCameraRepository(request.getfixturevalue("mongo_database"))
+    await repository.ensure_indexes()
+    return repository
+
+def settings(name: str, created_offset: float = 0) -> dict:
+    created = datetime(2024, 1, 1) + timedelta(seconds=created_offset)
+    return CameraSettings(name=name, createdAt=created, updatedAt=created).dict()
+
+def recording(status: str = "recording", start_offset_hours: float = 0, **fields) -> dict:
+    return Recording(
+        fileName="clip.mp4", resolution="4K UHD", frameRate="24p", settings={"colorProfile": "S-Log3"},
+        startTime=datetime(2024, 1, 10) + timedelta(hours=start_offset_hours), status=status, **fields
+    ).dict()
+
+def strip_storage_id(doc):
+    return {key: value for key, value in doc.items() if key != "_id"} if doc else doc
+
+async def test_settings_round_trip_and_newest_first(repository):
+    docs = [settings(name, offset) for offset, name in enumerate(["a", "b", "c"])]
+    for doc in docs:
+        await repository.insert_settings(doc)
+
+    assert await repository.find_settings(docs[1]["id"]) == docs[1]
+    assert await repository.find_settings("missing") is None
+    assert [doc["name"] for doc in await repository.list_settings(2)] == ["c", "b"]
+
+async def test_settings_update_increments_version_and_honours_expected_versions(repository):
+    doc = settings("a")
+    await repository.insert_settings(doc)
+
+    updated = await repository.update_settings(doc["id"], {"iso": 3200})
+    assert (updated["iso"], updated["version"]) == (3200, 2)
+    assert await repository.update_settings(doc["id"], {"iso": 6400}, expected_versions=[1]) is None
+    assert (await repository.update_settings(doc["id"], {"iso": 6400}, expected_versions=[2]))["version"] == 3
+    assert await repository.update_settings("missing", {"iso": 100}) is None
+
+async def test_settings_delete(repository):
+    doc = settings("a")
+    await repository.insert_settings(doc)
+    assert await repository.delete_settings(doc["id"]) is True
+    assert await repository.delete_settings(doc["id"]) is False
+    assert await repository.find_settings(doc["id"]) is None
+
+async def test_recording_lifecycle(repository):
+    older, newer = recording(start_offset_hours=0), recording(start_offset_hours=1)
+    for doc in (older, newer):
+        await repository.insert_recording(doc)
+
+    assert (await repository.find_active_recording())["id"] == newer["id"]
+    assert [doc["id"] for doc in await repository.list_recordings(10)] == [newer["id"], older["id"]]
+
+    fields = {"status": "completed", "endTime": datetime(2024, 1, 10, 2), "duration": 60.0}
+    assert await repository.complete_recording(newer["id"], fields) is True
+    assert await repository.complete_recording(newer["id"], fields) is False
+    assert (await repository.find_recording(newer["id"]))["status"] == "completed"
+    assert (await repository.find_active_recording())["id"] == older["id"]
+
+    assert await repository.delete_recording(older["id"]) is True
+    assert await repository.find_recording(older["id"]) is None
+
+async def test_stale_lookup_and_batch_updates(repository):
+    stale = [recording(start_offset_hours=hours) for hours in (0, 1, 2)]
+    fresh = recording(start_offset_hours=10)
+    for doc in stale + [fresh]:
+        await repository.insert_recording(doc)
+    cutoff = datetime(2024, 1, 10, 5)
+
+    assert await repository.find_recording_ids("recording", cutoff, 2) == [stale[0]["id"], stale[1]["id"]]
+    assert await repository.fail_recordings([stale[0]["id"], fresh["id"]], cutoff) == 2
+    assert await repository.fail_recordings([stale[0]["id"]], cutoff) == 0
+    assert (await repository.find_recording(stale[0]["id"]))["status"] == "failed"
+
+async def test_complete_recordings_capped(repository):
+    if isinstance(repository, MotorCameraRepository):
+        pytest.skip("mongomock cannot evaluate $add on dates in pipeline updates")
+    doc = recording()
+    await repository.insert_recording(doc)
+
+    assert await repository.complete_recordings_capped([doc["id"]], datetime(2024, 1, 10, 5), max_seconds=1800) == 1
+    capped = await repository.find_recording(doc["id"])
+    assert (capped["status"], capped["duration"], capped["fileSize"]) == ("completed", 1800, 900)
+    assert capped["endTime"] == doc["startTime"] + timedelta(minutes=30)
+
+async def test_filtered_batch_delete(repository):
+    failed, completed = recording("failed"), recording("completed")
+    for doc in (failed, completed):
+        await repository.insert_recording(doc)
+    ids = [failed["id"], completed["id"], "missing"]
+
+    assert await repository.delete_recordings(ids, "failed", datetime(2024, 2, 1)) == 1
+    assert await repository.find_existing_recording_ids(ids) == [completed["id"]]
+    assert await repository.delete_recordings(ids) == 1
+    assert await repository.find_existing_recording_ids(ids) == []
+
+async def test_frame_chunks_compare_and_swap(repository):
+    chunk = {"recordingId": "r1", "chunkIndex": 0, "startFrame": 0, "count": 2, "columns": {"iso": b"a", "zoom": b"b"}}
+    assert await repository.find_last_frame_chunk("r1") is None
+    assert await repository.save_frame_chunk(chunk, None) is True
+    assert await repository.save_frame_chunk(chunk, None) is False
+
+    grown = {**chunk, "count": 3}
+    assert await repository.save_frame_chunk(grown, 1) is False
+    assert await repository.save_frame_chunk(grown, 2) is True
+    assert await repository.save_frame_chunk({**chunk, "chunkIndex": 1, "startFrame": 3}, None) is True
+
+    assert strip_storage_id(await repository.find_last_frame_chunk("r1"))["chunkIndex"] == 1
+    chunks = await repository.find_frame_chunks("r1", 0, 0, ["iso"])
+    assert chunks == [{"chunkIndex": 0, "startFrame": 0, "count": 3, "columns": {"iso": b"a"}}]
+
+    assert await repository.delete_recording_media(["r1"]) == 2
+    assert await repository.find_last_frame_chunk("r1") is None
+
+async def test_recording_groups(repository):
+    await repository.insert_recording(recording("completed", 0, duration=30.0, fileSize=15.0))
+    await repository.insert_recording(recording("completed", 1, duration=10.0, fileSize=5.0))
+    await repository.insert_recording(recording("failed", 30))
+
+    groups = await repository.aggregate_recording_groups(datetime(2024, 1, 10), datetime(2024, 1, 11))
+    assert groups == [{
+        "day": "2024-01-10", "resolution": "4K UHD", "frameRate": "24p", "colorProfile": "S-Log3",
+        "status": "completed", "count": 2, "durationSeconds": 40.0, "fileSizeMB": 20.0,
+    }]
+
+async def test_rollup_watermark(repository):
+    assert await repository.find_rollup_watermark() is None
+    await repository.set_rollup_watermark(datetime(2024, 1, 5))
+    await repository.set_rollup_watermark(datetime(2024, 1, 6))
+    assert await repository.find_rollup_watermark() == datetime(2024, 1, 6)
+
+async def test_status_snapshot(repository):
+    assert await repository.find_latest_status() is None
+    first = CameraStatus(battery=50, lastUpdate=datetime(2024, 1, 1)).dict()
+    await repository.insert_status(first)
+    assert strip_storage_id(await repository.find_latest_status()) == first
+
+    replacement = CameraStatus(battery=20, lastUpdate=datetime(2024, 1, 2)).dict()
+    await repository.replace_status(replacement)
+    assert strip_storage_id(await repository.find_latest_status()) == replacement
+
+async def test_status_sample_only_moves_forward(repository):
+    assert await repository.update_status_if_newer({"battery": 90}, datetime(2024, 1, 1)) is None
+    await repository.insert_status(CameraStatus(battery=50, lastUpdate=datetime(2024, 1, 1)).dict())
+
+    newer = await repository.update_status_if_newer({"battery": 40}, datetime(2024, 1, 2))
+    assert (newer["battery"], newer["sampledAt"]) == (40, datetime(2024, 1, 2))
+    assert await repository.update_status_if_newer({"battery": 90}, datetime(2024, 1, 1)) is None
+    assert await repository.update_status_if_newer({"battery": 90}, datetime(2024, 1, 2)) is None
+    assert (await repository.find_latest_status())["battery"] == 40
+
+async def test_status_checks(repository):
+    checks = [{"id": f"00000000-0000-4000-8000-00000000000{i}", "client_name": f"c{i}", "timestamp": datetime(2024, 1, 1, i)} for i in range(3)]
+    for check in checks:
+        await repository.insert_status_check(check)
+    assert await repository.list_status_checks(2) == checks[:2]
+
+def test_status_check_api_on_memory_storage(client):
+    created = client.post("/api/status", json={"client_name": "probe"})
+    assert created.status_code == 200
+    listed = client.get("/api/status")
+    assert listed.status_code == 200
+    assert [check["id"] for check in listed.json()] == [created.json()["id"]]
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.camera import Recording
+from repositories.motor_repository import MotorCameraRepository
+from services.camera_service import CameraService
+from services.retention_service import RetentionPolicy, RetentionSweeper
+
+pytestmark = pytest.mark.anyio
+
+def recording(status: str, age_hours: float) -> dict:
+    return Recording(
+        fileName="clip.mp4", resolution="4K UHD", frameRate="24p", settings={},
+        startTime=datetime.utcnow() - timedelta(hours=age_hours), status=status
+    ).dict()
+
+async def test_sweep_deletes_only_expired_recordings_of_each_status(memory_repository):
+    old_failed, new_failed, old_completed = recording("failed", 200), recording("failed", 1), recording("completed", 200)
+    for doc in (old_failed, new_failed, old_completed):
+        await memory_repository.insert_recording(doc)
+    memory_repository.media[old_failed["id"]] = [b"blob"]
+
+    sweeper = RetentionSweeper(CameraService(memory_repository), [RetentionPolicy(status="failed", max_age=timedelta(hours=168))], batch_size=1, batch_pause=0)
+    assert await sweeper.sweep() == {"failed": 1}
+
+    assert await memory_repository.find_recording(old_failed["id"]) is None
+    assert old_failed["id"] not in memory_repository.media
+    assert await memory_repository.find_recording(new_failed["id"]) is not None
+    assert await memory_repository.find_recording(old_completed["id"]) is not None
+
+async def test_recording_changed_after_lookup_keeps_document_and_media(memory_repository):
+    doc = recording("recording", 100)
+    await memory_repository.insert_recording(doc)
+    memory_repository.media[doc["id"]] = [b"blob"]
+    find_recording_ids = memory_repository.find_recording_ids
+
+    async def find_then_stop(status, started_before, limit):
+        ids = await find_recording_ids(status, started_before, limit)
+        # The client stops the recording between the sweep's lookup and its delete
+        await memory_repository.complete_recording(doc["id"], {"status": "completed", "endTime": datetime.utcnow()})
+        return ids
+
+    memory_repository.find_recording_ids = find_then_stop
+    deleted = await CameraService(memory_repository).purge_recordings("recording", datetime.utcnow() - timedelta(hours=72), 10)
+
+    assert deleted == 0
+    assert (await memory_repository.find_recording(doc["id"]))["status"] == "completed"
+    assert memory_repository.media[doc["id"]] == [b"blob"]
+
+async def test_motor_delete_repeats_status_and_cutoff(mongo_database):
+    repository = MotorCameraRepository(mongo_database)
+    await repository.ensure_indexes()
+    expired, changed, recent = recording("failed", 200), recording("completed", 200), recording("failed", 1)
+    for doc in (expired, changed, recent):
+        await repository.insert_recording(doc)
+
+    ids = [expired["id"], changed["id"], recent["id"]]
+    assert await repository.delete_recordings(ids, "failed", datetime.utcnow() - timedelta(hours=168)) == 1
+    assert sorted(await repository.find_existing_recording_ids(ids)) == sorted([changed["id"], recent["id"]])
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from services.executor import BoundedExecutor
+from services.stacking_service import (
+    SharedFrames, StackingBusyError, StackingEngine, StackingError, get_stacking_engine, hdr_merge, median_stack,
+    parse_shutter_speed, relative_exposures, sigma_clip_stack, stack_frames,
+)
+
+FRAME_MEDIA_TYPE = "application/octet-stream"
+
+def burst(count: int, height: int = 5, width: int = 4, channels: int = 3, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (count, height, width, channels), dtype=np.uint8)
+
+@pytest.mark.parametrize("count", [1, 2, 3, 8, 13])
+def test_median_matches_numpy(count):
+    frames = burst(count)
+    assert np.allclose(median_stack(frames), np.median(frames, axis=0))
+
+def test_mean_matches_numpy():
+    frames = burst(4)
+    assert np.allclose(stack_frames(frames, "mean"), frames.mean(axis=0))
+
+def test_sigma_clip_rejects_a_hot_pixel():
+    frames = np.full((5, 2, 2, 1), 100, dtype=np.uint8)
+    frames[:, 0, 0, 0] = [98, 100, 102, 101, 255]
+    merged = sigma_clip_stack(frames, sigma=3.0)
+    assert merged[0, 0, 0] == pytest.approx(np.mean([98, 100, 102, 101]))
+    assert np.all(merged[1:] == 100)
+
+def test_shutter_speeds_and_relative_exposures():
+    assert [parse_shutter_speed(value) for value in ("1/250", "0.5", '2"')] == [0.004, 0.5, 2.0]
+    with pytest.raises(StackingError):
+        parse_shutter_speed("1/0")
+    assert relative_exposures(["1/60", "1/30"], isos=[200, 100]).tolist() == [1.0, 1.0]
+    assert relative_exposures(["1/100", "1/25"]).tolist() == [0.25, 1.0]
+
+def test_hdr_recovers_radiance_from_brackets():
+    radiance = np.array([0.05, 0.1, 0.2], dtype=np.float32).reshape(1, 3, 1)
+    exposures = np.array([0.25, 1.0], dtype=np.float32)
+    frames = np.stack([np.clip(radiance * exposure * 255, 0, 255) for exposure in exposures]).astype(np.float32)
+    assert np.allclose(hdr_merge(frames, exposures, 255.0), radiance, rtol=1e-5)
+
+def test_engine_reserve_enforces_the_in_flight_budget():
+    engine = StackingEngine(executor=object(), max_inflight_bytes=100)
+    with engine.reserve(60):
+        with pytest.raises(StackingBusyError):
+            with engine.reserve(41):
+                pass
+        with engine.reserve(40):
+            assert engine.inflight_bytes == 100
+    assert engine.inflight_bytes == 0
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("method", ["median", "sigma_clip", "hdr"])
+async def test_tiled_stack_matches_inline(method):
+    frames = burst(3, height=9, width=6, seed=1)
+    exposures = relative_exposures(["1/100", "1/50", "1/25"]) if method == "hdr" else None
+    pool = BoundedExecutor("stacking-test", max_workers=2, use_processes=True, mp_context="spawn")
+    tiled = StackingEngine(pool, tile_rows=4, min_parallel_pixels=0)
+    inline = StackingEngine(pool, min_parallel_pixels=10 ** 9)
+    try:
+        with SharedFrames(frames.shape, frames.dtype) as shared:
+            shared.array[:] = frames
+            tiled_result = await tiled.stack(shared, method, exposures, tonemap_hdr=method == "hdr")
+            inline_result = await inline.stack(shared, method, exposures, tonemap_hdr=method == "hdr")
+    finally:
+        pool.shutdown()
+    assert tiled_result.dtype == inline_result.dtype == np.uint8
+    assert np.array_equal(tiled_result, inline_result)
+
+@pytest.fixture
+def engine(client):
+    engine = StackingEngine(executor=object(), min_parallel_pixels=10 ** 9, max_inflight_bytes=1000)
+    client.app.dependency_overrides[get_stacking_engine] = lambda: engine
+    yield engine
+    client.app.dependency_overrides.pop(get_stacking_engine)
+
+def stack_url(count: int, height: int = 5, width: int = 4, method: str = "median") -> str:
+    return f"/api/camera/stack?frames={count}&width={width}&height={height}&channels=3&method={method}"
+
+def test_stack_endpoint_returns_the_merged_frame(client, engine):
+    frames = burst(3)
+    response = client.post(stack_url(3), content=frames.tobytes(), headers={"Content-Type": FRAME_MEDIA_TYPE})
+
+    assert response.status_code == 200
+    assert (response.headers["X-Frame-Dtype"], response.headers["X-Stack-Frames"]) == ("uint8", "3")
+    merged = np.frombuffer(response.content, np.uint8).reshape(5, 4, 3)
+    assert np.array_equal(merged, np.median(frames, axis=0).astype(np.uint8))
+    assert engine.inflight_bytes == 0
+
+def test_stack_endpoint_checks_content_length_before_allocating(client, engine, monkeypatch):
+    def fail_allocate(*args):
+        raise AssertionError("allocated before the body was validated")
+
+    monkeypatch.setattr(engine, "allocate", fail_allocate)
+    headers = {"Content-Type": FRAME_MEDIA_TYPE}
+    body = burst(3).tobytes()
+
+    assert client.post(stack_url(3), content=iter([body]), headers=headers).status_code == 411
+    assert client.post(stack_url(3), content=body[:-1], headers=headers).status_code == 400
+
+def test_stack_endpoint_rejects_batches_past_the_in_flight_budget(client, engine):
+    body = burst(3).tobytes()
+    headers = {"Content-Type": FRAME_MEDIA_TYPE}
+    with engine.reserve(1000 - len(body) + 1):
+        busy = client.post(stack_url(3), content=body, headers=headers)
+    assert (busy.status_code, busy.headers["Retry-After"]) == (503, "1")
+    assert client.post(stack_url(3), content=body, headers=headers).status_code == 200
+
+def test_stack_endpoint_validates_parameters(client, engine):
+    headers = {"Content-Type": FRAME_MEDIA_TYPE}
+    assert client.post(stack_url(3, method="blur"), content=b"", headers=headers).status_code == 400
+    assert client.post(stack_url(3, method="hdr"), content=b"", headers=headers).status_code == 400
+    assert client.post(stack_url(64), content=b"", headers=headers).status_code == 413
+    assert client.post(stack_url(1), content=b"", headers={"Content-Type": "image/png"}).status_code == 415
@@ -0,0 +1,112 @@
+import struct
+
+import msgpack
+import numpy as np
+import pytest
+
+from database import get_repository
+from services.telemetry_service import (
+    MSGPACK_MEDIA_TYPE, STRUCT_MEDIA_TYPE, TELEMETRY_DTYPE, TelemetryDecodeError,
+    build_bucket_documents, decode_msgpack_frames, decode_struct_frames, filter_valid,
+)
+
+T0 = 1_700_000_000.0
+
+def records(*rows) -> np.ndarray:
+    return np.array([tuple(row) for row in rows], dtype=TELEMETRY_DTYPE)
+
+def msgpack_frames(*frames: dict) -> bytes:
+    body = b""
+    for columns in frames:
+        packed = msgpack.packb(columns, use_bin_type=True)
+        body += struct.pack("<I", len(packed)) + packed
+    return body
+
+def test_struct_frames_round_trip():
+    sent = records((T0, 80, 30, 10, 0), (T0 + 1, 79, 31, 11, 0.5))
+    assert np.array_equal(decode_struct_frames(sent.tobytes()), sent)
+    with pytest.raises(TelemetryDecodeError):
+        decode_struct_frames(sent.tobytes()[:-1])
+
+def test_msgpack_frames_accept_packed_and_list_columns():
+    body = msgpack_frames(
+        {"timestamp": np.array([T0, T0 + 1], "<f8").tobytes(), "battery": np.array([80, 79], "<f4").tobytes()},
+        {"timestamp": [T0 + 2], "temperature": [40]},
+    )
+    decoded = decode_msgpack_frames(body)
+    assert decoded["timestamp"].tolist() == [T0, T0 + 1, T0 + 2]
+    assert decoded["battery"][:2].tolist() == [80, 79]
+    assert np.isnan(decoded["battery"][2]) and np.isnan(decoded["temperature"][0])
+
+@pytest.mark.parametrize("columns", [
+    {"timestamp": 5},
+    {"timestamp": ["a"]},
+    {"timestamp": [[1.0, 2.0]]},
+    {"timestamp": [T0], "battery": {"level": 3}},
+    {"timestamp": [T0, T0 + 1], "battery": [50]},
+    {"battery": [50]},
+])
+def test_malformed_msgpack_columns_raise_decode_errors(columns):
+    with pytest.raises(TelemetryDecodeError):
+        decode_msgpack_frames(msgpack_frames(columns))
+
+def test_filter_valid_drops_out_of_range_samples_and_keeps_missing_fields():
+    sent = records(
+        (T0, 80, np.nan, 10, 0),
+        (T0, 120, 30, 10, 0),
+        (1e30, 80, 30, 10, 0),
+        (np.inf, 80, 30, 10, 0),
+        (-1, 80, 30, 10, 0),
+    )
+    assert filter_valid(sent)["battery"].tolist() == [80]
+
+def test_bucket_documents_group_samples_by_time():
+    sent = records((T0 + 61, 70, 30, 10, 0), (T0 + 1, 80, 30, 10, 0), (T0 + 2, 90, 30, 10, 0))
+    documents = build_bucket_documents("cam", sent, 60)
+    assert [doc["count"] for doc in documents] == [2, 1]
+    assert documents[0]["stats"]["battery"] == {"min": 80, "max": 90, "mean": 85}
+    assert np.frombuffer(documents[1]["columns"]["battery"], "<f4").tolist() == [70]
+
+def test_struct_ingest_stores_buckets_and_refreshes_status(client):
+    body = records((T0, 42.4, 50, 12.5, 0), (T0 + 1, 200, 30, 10, 0)).tobytes()
+    response = client.post("/api/camera/telemetry?cameraId=cam", content=body, headers={"Content-Type": STRUCT_MEDIA_TYPE})
+
+    assert response.status_code == 200
+    assert response.json() == {"cameraId": "cam", "accepted": 1, "rejected": 1, "buckets": 1}
+    assert len(get_repository().telemetry_buckets) == 1
+    status = client.get("/api/camera/status").json()
+    assert (status["battery"], status["storageUsed"], status["temperature"]) == (42, 12.5, "Warning")
+
+def test_older_batch_does_not_roll_the_status_back(client):
+    def ingest(*rows):
+        body = records(*rows).tobytes()
+        response = client.post("/api/camera/telemetry?cameraId=cam", content=body, headers={"Content-Type": STRUCT_MEDIA_TYPE})
+        assert response.status_code == 200
+
+    ingest((T0 + 60, 42, 50, 12.5, 0))
+    ingest((T0, 90, 30, 5, 0), (T0 + 30, 88, 30, 6, 0))
+    status = client.get("/api/camera/status").json()
+    assert (status["battery"], status["storageUsed"], status["temperature"]) == (42, 12.5, "Warning")
+    # The backfilled samples are still stored, they just don't touch the status
+    assert sum(doc["count"] for doc in get_repository().telemetry_buckets) == 3
+
+    ingest((T0 + 120, 41, 30, 13, 0))
+    assert client.get("/api/camera/status").json()["battery"] == 41
+
+@pytest.mark.parametrize("columns", [{"timestamp": 5}, {"timestamp": ["a"]}])
+def test_malformed_msgpack_ingest_returns_400(client, columns):
+    response = client.post("/api/camera/telemetry", content=msgpack_frames(columns), headers={"Content-Type": MSGPACK_MEDIA_TYPE})
+    assert response.status_code == 400
+
+def test_out_of_range_timestamp_is_rejected_not_a_server_error(client):
+    body = msgpack_frames({"timestamp": [1e30, T0], "battery": [50, 60]})
+    response = client.post("/api/camera/telemetry", content=body, headers={"Content-Type": MSGPACK_MEDIA_TYPE})
+    assert response.status_code == 200
+    assert (response.json()["accepted"], response.json()["rejected"]) == (1, 1)
+
+def test_websocket_acknowledges_batches_and_reports_errors(client):
+    with client.websocket_connect("/api/camera/telemetry/ws?format=msgpack") as websocket:
+        websocket.send_bytes(msgpack_frames({"timestamp": [T0]}))
+        assert websocket.receive_json()["accepted"] == 1
+        websocket.send_bytes(msgpack_frames({"timestamp": 5}))
+        assert "error" in websocket.receive_json()